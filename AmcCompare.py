@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+AmcCompare.py
+
+Compare two AMC servo logs of the same track, e.g. before and after a
+servo gain or firmware change: both are normalized as in AmcLog.py,
+resampled onto a common time grid and compared signal by signal.
+
+    python AmcCompare.py before.dat after.dat
+"""
+
+import argparse
+import sys
+
+from tsblog.amc import ColNum
+from tsblog.compare import AlignMaxLag, Signals, compare
+from tsblog.loader import load_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Before/after comparison of two AMC servo logs")
+    parser.add_argument("before", help="log recorded before the change")
+    parser.add_argument("after", help="log recorded after the change")
+    parser.add_argument("--period", type=float, help="grid step in seconds (default: the coarser sample period)")
+    parser.add_argument("--align", action="store_true",
+                        help="shift the after log to line up the demanded positions of one track")
+    parser.add_argument("--max-lag", type=float, default=AlignMaxLag,
+                        help="largest shift searched with --align, in seconds (default: %(default)s)")
+    parser.add_argument("--no-plot", action="store_true", help="print the statistics only")
+    Args = parser.parse_args()
+
+    print("Before : ", Args.before)
+    print("After : ", Args.after)
+    try:
+        Result = compare(load_log(Args.before, usecols=range(2, ColNum)),
+                         load_log(Args.after, usecols=range(2, ColNum)), Args.period, Args.align, Args.max_lag)
+    except ValueError as Error:
+        sys.exit("AmcCompare.py: %s" % Error)
+    print("Grid : %d samples every %.6f s" % (len(Result["grid"]), Result["period"]))
+    if Args.align:
+        print("After log shifted by %.4f s (correlation %.3f)" % (Result["shift"], Result["correlation"]))
+
+    for Key, Label, _ in Signals:
+        Stats = Result[Key]["stats"]
+        print(Label)
+        for Name in ("before", "after", "diff"):
+            S = Stats[Name]
+            print(" %-6s mean : %.3f, rms : %.3f, p95 |x| : %.3f, max |x| : %.3f" %
+                  (Name, S["mean"], S["rms"], S["p95"], S["max"]))
+
+    if Args.no_plot:
+        return
+
+    import matplotlib.pyplot as plt
+
+    Grid = Result["grid"]
+    for Num, (Key, Label, _) in enumerate(Signals, 1):
+        Fig, (Top, Bottom) = plt.subplots(2, 1, num=Num, figsize=(8, 6), sharex=True)
+        Top.plot(Grid, Result[Key]["before"], label="Before")
+        Top.plot(Grid, Result[Key]["after"], label="After")
+        Top.set_ylabel(Label)
+        Top.legend(loc=0)
+        Bottom.plot(Grid, Result[Key]["after"] - Result[Key]["before"], label="After - Before", c="k")
+        Bottom.set_ylabel("Difference")
+        Bottom.set_xlabel("Time (sec)")
+        Bottom.legend(loc=0)
+        Fig.suptitle("%s vs %s" % (Args.before, Args.after))
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
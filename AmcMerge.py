@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+AmcMerge.py
+
+Merge the AMC logs of several axes, recorded together, into one
+multi-axis dataset aligned on the first axis' sample times (see
+tsblog/merge.py), optionally written to a Parquet archive for cross-axis
+analysis:
+
+    python AmcMerge.py --axis azm=mic.azm.dat --axis alt=mic.alt.dat --axis cas=mic.cas.dat \\
+        --columns 4,5,13 --output merged.parquet
+"""
+
+import argparse
+
+import numpy
+
+from tsblog.amc import ColNum
+from tsblog.loader import load_log, read_headings
+from tsblog.merge import merge_axes
+
+
+def axis(text):
+    name, _, filename = text.partition("=")
+    if not filename:
+        raise argparse.ArgumentTypeError("expected NAME=FILE, got %r" % text)
+    return name, filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-aligned merge of per-axis AMC logs")
+    parser.add_argument("--axis", type=axis, action="append", required=True, metavar="NAME=FILE",
+                        help="an axis and its log; the first is the time reference (repeatable)")
+    parser.add_argument("--columns", help="comma-separated data columns to keep from every log (default: all)")
+    parser.add_argument("--tolerance", type=float, help="largest time difference matched, in seconds "
+                                                        "(default: half the reference sample period)")
+    parser.add_argument("--direction", default="nearest", choices=("nearest", "backward"),
+                        help="match the nearest sample, or the latest one not after (default: %(default)s)")
+    parser.add_argument("--output", help="write the merged dataset to this Parquet archive")
+    Args = parser.parse_args()
+
+    Logs, Headings = [], []
+    for Name, Filename in Args.axis:
+        print("%s : %s" % (Name, Filename))
+        Headings.append(read_headings(Filename)[2:])
+        Logs.append((Name, load_log(Filename, usecols=range(2, ColNum))))
+    Columns = [int(c) for c in Args.columns.split(",")] if Args.columns else None
+
+    Merged = merge_axes(Logs, Headings, Columns, Args.tolerance, Args.direction)
+    print("Merged, row x col", Merged.shape, "Size", Merged.nbytes, "bytes")
+    for Col, Name in enumerate(Merged.headings[1:], 1):
+        Matched = numpy.count_nonzero(~numpy.isnan(Merged[:, Col]))
+        print(" %-40s matched %d of %d" % (Name, Matched, len(Merged)))
+
+    if Args.output:
+        from tsblog.archive import write_archive
+
+        Fields = ["Date", "Clock"] + Merged.headings
+        write_archive(Merged, Fields, range(2, len(Fields)), "merged", Args.output,
+                      ", ".join(Filename for _, Filename in Args.axis))
+        print("Written", Args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+AmcQuantiles.py
+
+Percentiles of the AMC tracking errors (RMS error, max error and per-cycle
+|position error|) across many logs, grouped by telescope and month, from
+the per-log quantile sketches of tsblog/sketch.py. Sketches are built on
+first use and stored next to each log, so later runs read only them.
+Percentiles up to p99.9 are within 0.01% of the exact ones in rank.
+
+    python AmcQuantiles.py /path/to/data/files
+    python AmcQuantiles.py --group-by telescope_class,site --quantiles 50,99,99.9 /path/to/data/files
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from tsblog.catalog import parse_filename
+from tsblog.sketch import Metrics, ensure_sketches
+
+
+def _logs(paths, pattern):
+    """Yield the log files named by ``paths``, walking directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    # Skip the sketches and pyramids stored next to the logs
+                    if fnmatch.fnmatch(name, pattern) and not name.endswith(".npz"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _group(filename, fields):
+    """Return the group key of a log: its filename fields, "month" being YYYY-MM."""
+    parsed = parse_filename(filename) or {}
+    parsed["month"] = (parsed.get("timestamp") or "unknown")[:7]
+    return tuple(parsed.get(field) or "unknown" for field in fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet percentiles of AMC tracking errors from per-log sketches")
+    parser.add_argument("paths", nargs="+", help="AMC log files or directories")
+    parser.add_argument("--pattern", default="mic.*.dat", help="filename pattern inside directories (default: %(default)s)")
+    parser.add_argument("--group-by", default="telescope,month",
+                        help="comma-separated filename fields to group by, or 'all' (default: %(default)s)")
+    parser.add_argument("--quantiles", default="50,95,99", help="comma-separated percentiles (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, help="processes building missing sketches (default: one per CPU)")
+    Args = parser.parse_args()
+
+    Fields = [] if Args.group_by == "all" else Args.group_by.split(",")
+    Percents = [float(p) for p in Args.quantiles.split(",")]
+    Filenames = list(_logs(Args.paths, Args.pattern))
+
+    Start = time.perf_counter()
+    Groups = defaultdict(lambda: defaultdict(list))
+    Failed = 0
+    with ProcessPoolExecutor(Args.jobs) as Pool:
+        for Filename, Future in [(f, Pool.submit(ensure_sketches, f)) for f in Filenames]:
+            try:
+                Sketches = Future.result()
+            except Exception as exc:
+                print("%s : failed: %s" % (Filename, exc))
+                Failed += 1
+                continue
+            for Key, Digest in Sketches.items():
+                Groups[_group(Filename, Fields)][Key].append(Digest)
+
+    Header = "%-24s %-8s %12s" % (",".join(Fields) or "all", "metric", "samples") + "".join(
+        " %10s" % ("p%g" % p) for p in Percents)
+    print(Header)
+    for Group in sorted(Groups):
+        for Key, _ in Metrics:
+            Digests = Groups[Group][Key]
+            Merged = Digests[0].merge(*Digests[1:])
+            Values = Merged.quantile([p / 100.0 for p in Percents])
+            print("%-24s %-8s %12d" % (",".join(Group) or "all", Key, Merged.count)
+                  + "".join(" %10.1f" % v for v in Values))
+    print("%d logs (%d failed) in %.2f s" % (len(Filenames), Failed, time.perf_counter() - Start))
+
+
+if __name__ == "__main__":
+    main()
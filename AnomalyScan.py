@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+AnomalyScan.py
+
+Scan every column of an AMC or STD log for outliers against a rolling
+median/MAD (see tsblog/anomaly.py) and print the most anomalous time
+ranges, ranked by robust z-score:
+
+    python AnomalyScan.py --format amc mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python AnomalyScan.py --format std --threshold 12 --csv anomalies.csv latency.dat
+"""
+
+import argparse
+import csv
+import time
+
+import numpy
+
+from tsblog.anomaly import Threshold, Window, scan
+from tsblog.loader import format_usecols, load_log, read_headings
+from tsblog.pyramid import time_order
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Robust outlier scan across every column of a log")
+    parser.add_argument("filenames", nargs="+", help="logs (or their archives) to scan")
+    parser.add_argument("--format", default="amc", choices=("amc", "std"), help="log format (default: %(default)s)")
+    parser.add_argument("--window", type=int, default=Window, help="samples per rolling block (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=Threshold,
+                        help="robust z-score marking an anomaly (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=5, help="anomalies kept per column (default: %(default)s)")
+    parser.add_argument("--rows", type=int, default=20,
+                        help="rows of the ranked table printed per log (default: %(default)s)")
+    parser.add_argument("--csv", metavar="PATH", help="write every kept anomaly to PATH as CSV")
+    Args = parser.parse_args()
+
+    Tables = []
+    for Filename in Args.filenames:
+        Start = time.perf_counter()
+        Headings = read_headings(Filename)
+        Time, Data = time_order(load_log(Filename, format_usecols(Args.format, Headings)), Args.format)
+        # Column 0 is the time in both formats
+        Anomalies = scan(Data, Time - Time[0], list(range(1, Data.shape[1])), Headings[2:],
+                         Args.window, Args.threshold, Args.top)
+        print("%s : %d anomalies in %d columns of %d samples (%.2f s)" % (
+            Filename, len(Anomalies), len(numpy.unique(Anomalies["column"])), len(Data), time.perf_counter() - Start))
+        print(" %-4s %-24s %10s %10s %8s %8s %14s %14s" % (
+            "col", "heading", "start (s)", "end (s)", "samples", "z", "value", "median"))
+        for Row in Anomalies[:Args.rows]:
+            print(" %-4d %-24s %10.3f %10.3f %8d %8.1f %14.6g %14.6g" % (
+                Row["column"], Row["heading"][:24], Row["start"], Row["end"], Row["samples"], Row["peak_z"],
+                Row["peak_value"], Row["median"]))
+        Tables.append((Filename, Anomalies))
+
+    if Args.csv:
+        with open(Args.csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(("file",) + Tables[0][1].dtype.names)
+            for Filename, Anomalies in Tables:
+                writer.writerows((Filename,) + Row for Row in Anomalies.tolist())
+
+
+if __name__ == "__main__":
+    main()
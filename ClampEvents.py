@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+ClampEvents.py
+
+Tabulate the torque clamp episodes of one or more STD torque extracts
+(the layout StdTorquePlot.py expects) and summarise them across files,
+e.g. for trend reports:
+
+    python ClampEvents.py --csv clamp-events.csv torque-*.dat
+"""
+
+import argparse
+import csv
+
+import numpy
+
+from tsblog.events import aggregate, clamp_events
+from tsblog.loader import format_usecols, load_log, read_headings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Torque clamp event tables of STD torque extracts")
+    parser.add_argument("filenames", nargs="+", help="STD torque extracts (or their archives)")
+    parser.add_argument("--csv", metavar="PATH", help="write every event to PATH as CSV")
+    Args = parser.parse_args()
+
+    Tables = []
+    for Filename in Args.filenames:
+        Data = load_log(Filename, format_usecols("std", read_headings(Filename)))
+        Events = clamp_events(Data, Filename)
+        print("%s : %d events over %d samples" % (Filename, len(Events), len(Data)))
+        Tables.append(Events)
+    Events = numpy.concatenate(Tables)
+
+    if Args.csv:
+        with open(Args.csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(Events.dtype.names)
+            writer.writerows(Events.tolist())
+
+    for Flag, Summary in aggregate(Events).items():
+        print(Flag)
+        print(" events : %d," % Summary["events"], "files : %d," % Summary["files"],
+              "total : %.3f s," % Summary["total_duration"], "mean : %.3f s," % Summary["mean_duration"],
+              "longest : %.3f s" % Summary["max_duration"])
+        print(" peak demand : %.3f," % Summary["peak_axis_demand"],
+              "peak motor 1 : %.3f," % Summary["peak_motor1_measured"],
+              "peak motor 2 : %.3f" % Summary["peak_motor2_measured"])
+
+
+if __name__ == "__main__":
+    main()
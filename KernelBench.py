@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+KernelBench.py
+
+Check that the compiled (numba) and NumPy versions of the sequential
+kernels in tsblog.kernels give identical results, then time both:
+
+    python KernelBench.py --samples 10000000
+
+Without numba installed only the equality checks run, with the loops
+interpreted on small inputs.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from tsblog import kernels
+
+
+def cases(rng, n):
+    """Yield (kernel, args) inputs, including the edge cases of each kernel."""
+    time_axis = numpy.cumsum(rng.uniform(0.5, 1.5, n))
+    yield "wrap_index", (numpy.roll(time_axis, n // 3),)
+    yield "wrap_index", (time_axis,)
+    yield "wrap_index", (numpy.array([], dtype=numpy.float64),)
+    state = numpy.repeat(rng.integers(0, 5, n // 10 + 1), 10)[:n].astype(numpy.float64)
+    yield "state_changes", (state,)
+    state[::97] = numpy.nan
+    yield "state_changes", (state,)
+    x = rng.normal(size=n)
+    x[rng.random(n) < 0.2] = numpy.nan
+    x[:5] = [numpy.nan, 0.0, numpy.nan, -0.0, 3.0]
+    yield "fill_forward", (x,)
+    x[-1] = numpy.nan
+    yield "fill_forward", (x,)
+    yield "fill_forward", (numpy.full(10, numpy.nan),)
+    walk = numpy.cumsum(rng.normal(size=n))
+    walk[::50] = numpy.nan
+    yield "hysteresis", (walk, 1.0, -1.0, False)
+    yield "hysteresis", (walk, 1.0, -1.0, True)
+
+
+def same(a, b):
+    if isinstance(a, tuple):
+        return all(same(p, q) for p, q in zip(a, b))
+    return numpy.array_equal(numpy.asarray(a), numpy.asarray(b), equal_nan=True)
+
+
+def best_of(f, args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the tsblog kernels")
+    parser.add_argument("--samples", type=int, default=1000000,
+                        help="samples per benchmark input (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats, best taken (default: %(default)s)")
+    Args = parser.parse_args()
+    Rng = numpy.random.default_rng(0)
+
+    Failed = 0
+    Loops = kernels.compiled_kernels() or kernels.loop_kernels
+    for Name, KernelArgs in cases(Rng, 1000):
+        if not same(kernels.numpy_kernels[Name](*KernelArgs), Loops[Name](*KernelArgs)):
+            print("MISMATCH", Name)
+            Failed += 1
+    print("Equality checks :", "FAILED %d" % Failed if Failed else "passed")
+
+    if kernels.compiled_kernels() is None:
+        print("Compiled kernels unavailable (numba not installed, or TSBLOG_KERNELS=numpy); nothing to time")
+        raise SystemExit(1 if Failed else 0)
+
+    print("%-14s %12s %12s %8s" % ("kernel", "numpy (ms)", "numba (ms)", "speedup"))
+    Seen = set()
+    for Name, KernelArgs in cases(Rng, Args.samples):
+        if Name in Seen:
+            continue
+        Seen.add(Name)
+        Compiled = Loops[Name]
+        Compiled(*KernelArgs)  # compile outside the timing
+        NumPy = best_of(kernels.numpy_kernels[Name], KernelArgs, Args.repeat)
+        Numba = best_of(Compiled, KernelArgs, Args.repeat)
+        print("%-14s %12.3f %12.3f %7.1fx" % (Name, NumPy * 1000, Numba * 1000, NumPy / Numba))
+    raise SystemExit(1 if Failed else 0)
+
+
+if __name__ == "__main__":
+    main()
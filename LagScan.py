@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+LagScan.py
+
+Estimate the lag and correlation between pairs of signals of AMC logs or
+STD torque extracts by FFT cross-correlation, over the whole log and over
+sliding windows, to follow lag drift through a night:
+
+    python LagScan.py --format std --window 60 --plot torque-*.dat
+    python LagScan.py --format amc --pair 4,5 --csv lags.csv mic.*.dat
+
+Pairs are column indices into the loaded data, as used by AmcLog.py and
+StdTorquePlot.py; a positive lag means the second signal follows the first.
+"""
+
+import argparse
+import csv
+
+import numpy
+
+from tsblog.loader import format_usecols, load_log, read_headings
+from tsblog.xcorr import DefaultPairs, lag, sample_period, sliding_lag
+
+
+def pair(text):
+    first, second = text.split(",")
+    return int(first), int(second)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lag estimation between log signals")
+    parser.add_argument("filenames", nargs="+", help="logs to analyse")
+    parser.add_argument("--format", default="std", choices=sorted(DefaultPairs),
+                        help="log format (default: %(default)s)")
+    parser.add_argument("--pair", type=pair, action="append", metavar="FROM,TO",
+                        help="column pair to correlate (repeatable; default per format)")
+    parser.add_argument("--window", type=float, default=60.0, help="sliding window in seconds (default: %(default)s)")
+    parser.add_argument("--step", type=float, help="window step in seconds (default: half a window)")
+    parser.add_argument("--max-lag", type=float, default=1.0,
+                        help="largest lag searched in seconds (default: %(default)s)")
+    parser.add_argument("--csv", metavar="PATH", help="write the windowed lags to PATH as CSV")
+    parser.add_argument("--plot", action="store_true", help="plot lag drift per pair")
+    Args = parser.parse_args()
+    Pairs = Args.pair or DefaultPairs[Args.format]
+
+    Rows = []
+    for Filename in Args.filenames:
+        Heading = read_headings(Filename)
+        Data = load_log(Filename, format_usecols(Args.format, Heading))
+        Heading = Heading[2:]
+        # AMC logs wrap around; time order the samples
+        Order = numpy.argsort(Data.column(0), kind="stable")
+        Time = Data[:, 0][Order]
+        Period = sample_period(Time)
+        print("%s : %d samples, period %.6f s" % (Filename, len(Data), Period))
+        for ColFrom, ColTo in Pairs:
+            x, y = Data[:, ColFrom][Order], Data[:, ColTo][Order]
+            Label = "%s -> %s" % (Heading[ColFrom].strip(), Heading[ColTo].strip())
+            Lag, Corr = lag(x, y, Period, Args.max_lag)
+            print(" %s : lag %.4f s, correlation %.3f" % (Label, Lag, Corr))
+            if not Period > 0:
+                print("  no sliding windows : sample period is not positive")
+                continue
+            if Args.window * 2 > Time[-1] - Time[0]:
+                continue
+            Centres, Lags, Corrs = sliding_lag(Time, x, y, Args.window, Args.step, Args.max_lag)
+            Valid = Lags[numpy.isfinite(Lags)]
+            if len(Valid) == 0:
+                print("  %d windows, none with a lag" % len(Lags))
+            else:
+                print("  %d windows (%d without a lag), lag min : %.4f, median : %.4f, max : %.4f" %
+                      (len(Lags), len(Lags) - len(Valid), Valid.min(), numpy.median(Valid), Valid.max()))
+            Rows.extend((Filename, Label, c, l, r) for c, l, r in zip(Centres, Lags, Corrs))
+
+    if Args.csv:
+        with open(Args.csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(("file", "pair", "time", "lag", "correlation"))
+            writer.writerows(Rows)
+
+    if Args.plot and Rows:
+        import matplotlib.pyplot as plt
+
+        for Label in dict.fromkeys(r[1] for r in Rows):
+            plt.figure(figsize=(12, 6))
+            for Filename in Args.filenames:
+                Sel = [r for r in Rows if r[0] == Filename and r[1] == Label]
+                if Sel:
+                    plt.plot([r[2] for r in Sel], [r[3] for r in Sel], marker=".", label=Filename)
+            plt.title("Lag %s" % Label)
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Lag (sec)")
+            plt.legend(loc=0)
+        plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+LogAnalyse.py
+
+Parse a log once, publish it in shared memory (see tsblog/shared.py) and
+run several independent analyses on it in parallel worker processes,
+each attached to the same parsed data:
+
+    python LogAnalyse.py --format amc mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python LogAnalyse.py --format std --analyses clamps,lags torque.dat
+
+The analyses per format are listed in tsblog/analyses.py. The shared
+memory is released when the script ends, even if an analysis fails or a
+worker dies.
+"""
+
+import argparse
+import time
+
+from tsblog.analyses import Analyses
+from tsblog.loader import format_usecols, load_log, read_headings
+from tsblog.shared import publish, run_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel analyses of one parsed log in shared memory")
+    parser.add_argument("filename", help="log (or archive) to analyse")
+    parser.add_argument("--format", default="amc", choices=sorted(Analyses), help="log format (default: %(default)s)")
+    parser.add_argument("--analyses", help="comma-separated analyses to run (default: all of the format)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    Args = parser.parse_args()
+
+    Available = Analyses[Args.format]
+    Names = Args.analyses.split(",") if Args.analyses else list(Available)
+    Unknown = [Name for Name in Names if Name not in Available]
+    if Unknown:
+        parser.error("unknown analyses for %s logs: %s (expected %s)" % (
+            Args.format, ", ".join(Unknown), ", ".join(Available)))
+
+    Start = time.perf_counter()
+    Heading = read_headings(Args.filename)
+    Data = load_log(Args.filename, format_usecols(Args.format, Heading))
+    Data.headings = Heading[2:]
+    print("%s : %d x %d parsed in %.3f s" % (Args.filename, len(Data), Data.shape[1], time.perf_counter() - Start))
+
+    with publish(Data) as Shared:
+        print("Published as %s (%.1f MiB)" % (Shared.name, Shared.block.size / 2**20))
+        Failed = 0
+        for Name, Result, Error in run_parallel(Shared, {Name: Available[Name] for Name in Names}, Args.jobs):
+            if Error is not None:
+                Failed += 1
+                print("%s : failed: %r" % (Name, Error))
+                continue
+            print(Name)
+            for Key, Value in Result.items():
+                print("  %-32s %s" % (Key, "%.6g" % Value if isinstance(Value, float) else Value))
+    print("%d analyses (%d failed) in %.3f s" % (len(Names), Failed, time.perf_counter() - Start))
+
+
+if __name__ == "__main__":
+    main()
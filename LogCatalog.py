@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+LogCatalog.py
+
+Maintain and query a catalog of AMC and mirror support logs, with the
+per-file summary statistics AmcLog.py and SifMirrorLog.py report.
+
+Examples
+--------
+Catalogue (or refresh) a directory tree of AMC logs:
+
+    python LogCatalog.py update --format amc /path/to/data/files
+
+Which 1m0 logs in October 2021 had final-quarter MeanRMS above 300 mas:
+
+    python LogCatalog.py query --class 1m0 --since 2021-10-01 --until 2021-11-01 \\
+        --where "mean_rms_final_quarter > 300" --show mean_rms_final_quarter
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+
+from tsblog.catalog import AmcStats, Catalog, MirrorStats
+from tsblog.loader import Formats
+
+
+def _logs(paths, pattern):
+    """Yield the log files named by ``paths``, walking directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if fnmatch.fnmatch(name, pattern):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog of TSB logs and their summary statistics")
+    parser.add_argument("--db", default="tsb-catalog.sqlite", help="catalog database (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="add new and changed logs to the catalog")
+    update.add_argument("paths", nargs="+", help="log files or directories")
+    update.add_argument("--format", default="amc", choices=sorted(Formats),
+                        help="format of the text logs (default: %(default)s)")
+    update.add_argument("--pattern", default="*.dat", help="filename pattern inside directories (default: %(default)s)")
+    update.add_argument("--prune", action="store_true", help="drop catalogued logs that no longer exist")
+
+    query = commands.add_parser("query", help="list catalogued logs")
+    query.add_argument("--class", dest="telescope_class", help="telescope class, e.g. 1m0")
+    query.add_argument("--site", help="site, e.g. bpl")
+    query.add_argument("--since", help="earliest timestamp (ISO, inclusive)")
+    query.add_argument("--until", help="latest timestamp (ISO, exclusive)")
+    query.add_argument("--where", help="extra SQL condition on the catalog columns")
+    query.add_argument("--show", default="", help="comma-separated statistics to print, e.g. mean_rms_final_quarter")
+
+    Args = parser.parse_args()
+    Show = [s for s in Args.show.split(",") if s] if Args.command == "query" else []
+    Unknown = [s for s in Show if s not in ("samples",) + AmcStats + MirrorStats]
+    if Unknown:
+        parser.error("unknown statistic for --show: %s (choose from samples, %s)" %
+                     (", ".join(Unknown), ", ".join(AmcStats + MirrorStats)))
+    Cat = Catalog(Args.db)
+
+    if Args.command == "update":
+        Start = time.perf_counter()
+        Read = Skipped = Failed = 0
+        for Filename in _logs(Args.paths, Args.pattern):
+            # A log that cannot be read is reported, and the rest still catalogued
+            try:
+                Added = Cat.add(Filename, Args.format)
+            except Exception as exc:
+                Failed += 1
+                print("%s : FAILED (%s: %s)" % (Filename, type(exc).__name__, exc))
+                continue
+            if Added:
+                Read += 1
+            else:
+                Skipped += 1
+        if Args.prune:
+            print("Pruned", Cat.prune(), "missing logs")
+        print("Catalogued %d logs, %d unchanged, %d failed, in %.3f s" % (Read, Skipped, Failed,
+                                                                         time.perf_counter() - Start))
+    else:
+        Start = time.perf_counter()
+        Rows = Cat.query(Args.where, telescope_class=Args.telescope_class, site=Args.site,
+                         since=Args.since, until=Args.until)
+        Elapsed = time.perf_counter() - Start
+        for Row in Rows:
+            Values = ["%s : %.3f" % (s, Row[s]) if Row[s] is not None else "%s : -" % s for s in Show]
+            print(Row["timestamp"] or "-", Row["path"], *Values)
+        print("%d logs (%.1f ms)" % (len(Rows), Elapsed * 1000.0))
+
+    Cat.close()
+
+
+if __name__ == "__main__":
+    main()
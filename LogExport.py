@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+LogExport.py
+
+Export AMC, PMC/SIF mirror support and STD logs to compressed columnar
+Parquet archives. The analysis scripts accept the archives in place of
+the text logs, e.g.
+
+    python LogExport.py --format amc mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python AmcLog.py mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat.parquet
+"""
+
+import argparse
+import os
+
+from tsblog.archive import RowGroupRows, export_log
+from tsblog.loader import Formats
+from tsblog.pyramid import ensure_pyramid, pyramid_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export logs to Parquet archives")
+    parser.add_argument("filenames", nargs="+", help="text logs to export")
+    parser.add_argument("--format", required=True, choices=sorted(Formats), help="log format")
+    parser.add_argument("--output-dir", help="directory for the archives (default: next to each log)")
+    parser.add_argument("--row-group-rows", type=int, default=RowGroupRows,
+                        help="samples per row group (default: %(default)s)")
+    parser.add_argument("--compression", default="zstd", help="Parquet codec (default: %(default)s)")
+    parser.add_argument("--pyramid", action="store_true", help="also build each archive's overview pyramid")
+    Args = parser.parse_args()
+
+    for Filename in Args.filenames:
+        Output = None
+        if Args.output_dir:
+            Output = os.path.join(Args.output_dir, os.path.basename(Filename) + ".parquet")
+        Output = export_log(Filename, Args.format, Output, Args.row_group_rows, Args.compression)
+        print("%s -> %s (%d bytes, was %d)" % (Filename, Output, os.path.getsize(Output), os.path.getsize(Filename)))
+        if Args.pyramid:
+            ensure_pyramid(Output, Args.format).close()
+            print("%s -> %s" % (Output, pyramid_path(Output)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+LogOverview.py
+
+Plot an overview of log columns from the log's min/max/mean pyramid (see
+tsblog/pyramid.py), building the pyramid on first use. Spans too short for
+the finest pyramid level are plotted from the raw samples in the span.
+
+    python LogOverview.py --format amc --columns 5,13 mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python LogOverview.py --format amc --columns 5 --start 600 --end 660 mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+
+If the log has a Parquet archive next to it (LogExport.py), the pyramid is
+built from and stored next to the archive, and zooming in to raw samples
+reads only the row groups of the span; a text log is parsed whole.
+"""
+
+import argparse
+import os
+import time
+
+from tsblog.loader import Formats, format_usecols, is_archive, read_headings
+from tsblog.pyramid import ScreenWidth, ensure_pyramid, load_span
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overview plots of log columns from min/max pyramids")
+    parser.add_argument("filename", help="log (or archive) to plot")
+    parser.add_argument("--format", required=True, choices=sorted(Formats), help="log format")
+    parser.add_argument("--columns", default="1", help="comma-separated data columns to plot (default: %(default)s)")
+    parser.add_argument("--start", type=float, help="start, in seconds from the beginning of the log")
+    parser.add_argument("--end", type=float, help="end, in seconds from the beginning of the log")
+    parser.add_argument("--width", type=int, default=ScreenWidth, help="points per line (default: %(default)s)")
+    parser.add_argument("--output", help="save the figure here instead of showing it")
+    Args = parser.parse_args()
+
+    Filename = Args.filename
+    if not is_archive(Filename) and os.path.exists(Filename + ".parquet"):
+        Filename += ".parquet"
+    Columns = [int(c) for c in Args.columns.split(",")]
+    Headings = read_headings(Filename)
+    Heading = [Headings[c] for c in format_usecols(Args.format, Headings)]
+
+    Start = time.perf_counter()
+    Pyr = ensure_pyramid(Filename, Args.format)
+    T0 = Pyr.file["L%d_tmin" % Pyr.max_level][0]
+    Span = (None if Args.start is None else T0 + Args.start, None if Args.end is None else T0 + Args.end)
+    Levels = [Pyr.fetch(Col, *Span, width=Args.width) for Col in Columns]
+    print("Pyramid ready in %.3f s" % (time.perf_counter() - Start))
+
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    if all(Level is not None for Level in Levels):
+        for Col, (TMin, TMax, Lo, Hi, Mean) in zip(Columns, Levels):
+            Mid = (TMin + TMax) / 2.0 - T0
+            plt.fill_between(Mid, Lo, Hi, step="mid", alpha=0.3)
+            plt.plot(Mid, Mean, label=Heading[Col].strip())
+    else:
+        # Too short a span for the pyramid; plot the raw samples
+        Time, Data = load_span(Filename, Args.format, *Span)
+        for Col in Columns:
+            plt.plot(Time - T0, Data[:, Col], label=Heading[Col].strip())
+    plt.title(Args.filename)
+    plt.xlabel("Time (sec)")
+    plt.legend(loc=0)
+    print("First paint after %.3f s" % (time.perf_counter() - Start))
+    if Args.output:
+        plt.savefig(Args.output)
+    else:
+        plt.show()
+    Pyr.close()
+
+
+if __name__ == "__main__":
+    main()
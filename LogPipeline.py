@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+LogPipeline.py
+
+Summarise and plot many logs with reading, analysis and rendering
+overlapped across files (see tsblog/pipeline.py):
+
+    python LogPipeline.py --format amc --output-dir plots /path/to/data/files/mic.*.dat
+"""
+
+import argparse
+import os
+import time
+
+from tsblog.loader import Formats
+from tsblog.pipeline import Pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined batch analysis of logs")
+    parser.add_argument("filenames", nargs="+", help="logs to process")
+    parser.add_argument("--format", required=True, choices=sorted(Formats), help="log format")
+    parser.add_argument("--output-dir", help="write an overview PNG per log here (default: no plots)")
+    parser.add_argument("--readers", type=int, default=2, help="reader threads (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, help="analysis processes (default: CPU count)")
+    parser.add_argument("--renderers", type=int, help="rendering processes (default: CPU count)")
+    parser.add_argument("--depth", type=int, help="most logs in flight (default: twice the analysis processes)")
+    Args = parser.parse_args()
+
+    if Args.output_dir:
+        os.makedirs(Args.output_dir, exist_ok=True)
+    Pipe = Pipeline(Args.format, Args.output_dir, Args.readers, Args.jobs, Args.renderers, Args.depth)
+
+    Start = time.perf_counter()
+    Done = Failed = 0
+    for Result in Pipe.run(Args.filenames):
+        if Result["error"]:
+            Failed += 1
+            print("%s : FAILED (%s)" % (Result["filename"], Result["error"]))
+            continue
+        Done += 1
+        Summary = Result["summary"]
+        Extra = ""
+        if "mean_rms_final_quarter" in Summary:
+            Extra = ", MeanRMS (final quarter) %d mas" % Summary["mean_rms_final_quarter"]
+        elif "period_mean" in Summary:
+            Extra = ", mean period %.6f" % Summary["period_mean"]
+        print("%s : %d samples%s%s (%.2f s)" % (Result["filename"], Summary["samples"], Extra,
+                                              " -> " + Result["figure"] if Result["figure"] else "",
+                                              Result["timings"]["total"]))
+    Elapsed = time.perf_counter() - Start
+    print("%d logs, %d failed, in %.2f s (%.1f files/min)" % (Done, Failed, Elapsed, 60.0 * (Done + Failed) / Elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+LogReport.py
+
+Generate a self-contained HTML report (statistics, state changes and all
+figures of AmcLog.py or SifMirrorLog.py) per log, many logs at a time:
+
+    python LogReport.py --format amc --output-dir reports /path/to/data/files/mic.*.dat
+
+Reports of logs that have not changed since their last report are left
+alone (see tsblog/report.py).
+"""
+
+import argparse
+import os
+import time
+
+from tsblog.report import CacheDir, Scripts, generate_reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML reports of AMC and mirror logs")
+    parser.add_argument("filenames", nargs="+", help="logs to report on")
+    parser.add_argument("--format", required=True, choices=sorted(Scripts), help="log format")
+    parser.add_argument("--output-dir", help="directory for the reports (default: next to each log)")
+    parser.add_argument("--cache-dir", default=CacheDir, help="cache of rendered assets (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPU count)")
+    Args = parser.parse_args()
+
+    if Args.output_dir:
+        os.makedirs(Args.output_dir, exist_ok=True)
+    Start = time.perf_counter()
+    Counts = {}
+    for Filename, Path, Status in generate_reports(Args.filenames, Args.format, Args.output_dir,
+                                                   Args.cache_dir, Args.jobs):
+        Counts[Status.split(":")[0]] = Counts.get(Status.split(":")[0], 0) + 1
+        print("%s : %s%s" % (Filename, Status, " -> " + Path if Path else ""))
+    print("%s in %.2f s" % (", ".join("%d %s" % (n, s) for s, n in sorted(Counts.items())),
+                            time.perf_counter() - Start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+MirrorModel.py
+
+Build or extend the expected-load model of a mirror support from
+historical PMC/SIF logs (see tsblog/support.py): the mean and spread of
+the net axial force, tilt moments and lateral forces per zenith angle.
+SifMirrorLog.py --model checks a log against it.
+
+    python MirrorModel.py --model support-1m0a.npz /path/to/data/files/pmc.1m0a.*.dat
+    python SifMirrorLog.py --model support-1m0a.npz pmc.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+
+Logs already in the model are not read again.
+"""
+
+import argparse
+import time
+
+import numpy
+
+from tsblog.mirror import PmcColumns, SifColumns
+from tsblog.support import AngleBin, Outputs, update_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expected mirror support loads per zenith angle")
+    parser.add_argument("filenames", nargs="*", help="historical mirror logs to add")
+    parser.add_argument("--model", required=True, help="model file to create or extend (.npz)")
+    parser.add_argument("--sif", action="store_true", help="the logs are in SIF rather than PMC format")
+    parser.add_argument("--bin", type=float, default=AngleBin,
+                        help="zenith angle bin width, degrees (default: %(default)s)")
+    Args = parser.parse_args()
+
+    Start = time.perf_counter()
+    Model, Added = update_model(Args.model, Args.filenames, SifColumns if Args.sif else PmcColumns, Args.bin)
+    print("%s : %d logs (%d added) in %.2f s" % (Args.model, len(Model.sources), len(Added),
+                                                time.perf_counter() - Start))
+
+    Filled = numpy.flatnonzero(Model.count)
+    if len(Filled):
+        print("Angles %.1f - %.1f deg, %d samples" % (Filled[0] * Model.bin_width, Filled[-1] * Model.bin_width,
+                                                      Model.count.sum()))
+        Mean = Model.sum[Filled] / Model.count[Filled, None]
+        for k, Name in enumerate(Outputs):
+            print("  %-12s mean %9.4f .. %9.4f" % (Name, Mean[:, k].min(), Mean[:, k].max()))
+
+
+if __name__ == "__main__":
+    main()
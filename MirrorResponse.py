@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+MirrorResponse.py
+
+Frequency response (gain, phase and coherence) of the seven mirror
+support valve drive/feedback pairs, for one or more PMC/SIF logs, e.g.
+one per night (see tsblog/response.py). Each log's response is summarised
+as its low-frequency gain, -3 dB bandwidth and per-band gain, phase and
+coherence; with several logs, each is compared with the median of all of
+them and the pairs that drifted are listed, to spot degrading valves:
+
+    python MirrorResponse.py pmc.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python MirrorResponse.py --csv response.csv /path/to/data/files/pmc.1m0a.doma.bpl.*.dat
+
+Responses are stored next to each log, so later runs read only them.
+"""
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tsblog.catalog import parse_filename
+from tsblog.mirror import PmcColumns, SifColumns
+from tsblog.response import (
+    BandwidthTolerance, GainTolerance, MinCoherence, Overlap, PhaseTolerance, Segment, band_labels, drifts,
+    ensure_response, reference)
+
+
+def _night(filename):
+    """Return the label of a log: its timestamp, or its name."""
+    return (parse_filename(filename) or {}).get("timestamp") or os.path.basename(filename)
+
+
+def _summary(filename, Cols, segment, overlap, min_coherence):
+    return ensure_response(filename, Cols, segment, overlap).summary(min_coherence=min_coherence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valve drive to feedback frequency response of mirror support logs")
+    parser.add_argument("filenames", nargs="+", help="mirror logs, e.g. one per night")
+    parser.add_argument("--sif", action="store_true", help="the logs are in SIF rather than PMC format")
+    parser.add_argument("--segment", type=int, default=Segment, help="samples per FFT segment (default: %(default)s)")
+    parser.add_argument("--overlap", type=float, default=Overlap, help="overlap of the segments (default: %(default)s)")
+    parser.add_argument("--min-coherence", type=float, default=MinCoherence,
+                        help="coherence below which a frequency is ignored (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--csv", metavar="PATH", help="write every log's summary to PATH as CSV")
+    Args = parser.parse_args()
+
+    Cols = SifColumns if Args.sif else PmcColumns
+    Labels = band_labels()
+
+    Start = time.perf_counter()
+    Summaries = []
+    with ProcessPoolExecutor(Args.jobs) as Pool:
+        Futures = [(f, Pool.submit(_summary, f, Cols, Args.segment, Args.overlap, Args.min_coherence))
+                   for f in Args.filenames]
+        for Filename, Future in Futures:
+            try:
+                Summaries.append((Filename, Future.result()))
+            except Exception as exc:
+                print("%s : failed: %s" % (Filename, exc))
+
+    for Filename, Summary in Summaries:
+        print("%s (%s, %d segments)" % (Filename, _night(Filename), Summary["segments"][0]))
+        print("  %-18s %8s %9s" % ("pair", "gain dB", "bw Hz") + "".join(" %24s" % Label for Label in Labels))
+        for Row in Summary:
+            print("  %-18s %8.2f %9.3f" % (Row["pair"], Row["gain_db"], Row["bandwidth"]) + "".join(
+                " %6.1fdB %6.1fdeg %5.2f" % (Row["gain_db_" + L], Row["phase_" + L], Row["coherence_" + L])
+                for L in Labels))
+
+    if len(Summaries) > 1:
+        Usual = reference([Summary for _, Summary in Summaries])
+        print("Changes from the median of %d logs (beyond %g dB, %g deg, %g%% bandwidth):" % (
+            len(Summaries), GainTolerance, PhaseTolerance, 100 * BandwidthTolerance))
+        for Filename, Summary in Summaries:
+            for Pair, Field, Value, Median in drifts(Summary, Usual):
+                print("  %s %-18s %-22s %9.3f (median %9.3f)" % (_night(Filename), Pair, Field, Value, Median))
+
+    if Args.csv and Summaries:
+        with open(Args.csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(("file", "night") + Summaries[0][1].dtype.names)
+            for Filename, Summary in Summaries:
+                writer.writerows((Filename, _night(Filename)) + Row for Row in Summary.tolist())
+    print("%d logs in %.2f s" % (len(Summaries), time.perf_counter() - Start))
+
+
+if __name__ == "__main__":
+    main()
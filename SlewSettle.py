@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+SlewSettle.py
+
+Find the slews of one or more AMC servo logs and measure how each settles
+into tracking: settling time of the position and RMS errors to each
+threshold, overshoot and peak motor velocity (see tsblog/slew.py). The
+slews of all logs are summarised together, grouped by telescope and
+month like AmcQuantiles.py:
+
+    python SlewSettle.py mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python SlewSettle.py --thresholds 1000,100,20 --csv slews.csv /path/to/data/files
+    python SlewSettle.py --slew-states 3 --track-states 5 --group-by all /path/to/data/files
+"""
+
+import argparse
+import csv
+import fnmatch
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from tsblog.amc import MasPerDeg
+from tsblog.catalog import parse_filename
+from tsblog.slew import ErrorChannels, Horizon, SlewVelocity, Thresholds, aggregate, file_slews, settle_field
+
+
+def _logs(paths, pattern):
+    """Yield the log files named by ``paths``, walking directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    # Skip the sketches and pyramids stored next to the logs
+                    if fnmatch.fnmatch(name, pattern) and not name.endswith(".npz"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _group(filename, fields):
+    """Return the group key of a log: its filename fields, "month" being YYYY-MM."""
+    parsed = parse_filename(filename) or {}
+    parsed["month"] = (parsed.get("timestamp") or "unknown")[:7]
+    return tuple(parsed.get(field) or "unknown" for field in fields)
+
+
+def _states(text):
+    return [int(s) for s in text.split(",")] if text else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slew settling times, overshoot and peak motor velocity of AMC logs")
+    parser.add_argument("paths", nargs="+", help="AMC log files or directories")
+    parser.add_argument("--pattern", default="mic.*.dat", help="filename pattern inside directories (default: %(default)s)")
+    parser.add_argument("--group-by", default="telescope,month",
+                        help="comma-separated filename fields to group by, or 'all' (default: %(default)s)")
+    parser.add_argument("--thresholds", default=",".join("%g" % t for t in Thresholds),
+                        help="comma-separated settling thresholds, mas (default: %(default)s)")
+    parser.add_argument("--slew-velocity", type=float, default=SlewVelocity / MasPerDeg,
+                        help="demand velocity above which the axis is slewing, deg/s (default: %(default)g)")
+    parser.add_argument("--horizon", type=float, default=Horizon,
+                        help="longest settling time measured, s (default: %(default)g)")
+    parser.add_argument("--slew-states", help="comma-separated states a slew must end in (default: any)")
+    parser.add_argument("--track-states", help="comma-separated states tracking must start in (default: any)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--csv", metavar="PATH", help="write every slew to PATH as CSV")
+    Args = parser.parse_args()
+
+    Fields = [] if Args.group_by == "all" else Args.group_by.split(",")
+    Limits = [float(t) for t in Args.thresholds.split(",")]
+    Options = dict(slew_velocity=Args.slew_velocity * MasPerDeg, thresholds=Limits, horizon=Args.horizon,
+                   slew_states=_states(Args.slew_states), track_states=_states(Args.track_states))
+    Filenames = list(_logs(Args.paths, Args.pattern))
+
+    Start = time.perf_counter()
+    Tables = []
+    Failed = 0
+    with ProcessPoolExecutor(Args.jobs) as Pool:
+        for Filename, Future in [(f, Pool.submit(file_slews, f, **Options)) for f in Filenames]:
+            try:
+                Table = Future.result()
+            except Exception as exc:
+                print("%s : failed: %s" % (Filename, exc))
+                Failed += 1
+                continue
+            print("%s : %d slews" % (Filename, len(Table)))
+            Tables.append(Table)
+
+    if Args.csv and Tables:
+        Slews = numpy.concatenate(Tables)
+        with open(Args.csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(Slews.dtype.names)
+            writer.writerows(Slews.tolist())
+
+    Groups = defaultdict(list)
+    for Table in Tables:
+        if len(Table):
+            Groups[_group(Table["file"][0], Fields)].append(Table)
+
+    for Group in sorted(Groups):
+        Summary = aggregate(numpy.concatenate(Groups[Group]))
+        print(",".join(Group) or "all")
+        print(" slews : %d," % Summary["slews"], "files : %d," % Summary["files"],
+              "mean duration : %.3f s," % Summary["mean_duration"],
+              "peak motor velocity : %.3f deg/s" % (Summary["peak_motor_vel"] / MasPerDeg))
+        print(" overshoot mean : %.1f mas," % Summary["mean_overshoot"], "max : %.1f mas" % Summary["max_overshoot"])
+        for Channel, _ in ErrorChannels:
+            for Limit in Limits:
+                Name = settle_field(Channel, Limit)
+                print(" %s settle to %g mas : median %.3f s, p95 %.3f s, max %.3f s, unsettled %d" % (
+                    Channel, Limit, Summary[Name + "_median"], Summary[Name + "_p95"], Summary[Name + "_max"],
+                    Summary[Name + "_unsettled"]))
+    print("%d logs (%d failed) in %.2f s" % (len(Filenames), Failed, time.perf_counter() - Start))
+
+
+if __name__ == "__main__":
+    main()
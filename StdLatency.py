@@ -1,12 +1,16 @@
 #! /usr/bin/env python
 
 #
-# StdPlot.py
+# StdLatency.py
 #
 # This Python script is used for a quick analysis of an STD data file, i.e. data
 # extracted from SDB files.
 #
-# Follow the various numbered stages to configure operation to suit purposes.
+# This script plots every column of a latency extract, plus the difference
+# between the measured control output and the one rebuilt from its inputs. The
+# column layout is tsblog.std.LatencyColumns; the computations and figures live
+# in tsblog.std and tsblog.plots, which can also be imported to analyse an
+# extract that is already loaded.
 #
 # Notes :-
 # - currently each plot window needs to be individually closed, otherwise they
@@ -15,105 +19,68 @@
 
 # Import packages
 import sys
-import numpy
-import matplotlib
-import matplotlib.pyplot as plt
-
-# Various constants
-MasPerDeg = 3600000
-MasPerAs = 1000
-NSecPerSec = 1000000000
-MilliPerUnit = 1000
-MicroPerUnit = 1000000
-
-# Dummy function to discard the date string
-def date2str( String ):
-   return 0
-
-# Take copy of the filename, passed in on the command-line
-Filename = sys.argv[ 1 ]
-print "Filename : ", Filename
-
-## Open the file to replace empty entries with 'NaN'
-#File = open( Filename )
-#Contents = File.read()
-#File.close()
-#NewContents = Contents.replace( '\t\t', '\tNaN\t' )
-#File = open( "temp.txt", "w" )
-#File.write( NewContents )
-#File.close()
-
-# Open the file and read the line of headings
-File = open( Filename )
-Line = File.readline()
-File.close()
-
-# Determine how many headings have been read
-Heading = Line.split( '\t' )
-print Heading
-print "Headings :", len( Heading )
-TotalCols = len( Heading )
-# Delete the first two unwanted headings
-del Heading[ 0:2 ]
-
-# Read in the actual data
-Data = numpy.loadtxt( Filename, dtype=float, skiprows=1 , usecols=range( 2, TotalCols - 1 ) )
-print "Data read in, row x col", Data.shape, "Size", Data.size, "bytes"
-
-# Perform a min, max, mean and stdev on the data
-Min = numpy.nanmin( Data, axis=0 )
-Max = numpy.nanmax( Data, axis=0 )
-Mean  = numpy.mean( Data, axis=0 )
-Stdev = numpy.std( Data, axis=0 )
-
-# Define some useful columns
-ColTime = 0
-ColFirstData = 3
-ColSecondData = 8
-ColThirdData = 9
-
-##########
-#
-# 2) Fill in the reporting of any statistics
-#
-##########
-Col = ColFirstData
-print Heading[ Col ],
-print " min : %.3f," % Min[ Col ], " max : %.3f," % Max[ Col ], "mean : %.3f," % Mean[ Col ], "stdev : %.3f," % Stdev[ Col ]
 
-##########
-#
-# 3) Perform any specific computations to create new data
-#
-##########
-Control = -1000.0*(Data[ :, 3 ]/111.0 + 2.0*1.72124e-3/1.0e3 * Data[ :, 11 ])
-ControlDiff = Control[:] - Data[:, 18]
+from tsblog.cli import (
+   add_figure_options, make_figure_output, make_parser, make_profiler, print_column_stats, print_figure_output)
+from tsblog.loader import read_headings
+from tsblog.std import LatencyColumns, control_diff, load, time_axis
 
-# Determine a time axis for plotting graphs
-Time = Data[ :, ColTime ] - Data[ 0, ColTime ]
 
-##########
-#
-# 4) Set the parameters to plot the first graph
-#
-##########
-for x in range(32):
-    plt.figure(x, figsize=(8, 6))
-    plt.plot(Time, Data[:, x], label=Heading[x])
-    plt.title(Filename)
-    plt.xlabel("Time (sec)")
-    plt.ylabel("")
-    plt.legend(loc=0)
+def main():
+   # Take copy of the filename, passed in on the command-line
+   Args = add_figure_options( make_parser( "Plot every column of an STD latency data file" )).parse_args()
+   Prof = make_profiler( Args )
+   Filename = Args.filename
+   print("Filename : ", Filename)
+
+   # Open the file and read the line of headings
+   with Prof.stage( "read headings" ) :
+      Heading = read_headings( Filename )
+
+   # Determine how many headings have been read
+   print(Heading)
+   print( "Headings :", len( Heading ))
+
+   # Read in the actual data
+   with Prof.stage( "parse" ) :
+      Data = load( Filename, Heading )
+   # Delete the first two unwanted headings
+   del Heading[ 0:2 ]
+   print( "Data read in, row x col", Data.shape, "Size", Data.size, "bytes")
+
+   # Perform a min, max, mean and stdev on the data
+   with Prof.stage( "stats" ) :
+      Stats = Data.stats()
+
+   # Report the statistics of the first data column
+   print_column_stats( Heading, Stats, LatencyColumns.ColFirstData )
+
+   with Prof.stage( "derive" ) :
+      Control, ControlDiff = control_diff( Data )
+
+      # Determine a time axis for plotting graphs
+      Time = time_axis( Data, LatencyColumns.ColTime )
+
+   # Stop here in summary-only mode, before loading matplotlib
+   if Args.no_plot :
+      Prof.report( Args.profile_json )
+      sys.exit( 0 )
+
+   from tsblog.plots import latency_figures, show
 
-plt.figure( 37, figsize=( 8, 6 ) )
-plt.plot( Time, ControlDiff[ :], label='Control Diff')
-plt.title( Filename )
-plt.xlabel( "Time (sec)" )
-plt.ylabel( "" )
-plt.legend( loc=0 )
+   # Save the figures, reusing unchanged ones from the figure cache, or draw and display them
+   Out = make_figure_output( Args )
+   latency_figures( Time, Data, ControlDiff, Heading, Filename, prof=Prof, out=Out )
 
+   if Out is not None :
+      print_figure_output( Out )
+   else :
+      # Display the actual graphs
+      with Prof.stage( "show" ) :
+         show()
 
-# Display the actual graphs
-plt.show()
+   Prof.report( Args.profile_json )
 
 
+if __name__ == "__main__" :
+   main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+TsbClient.py
+
+Ask the local analysis daemon (TsbDaemon.py) for the statistics or the
+figures of a log. Repeated requests for the same log are answered from
+the daemon's cache, without parsing the log again:
+
+    python TsbClient.py stats mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python TsbClient.py stats --format pmc pmc.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python TsbClient.py figures --output-dir figs mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python TsbClient.py status
+    python TsbClient.py shutdown
+
+Figures are written as PNG files named after the log.
+"""
+
+import argparse
+import base64
+import os
+import sys
+
+from tsblog.client import default_socket, request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client of the local analysis daemon")
+    parser.add_argument("--socket", default=default_socket(), help="Unix socket of the daemon (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, help="seconds to wait for the reply (default: no limit)")
+    Commands = parser.add_subparsers(dest="op", required=True)
+    for Op, Help in (("stats", "print the statistics of a log"), ("figures", "save the figures of a log as PNG")):
+        Command = Commands.add_parser(Op, help=Help)
+        Command.add_argument("filename", help="log to analyse")
+        Command.add_argument("--format", default="amc", choices=("amc", "pmc"),
+                             help="log format (default: %(default)s)")
+        if Op == "figures":
+            Command.add_argument("--output-dir", default=".", help="directory for the PNG files (default: %(default)s)")
+    Commands.add_parser("status", help="print the cache usage of the daemon")
+    Commands.add_parser("shutdown", help="stop the daemon")
+    Args = parser.parse_args()
+
+    Message = {"op": Args.op}
+    if Args.op in ("stats", "figures"):
+        Message.update(file=os.path.abspath(Args.filename), format=Args.format)
+
+    try:
+        Reply = request(Message, Args.socket, Args.timeout)
+    except (OSError, RuntimeError) as exc:
+        sys.exit("%s: %s" % (Args.op, exc))
+
+    if Args.op == "stats":
+        Stats = Reply["stats"]
+        for Key, Value in Stats["summary"].items():
+            print("%-28s %s" % (Key, Value))
+        if "lag" in Stats:
+            print("%-28s %.4f s, correlation %.3f" % ("lag", *Stats["lag"]))
+            for Time, Before, After in Stats["state_changes"]:
+                print("%3.3f" % Time, " : State change %d" % Before, " -> %d" % After)
+    elif Args.op == "figures":
+        os.makedirs(Args.output_dir, exist_ok=True)
+        Stem = os.path.basename(Args.filename)
+        for Num, Image in enumerate(Reply["figures"], 1):
+            Path = os.path.join(Args.output_dir, "%s.%d.png" % (Stem, Num))
+            with open(Path, "wb") as fh:
+                fh.write(base64.b64decode(Image))
+            print(Path)
+    elif Args.op == "status":
+        print("Entries %d, %.1f of %.1f MiB, hits %d, misses %d" % (
+            Reply["entries"], Reply["used"] / 2**20, Reply["budget"] / 2**20, Reply["hits"], Reply["misses"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+TsbDaemon.py
+
+Run the local analysis daemon (see tsblog/daemon.py), which keeps
+recently used logs parsed, with their statistics and rendered figures,
+in an in-memory LRU cache, and answers TsbClient.py over a Unix domain
+socket:
+
+    python TsbDaemon.py --budget 4096 &
+    python TsbClient.py stats mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat
+    python TsbClient.py shutdown
+
+The daemon runs until a shutdown request or an interrupt, and removes
+its socket on exit.
+"""
+
+import argparse
+
+from tsblog.client import default_socket
+from tsblog.daemon import Budget, Dpi, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analysis daemon with an in-memory cache of parsed logs")
+    parser.add_argument("--socket", default=default_socket(), help="Unix socket to listen on (default: %(default)s)")
+    parser.add_argument("--budget", type=float, default=Budget / 2**20,
+                        help="memory budget of the cache, MiB (default: %(default)g)")
+    parser.add_argument("--dpi", type=int, default=Dpi, help="resolution of rendered figures (default: %(default)s)")
+    Args = parser.parse_args()
+
+    try:
+        serve(Args.socket, int(Args.budget * 2**20), Args.dpi,
+              ready=lambda Path: print("Listening on", Path, flush=True))
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as exc:
+        parser.exit(1, "%s\n" % exc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Shared pytest setup: the tests import tsblog from the repository root,
+as the scripts do, and build small synthetic logs.
+"""
+
+import os
+import sys
+
+import numpy
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsblog import amc
+from tsblog.loader import LogData
+
+
+def _amc_log(time, dmd_pos=None, pos=None, dmd_vel=None, state=None, rms=None, max_err=None, rotate=0):
+    """Return a synthetic AMC log (the LogData amc.load() gives) with the
+    given columns, zeros elsewhere, rotated by ``rotate`` samples as a
+    wrapped-around log is."""
+    time = numpy.asarray(time, dtype=numpy.float64)
+    Data = numpy.zeros((len(time), amc.ColNum - 2))
+    Data[:, amc.ColSecs] = time
+    for col, values in ((amc.ColDmdPos, dmd_pos), (amc.ColPos, pos), (amc.ColDmdVel, dmd_vel),
+                        (amc.ColState, state), (amc.ColRmsErr, rms), (amc.ColMaxErr, max_err)):
+        if values is not None:
+            Data[:, col] = values
+    Data[:, amc.ColTrackTimeSec] = numpy.floor(time)
+    Data[:, amc.ColTrackTimeNSec] = numpy.round((time - numpy.floor(time)) * 1e9)
+    Data = numpy.roll(Data, rotate, axis=0)
+    return LogData([Data[:, col].copy() for col in range(Data.shape[1])])
+
+
+@pytest.fixture
+def amc_log():
+    """The factory of synthetic AMC logs, see _amc_log()."""
+    return _amc_log
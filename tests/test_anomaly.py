@@ -0,0 +1,40 @@
+"""
+Robust outlier scan (tsblog/anomaly.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog.anomaly import robust_z, scan
+from tsblog.loader import LogData
+
+
+def _column(offset, samples=20000, seed=3):
+    """Noise of unit spread about ``offset`` with a slow ramp, and spikes
+    of 20 and -30 at known samples."""
+    x = offset + numpy.random.default_rng(seed).normal(size=samples) + numpy.arange(samples) * 1e-3
+    x[5000] += 20.0
+    x[12000:12003] -= 30.0
+    return x
+
+
+@pytest.mark.parametrize("offset", [0.0, 1.6e9, 1e9 + 0.5])
+def test_scan_large_offsets(offset):
+    # At 1e9 float32 values are 64 apart, so the unit noise and the spikes
+    # used to be quantised away
+    Time = numpy.arange(20000) * 0.01
+    Data = LogData([Time, _column(offset)])
+    anomalies = scan(Data, Time, [1], ["Time", "Pos"], window=1024, threshold=8.0)
+    assert sorted(anomalies["start"]) == pytest.approx([50.0, 120.0])
+    assert list(anomalies["samples"][numpy.argsort(anomalies["start"])]) == [1, 3]
+    assert anomalies["peak_z"].min() > 10.0
+    # Values and medians are reported exactly
+    peak = anomalies[numpy.argmin(anomalies["start"])]
+    assert peak["peak_value"] == _column(offset)[5000]
+    assert abs(peak["peak_value"] - peak["median"] - 20.0) < 5.0
+
+
+def test_robust_z_constant():
+    z, median = robust_z(numpy.full((2, 5000), 1.6e9))
+    assert not z.any()
+    assert (median == 1.6e9).all()
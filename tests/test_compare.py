@@ -0,0 +1,94 @@
+"""
+Before/after comparison of AMC logs (tsblog/compare.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog.compare import Signals, compare
+
+Period = 0.05
+
+
+def _track(t):
+    """A demanded position with a unique best alignment (mas)."""
+    return 15000.0 * t + 2e5 * numpy.sin(0.3 * t) + 5e4 * numpy.sin(1.7 * t + 0.4 * t * t / 100)
+
+
+def _log(amc_log, start=0.0, error=10.0, ripple=0.0, duration=100.0, rotate=0):
+    """A log ``start`` s along the track, with a position error of ``error``
+    plus a ripple that follows the track, so misaligned logs differ."""
+    t = start + numpy.arange(0.0, duration, Period)
+    dmd = _track(t)
+    pos = dmd - error - ripple * numpy.sin(t)
+    return amc_log(t - start + 1.6e9, dmd_pos=dmd, pos=pos, rms=numpy.full(len(t), error),
+                   max_err=numpy.full(len(t), 2 * error), rotate=rotate)
+
+
+def test_identical_logs(amc_log):
+    result = compare(_log(amc_log), _log(amc_log), align=True)
+    assert result["shift"] == pytest.approx(0.0, abs=Period / 10)
+    assert result["period"] == pytest.approx(Period)
+    for key, _, _ in Signals:
+        diff = result[key]["stats"]["diff"]
+        assert diff["max"] == pytest.approx(0.0, abs=1e-6), key
+
+
+def test_error_change(amc_log):
+    result = compare(_log(amc_log, error=10.0), _log(amc_log, error=25.0), align=False)
+    stats = result["pos_err"]["stats"]
+    assert stats["before"]["mean"] == pytest.approx(10.0)
+    assert stats["after"]["mean"] == pytest.approx(25.0)
+    assert stats["diff"]["mean"] == pytest.approx(15.0)
+    assert stats["diff"]["rms"] == pytest.approx(15.0)
+    assert result["rms_err"]["stats"]["diff"]["p95"] == pytest.approx(15.0)
+    assert result["max_err"]["stats"]["diff"]["max"] == pytest.approx(30.0)
+
+
+def test_alignment_of_wrapped_logs(amc_log):
+    # The after log starts 2 s further along the same track and is wrapped around
+    Before = _log(amc_log, ripple=5.0)
+    After = _log(amc_log, start=2.0, ripple=5.0, rotate=700)
+    result = compare(Before, After, align=True)
+    assert result["correlation"] > 0.95
+    # To within the sub-sample refinement of the correlation peak
+    assert result["shift"] == pytest.approx(-2.0, abs=Period / 2)
+    # Aligned, the demands agree, so the errors do too
+    assert result["pos_err"]["stats"]["diff"]["max"] < 0.5
+    # The shared span runs from the start of the after log to the end of the before one
+    assert result["grid"][0] == pytest.approx(2.0, abs=Period / 2)
+    assert result["grid"][-1] == pytest.approx(100.0 - Period, abs=Period)
+
+
+def test_unaligned_start_offset(amc_log):
+    result = compare(_log(amc_log, ripple=5.0), _log(amc_log, start=2.0, ripple=5.0), align=False)
+    assert result["shift"] == 0.0
+    # Both logs start at zero once normalized, so the grid spans a whole log
+    assert result["grid"][0] == 0.0
+    assert result["grid"][-1] == pytest.approx(100.0 - 2 * Period, abs=Period)
+    # Unaligned, the ripples are 2 s out of phase
+    assert result["pos_err"]["stats"]["diff"]["max"] > 5.0
+    assert result["torque"]["stats"]["diff"]["max"] == 0.0
+
+
+def test_alignment_off_by_default(amc_log):
+    result = compare(_log(amc_log, ripple=5.0), _log(amc_log, start=2.0, ripple=5.0))
+    assert result["shift"] == 0.0
+    assert numpy.isnan(result["correlation"])
+
+
+def test_alignment_bounded(amc_log):
+    # A 2 s offset is out of reach of a 1 s search, which then finds no
+    # good alignment rather than an arbitrary one
+    with pytest.raises(ValueError, match="correlate"):
+        compare(_log(amc_log, ripple=5.0), _log(amc_log, start=2.0, ripple=5.0), align=True, max_lag=1.0)
+
+
+def test_alignment_of_unrelated_logs(amc_log):
+    # Demands of different tracks are rejected, not shifted arbitrarily
+    Before = _log(amc_log)
+    t = numpy.arange(0.0, 100.0, Period)
+    noise = numpy.random.default_rng(2).normal(size=len(t)).cumsum() * 1e3
+    After = amc_log(t + 1.6e9, dmd_pos=15000.0 * t + noise, pos=15000.0 * t + noise - 10.0)
+    with pytest.raises(ValueError, match="same track"):
+        compare(Before, After, align=True)
@@ -0,0 +1,98 @@
+"""
+Run-length clamp event tables of STD torque extracts (tsblog/events.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog.events import TorqueColumns, aggregate, clamp_events, run_lengths, segment_max
+from tsblog.loader import LogData
+
+Period = 0.1
+
+
+@pytest.mark.parametrize("flag, starts, stops", [
+    ([], [], []),
+    ([0, 0, 0], [], []),
+    ([1, 1, 1], [0], [3]),
+    ([1, 0, 0, 1], [0, 3], [1, 4]),
+    ([0, 2, 2, 0, 1, 0], [1, 4], [3, 5]),
+    ([True, False, True, True], [0, 2], [1, 4]),
+    # A NaN (missing sample) is unset and ends a run
+    ([1.0, numpy.nan, 1.0, 1.0, 0.0], [0, 2], [1, 4]),
+    ([numpy.nan, numpy.nan], [], []),
+])
+def test_run_lengths(flag, starts, stops):
+    found = run_lengths(numpy.array(flag))
+    numpy.testing.assert_array_equal(found[0], starts)
+    numpy.testing.assert_array_equal(found[1], stops)
+
+
+def test_segment_max():
+    values = numpy.array([1.0, 5.0, 2.0, 9.0, 3.0, 4.0, 7.0])
+    numpy.testing.assert_array_equal(segment_max(values, numpy.array([0, 4]), numpy.array([2, 7])), [5.0, 7.0])
+    numpy.testing.assert_array_equal(segment_max(values, numpy.array([2]), numpy.array([3])), [2.0])
+    assert len(segment_max(values, numpy.array([], dtype=int), numpy.array([], dtype=int))) == 0
+
+
+def _extract(samples=100):
+    """Return a synthetic torque extract with clamp events at known places."""
+    Data = numpy.zeros((samples, 20))
+    Data[:, TorqueColumns.ColTime] = 1000.0 + numpy.arange(samples) * Period
+    Data[:, TorqueColumns.AXIS_TORQUE_DEMAND] = numpy.linspace(-50.0, 49.0, samples)
+    Data[:, TorqueColumns.MOTOR_1_MEASURED_TORQUE] = numpy.arange(samples) % 7
+    Data[:, TorqueColumns.MOTOR_2_MEASURED_TORQUE] = -numpy.arange(samples, dtype=float)
+    Data[10:15, TorqueColumns.AXIS_TORQUE_CLAMP_FLAG] = 1
+    Data[90:, TorqueColumns.AXIS_TORQUE_CLAMP_FLAG] = 1
+    Data[20, TorqueColumns.MOT1_TORQUE_CLAMP_FLAG] = 1
+    Data[40:50, TorqueColumns.MOT2_TORQUE_CLAMP_FLAG] = 1
+    Data[45, TorqueColumns.MOT2_TORQUE_CLAMP_FLAG] = numpy.nan
+    return LogData([Data[:, col].copy() for col in range(Data.shape[1])])
+
+
+def test_clamp_events():
+    events = clamp_events(_extract(), "night.dat")
+    assert list(events["flag"]) == ["axis", "motor1", "motor2", "motor2", "axis"]
+    numpy.testing.assert_allclose(events["start"], 1000.0 + numpy.array([10, 20, 40, 46, 90]) * Period)
+    numpy.testing.assert_allclose(events["end"], 1000.0 + numpy.array([14, 20, 44, 49, 99]) * Period)
+    numpy.testing.assert_allclose(events["duration"], numpy.array([4, 0, 4, 3, 9]) * Period)
+    numpy.testing.assert_array_equal(events["samples"], [5, 1, 5, 4, 10])
+    # Peaks are of absolute values
+    demand = numpy.linspace(-50.0, 49.0, 100)
+    numpy.testing.assert_allclose(events["peak_axis_demand"],
+                                  [abs(demand[10]), abs(demand[20]), abs(demand[40]), abs(demand[46]), demand[99]])
+    numpy.testing.assert_array_equal(events["peak_motor1_measured"], [6, 6, 6, 6, 6])
+    numpy.testing.assert_array_equal(events["peak_motor2_measured"], [14, 20, 44, 49, 99])
+    assert set(events["file"]) == {"night.dat"}
+
+
+def test_clamp_events_long_path():
+    # Paths are kept whole, however long
+    path = "/data/" + "x" * 300 + "/torque.dat"
+    events = clamp_events(_extract(), path)
+    assert all(name == path for name in events["file"])
+
+
+def test_clamp_events_none():
+    Data = numpy.zeros((10, 20))
+    Data[:, TorqueColumns.ColTime] = numpy.arange(10.0)
+    events = clamp_events(LogData([Data[:, col].copy() for col in range(20)]), "quiet.dat")
+    assert len(events) == 0
+    assert aggregate(events) == {}
+
+
+def test_aggregate():
+    events = numpy.concatenate([clamp_events(_extract(), "a.dat"), clamp_events(_extract(), "b.dat")])
+    summary = aggregate(events)
+    assert sorted(summary) == ["axis", "motor1", "motor2"]
+    axis = summary["axis"]
+    assert axis["events"] == 4
+    assert axis["files"] == 2
+    assert axis["samples"] == 30
+    assert axis["total_duration"] == pytest.approx(2 * 13 * Period)
+    assert axis["mean_duration"] == pytest.approx(13 * Period / 2)
+    assert axis["max_duration"] == pytest.approx(9 * Period)
+    assert axis["peak_axis_demand"] == pytest.approx(49.0)
+    assert summary["motor1"]["events"] == 2
+    assert summary["motor1"]["total_duration"] == 0.0
+    assert summary["motor2"]["peak_motor2_measured"] == 49.0
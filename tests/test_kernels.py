@@ -0,0 +1,129 @@
+"""
+The NumPy, loop and (when numba is installed) compiled kernels give
+identical results, including on wrap-around and edge cases.
+"""
+
+import numpy
+import pytest
+
+from tsblog import kernels
+from tsblog.loader import LogData
+from tsblog.std import VelColumns, normalize_velocities
+
+nan = numpy.nan
+
+
+def _paths():
+    paths = {"numpy": kernels.numpy_kernels, "loop": kernels.loop_kernels}
+    compiled = kernels.compiled_kernels()
+    if compiled:
+        paths["numba"] = compiled
+    return paths
+
+
+def on_each_path(monkeypatch, call):
+    """Return ``{path: call()}`` with every kernel set selected in turn."""
+    results = {}
+    for name, chosen in _paths().items():
+        monkeypatch.setattr(kernels, "_kernel", lambda kernel, n, chosen=chosen: chosen[kernel])
+        results[name] = call()
+    return results
+
+
+def assert_identical(results):
+    (first, expected), *others = results.items()
+    for name, result in others:
+        if isinstance(expected, tuple):
+            assert len(result) == len(expected)
+            for got, want in zip(result, expected):
+                numpy.testing.assert_array_equal(got, want, err_msg="%s != %s" % (name, first))
+        else:
+            numpy.testing.assert_array_equal(result, expected, err_msg="%s != %s" % (name, first))
+    return expected
+
+
+@pytest.mark.parametrize("time, expected", [
+    ([], 0),
+    ([5.0], 0),
+    ([1.0, 2.0, 3.0], 0),
+    ([1.0, 1.0, 1.0], 0),
+    ([3.0, 4.0, 1.0, 2.0], 2),
+    ([1.0, 2.0, 3.0, 0.0], 3),
+    ([2.0, 1.0, 3.0, 0.0, 5.0], 3),
+])
+def test_wrap_index(monkeypatch, time, expected):
+    results = on_each_path(monkeypatch, lambda: kernels.wrap_index(numpy.array(time)))
+    assert assert_identical(results) == expected
+
+
+@pytest.mark.parametrize("state, expected", [
+    ([], []),
+    ([4], []),
+    ([1, 1, 1], []),
+    ([1, 1, 2, 2], [0, 2]),
+    ([2, 1, 1, 2], [1, 3]),
+    ([1, 2, 1, 2], [0, 1, 2, 3]),
+])
+def test_state_changes(monkeypatch, state, expected):
+    results = on_each_path(monkeypatch, lambda: kernels.state_changes(numpy.array(state, dtype=numpy.int8)))
+    numpy.testing.assert_array_equal(assert_identical(results), expected)
+
+
+@pytest.mark.parametrize("x, filled, adj", [
+    ([], [], 0.0),
+    ([1.0, 2.0, 3.0], [1.0, 2.0, 3.0], 1.0),
+    ([0.0, 0.0, 3.0, nan, 4.0], [0.0, 0.0, 3.0, 3.0, 4.0], 3.0),
+    # Leading NaNs take the last sample, as Data[i - 1] did in the scripts
+    ([nan, nan, 2.0, nan, 5.0], [5.0, 5.0, 2.0, 2.0, 5.0], 2.0),
+    ([nan, 1.0, nan, nan], [nan, 1.0, 1.0, 1.0], 1.0),
+    ([nan, nan, nan], [nan, nan, nan], 0.0),
+    ([0.0, nan, 0.0], [0.0, 0.0, 0.0], 0.0),
+])
+def test_fill_forward(monkeypatch, x, filled, adj):
+    results = on_each_path(monkeypatch, lambda: kernels.fill_forward(numpy.array(x)))
+    got_filled, got_adj = assert_identical(results)
+    numpy.testing.assert_array_equal(got_filled, filled)
+    assert got_adj == adj
+
+
+@pytest.mark.parametrize("initial", [False, True])
+def test_hysteresis(monkeypatch, initial):
+    x = numpy.array([0.5, 2.0, 1.5, 0.5, 1.5, -1.0, 3.0, nan, 0.0])
+    results = on_each_path(monkeypatch, lambda: kernels.hysteresis(x, 2.0, 0.0, initial))
+    expected = [initial, True, True, True, True, False, True, True, False]
+    numpy.testing.assert_array_equal(assert_identical(results), expected)
+
+
+def test_random_inputs(monkeypatch):
+    rng = numpy.random.default_rng(1)
+    x = rng.normal(size=5000)
+    x[rng.random(5000) < 0.2] = nan
+    x[:3] = nan
+    time = numpy.roll(numpy.arange(5000.0), 1234)
+    state = rng.integers(0, 3, size=5000).astype(numpy.int8)
+    assert_identical(on_each_path(monkeypatch, lambda: kernels.fill_forward(x)))
+    assert assert_identical(on_each_path(monkeypatch, lambda: kernels.wrap_index(time))) == 1234
+    assert_identical(on_each_path(monkeypatch, lambda: kernels.state_changes(state)))
+    assert_identical(on_each_path(monkeypatch, lambda: kernels.hysteresis(x, 1.0, -1.0)))
+
+
+def _velocity_extract(rng, n=2000):
+    columns = [numpy.arange(n) * 0.05] + [rng.normal(size=n) for _ in range(14)]
+    for brake, pos, _ in VelColumns.Axes:
+        columns[brake] = rng.integers(0, 2, size=n).astype(numpy.float64)
+        columns[pos] = numpy.cumsum(rng.normal(size=n)) + 1000.0
+        columns[brake][rng.random(n) < 0.1] = nan
+        columns[pos][rng.random(n) < 0.1] = nan
+    # Leading gaps exercise the wrap to the last sample
+    columns[VelColumns.ColAzmPos][:5] = nan
+    columns[VelColumns.ColAltBrake][:3] = nan
+    return LogData(columns)
+
+
+def test_normalize_velocities(monkeypatch):
+    Data = _velocity_extract(numpy.random.default_rng(2))
+    results = on_each_path(monkeypatch, lambda: numpy.asarray(normalize_velocities(Data)))
+    Normalized = assert_identical(results)
+    for brake, pos, vel in VelColumns.Axes:
+        assert Normalized[0, vel] == 0
+        assert not numpy.isnan(Normalized[1:, pos]).any()
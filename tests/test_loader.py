@@ -0,0 +1,127 @@
+"""
+Compact column storage of parsed logs (tsblog/loader.py): every value
+must come back exactly as a plain float64 parse gives it.
+"""
+
+import numpy
+import pytest
+
+from tsblog import loader
+from tsblog.loader import LogData, _join, _wide, compact, parse_log
+
+Rng = numpy.random.default_rng(7)
+
+
+def _parsed(text_values):
+    """Return the float64 values numpy parses from formatted strings."""
+    return numpy.array([float(v) for v in text_values])
+
+
+# (values as logged, expected dtype, expected scale)
+Columns = {
+    "flag": (["%d" % v for v in Rng.integers(0, 2, 1000)], numpy.int8, None),
+    "state": (["%d" % v for v in Rng.integers(-300, 300, 1000)], numpy.int16, None),
+    "nsec": (["%d" % v for v in Rng.integers(0, 10 ** 9, 1000)], numpy.int32, None),
+    "mas": (["%d" % v for v in Rng.integers(0, 2 ** 40, 1000)], numpy.int64, None),
+    "volts": (["%.3f" % v for v in Rng.uniform(-10, 10, 1000)], numpy.int16, 1000),
+    "torque": (["%.2f" % v for v in Rng.uniform(-5e4, 5e4, 1000)], numpy.int32, 100),
+    "half": (["%g" % v for v in Rng.integers(-64, 64, 1000) / 8], numpy.int16, 1000),
+    "float": (["%.17g" % v for v in Rng.normal(size=1000)], numpy.float64, None),
+    "single": ([repr(float(v)) for v in Rng.normal(size=1000).astype(numpy.float32)], numpy.float32, None),
+    "negzero": (["-0.000000", "1.5", "2.25"] * 10, numpy.float32, None),
+    "missing": (["nan", "1.25", "7"] * 10, numpy.float32, None),
+}
+
+
+@pytest.mark.parametrize("name", sorted(Columns))
+def test_compact_round_trip(name):
+    text, dtype, scale = Columns[name]
+    values = _parsed(text)
+    arr, found = compact(values)
+    assert arr.dtype == dtype
+    assert found == scale
+    wide = _wide(arr, found)
+    assert wide.dtype.kind in "if" and wide.dtype.itemsize == 8
+    numpy.testing.assert_array_equal(wide, values)
+    # -0.0 keeps its sign
+    assert numpy.array_equal(numpy.signbit(wide), numpy.signbit(values))
+
+
+def test_compact_empty():
+    arr, scale = compact(numpy.empty(0))
+    assert len(arr) == 0 and scale is None
+
+
+def _log_text(rows=2500):
+    """A tab-separated log with a heading line, and its float64 parse."""
+    names = sorted(Columns)
+    lines = ["\t".join(names) + "\n"]
+    for i in range(rows):
+        lines.append("\t".join(Columns[name][0][i % 30 if name in ("negzero", "missing") else i % 1000]
+                               for name in names) + "\n")
+    return lines, numpy.loadtxt(lines, dtype=float, skiprows=1, ndmin=2)
+
+
+@pytest.mark.parametrize("chunk_rows", [65536, 1000, 7])
+def test_parse_log_matches_loadtxt(monkeypatch, chunk_rows):
+    # Small chunks make every column go through _join()
+    monkeypatch.setattr(loader, "ChunkRows", chunk_rows)
+    lines, plain = _log_text()
+    Data = parse_log(lines, range(plain.shape[1]))
+    assert Data.shape == plain.shape
+    numpy.testing.assert_array_equal(numpy.asarray(Data), plain)
+    for col in range(plain.shape[1]):
+        numpy.testing.assert_array_equal(Data[:, col], plain[:, col])
+    # The storage is compact, though two of the columns need float64
+    assert Data.nbytes < 0.6 * plain.nbytes
+
+
+def test_indexing_widens():
+    lines, plain = _log_text(100)
+    Data = parse_log(lines, range(plain.shape[1]))
+    for col in range(plain.shape[1]):
+        stored = Data.columns[col].dtype
+        whole = Data[:, col]
+        assert whole.dtype == (numpy.int64 if stored.kind == "i" and not Data.scales[col] else numpy.float64)
+        numpy.testing.assert_array_equal(Data[col], plain[:, col])
+        numpy.testing.assert_array_equal(Data[10:20, col], plain[10:20, col])
+        # Scalars are Python numbers equal to the parsed value
+        value = Data[17, col]
+        assert isinstance(value, (int, float))
+        assert value == plain[17, col] or (numpy.isnan(value) and numpy.isnan(plain[17, col]))
+    # Arithmetic on an integer column does not wrap in its narrow dtype
+    flag = sorted(Columns).index("flag")
+    assert Data.columns[flag].dtype == numpy.int8
+    assert (Data[:, flag] * 1000).max() == 1000
+
+
+@pytest.mark.parametrize("chunks", [
+    # Integer chunks of different widths
+    [numpy.arange(10.0), numpy.arange(10.0) * 1e6, -numpy.arange(1.0, 4.0)],
+    # Fixed point at different scales
+    [numpy.array([0.5, 1.25]), numpy.array([0.125, 2.0]), numpy.array([3.1])],
+    # Fixed point and integers
+    [numpy.array([1.5, 2.5]), numpy.array([100000.0, 7.0])],
+    # Integers and float32
+    [numpy.arange(5.0) + 2 ** 30, numpy.array([0.5, 0.25], dtype=numpy.float32).astype(float)],
+    # Fixed point and values needing float64
+    [numpy.array([0.01, 0.02]), numpy.array([0.1 + 0.2, numpy.pi])],
+    # NaN and -0.0 in one chunk only
+    [numpy.array([1.0, numpy.nan]), numpy.array([-0.0, 3.0]), numpy.array([0.001, 12.0])],
+])
+def test_join_mixed_chunks(chunks):
+    arr, scale = _join([compact(chunk) for chunk in chunks])
+    plain = numpy.concatenate(chunks)
+    wide = _wide(arr, scale)
+    numpy.testing.assert_array_equal(wide, plain)
+    assert numpy.array_equal(numpy.signbit(wide), numpy.signbit(plain))
+
+
+def test_setitem_keeps_values():
+    Data = LogData(*zip(*[compact(numpy.array([1.0, 2.0, 3.0])), compact(numpy.array([0.5, 0.25, 0.125]))]))
+    # A value the narrow column cannot hold promotes it
+    Data[1, 0] = 2.5
+    Data[:, 1] = numpy.array([1e-9, 2.0, 3.0])
+    numpy.testing.assert_array_equal(Data[:, 0], [1.0, 2.5, 3.0])
+    numpy.testing.assert_array_equal(Data[:, 1], [1e-9, 2.0, 3.0])
+    assert Data.scales[1] is None
@@ -0,0 +1,87 @@
+"""
+Time-aligned merge of per-axis AMC logs (tsblog/merge.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog import amc
+from tsblog.loader import LogData, compact
+from tsblog.merge import asof_index, merge_axes
+
+
+def _brute_force(time, other, tolerance, direction):
+    index = []
+    for t in time:
+        if direction == "backward":
+            candidates = [i for i, o in enumerate(other) if o <= t]
+            best = candidates[-1] if candidates else -1
+        else:
+            best = int(numpy.argmin(numpy.abs(numpy.asarray(other) - t))) if len(other) else -1
+        index.append(best if best >= 0 and abs(t - other[best]) <= tolerance else -1)
+    return index
+
+
+@pytest.mark.parametrize("direction", ["nearest", "backward"])
+def test_asof_index_matches_brute_force(direction):
+    rng = numpy.random.default_rng(4)
+    time = numpy.sort(rng.uniform(0, 100, 300))
+    other = numpy.sort(rng.uniform(5, 95, 200))
+    got = asof_index(time, other, 0.4, direction)
+    numpy.testing.assert_array_equal(got, _brute_force(time, other, 0.4, direction))
+
+
+def test_asof_index_edges():
+    numpy.testing.assert_array_equal(asof_index([1.0, 2.0], [], 1.0), [-1, -1])
+    # Before the first and after the last entry
+    numpy.testing.assert_array_equal(asof_index([0.0, 10.0], [1.0, 2.0], 1.0), [0, -1])
+    numpy.testing.assert_array_equal(asof_index([0.0, 2.5], [1.0, 2.0], 1.0, "backward"), [-1, 1])
+    # Ties go to the earlier entry
+    numpy.testing.assert_array_equal(asof_index([1.5], [1.0, 2.0], 1.0), [0])
+    with pytest.raises(ValueError):
+        asof_index([1.0], [1.0], 1.0, "forward")
+
+
+def test_merge_axes(amc_log):
+    Period = 0.05
+    t = 1.6e9 + numpy.arange(400) * Period
+    Azm = amc_log(t, dmd_pos=numpy.arange(400.0), rotate=123)
+    # The altitude log is sampled a little later and misses a stretch of samples
+    keep = numpy.ones(400, dtype=bool)
+    keep[100:110] = False
+    Alt = amc_log(t[keep] + 0.2 * Period, dmd_pos=-numpy.arange(400.0)[keep], rotate=50)
+    # A fixed-point column keeps its scale where nothing is missing
+    counts, scale = compact(numpy.round(numpy.linspace(0.1, 40.0, 400), 1))
+    Azm.columns[amc.ColRmsErr], Azm.scales[amc.ColRmsErr] = numpy.roll(counts, 123), scale
+    headings = [["H%d " % c for c in range(amc.ColNum - 2)]] * 2
+
+    Merged = merge_axes([("azm", Azm), ("alt", Alt)], headings, columns=[amc.ColDmdPos, amc.ColRmsErr])
+
+    assert Merged.headings == ["time", "azm:H4", "azm:H13", "alt:H4", "alt:H13"]
+    assert isinstance(Merged, LogData)
+    numpy.testing.assert_array_equal(Merged[:, 0], t)
+    numpy.testing.assert_array_equal(Merged[:, 1], numpy.arange(400.0))
+    assert Merged.scales[2] == scale
+    numpy.testing.assert_array_equal(Merged[:, 2], numpy.round(numpy.linspace(0.1, 40.0, 400), 1))
+    expected = -numpy.arange(400.0)
+    expected[100:110] = numpy.nan
+    numpy.testing.assert_array_equal(Merged[:, 3], expected)
+
+
+def test_merge_axes_direction_and_tolerance(amc_log):
+    t = numpy.arange(100) * 1.0
+    Ref = amc_log(t, dmd_pos=t)
+    # Samples 0.3 s after the reference ones; the default tolerance is 0.5 s
+    Other = amc_log(t + 0.3, dmd_pos=t + 0.3)
+    logs = [("a", Ref), ("b", Other)]
+
+    nearest = merge_axes(logs, columns=[amc.ColDmdPos])
+    assert nearest.headings == ["time", "a:Col4", "b:Col4"]
+    numpy.testing.assert_array_equal(nearest[:, 2], t + 0.3)
+
+    # The latest sample not after each reference time is 0.7 s before it
+    backward = merge_axes(logs, columns=[amc.ColDmdPos], direction="backward")
+    assert numpy.isnan(backward[:, 2]).all()
+    wide = merge_axes(logs, columns=[amc.ColDmdPos], tolerance=1.0, direction="backward")
+    assert numpy.isnan(wide[0, 2])
+    numpy.testing.assert_array_equal(wide[1:, 2], (t + 0.3)[:-1])
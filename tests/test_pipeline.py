@@ -0,0 +1,29 @@
+"""
+Pipelined batch driver (tsblog/pipeline.py).
+"""
+
+import numpy
+
+from tsblog.pipeline import envelope
+
+
+def test_envelope_keeps_excursions():
+    Time = numpy.arange(100003) * 0.01
+    values = numpy.sin(Time)
+    values[12345] = 50.0
+    values[99999] = -50.0
+    t, y = envelope(Time, values, width=1000)
+    # Two points (min, max) per bin of 101 samples, the last one partial
+    assert len(t) == len(y) == 2 * 991
+    assert y.max() == 50.0 and y.min() == -50.0
+    assert t[0] == (Time[0] + Time[100]) / 2 and t[-1] == (Time[99990] + Time[-1]) / 2
+    numpy.testing.assert_array_equal(y[::2], numpy.fmin.reduceat(values, numpy.arange(0, len(values), 101)))
+
+
+def test_envelope_short():
+    # Fewer than two samples per bin are returned as they are
+    Time = numpy.arange(10.0)
+    t, y = envelope(Time, Time * 2, width=10)
+    numpy.testing.assert_array_equal(t, Time)
+    numpy.testing.assert_array_equal(y, Time * 2)
+    assert len(envelope(numpy.empty(0), numpy.empty(0))[0]) == 0
@@ -0,0 +1,108 @@
+"""
+Mergeable t-digest quantile sketches (tsblog/sketch.py).
+"""
+
+import os
+
+import numpy
+import pytest
+
+from tsblog import amc, sketch
+from tsblog.sketch import TDigest, ensure_sketches, sketch_path
+
+Quantiles = numpy.array([0.01, 0.5, 0.9, 0.95, 0.99, 0.999])
+
+
+def _errors(seed, n=48000):
+    """Heavy-tailed |errors|, like tracking errors."""
+    return numpy.abs(numpy.random.default_rng(seed).standard_t(3, size=n)) * 20.0
+
+
+def _rank_error(digest, values):
+    estimate = digest.quantile(Quantiles)
+    return numpy.abs(numpy.searchsorted(numpy.sort(values), estimate) / len(values) - Quantiles)
+
+
+def test_quantile_accuracy():
+    values = _errors(1)
+    digest = TDigest.from_values(values)
+    assert digest.count == len(values)
+    assert len(digest.means) < sketch.Compression
+    # The documented accuracy: p99 and p99.9 within 0.01% in rank
+    assert _rank_error(digest, values).max() < 1e-4
+    numpy.testing.assert_allclose(digest.quantile(Quantiles[-2:]), numpy.quantile(values, Quantiles[-2:]), rtol=0.02)
+
+
+def test_merge_matches_whole():
+    parts = [_errors(seed, 20000) * (1 + seed % 3) for seed in range(12)]
+    values = numpy.concatenate(parts)
+    digests = [TDigest.from_values(p) for p in parts]
+    merged = digests[0].merge(*digests[1:])
+    assert merged.count == len(values)
+    assert merged.min == values.min() and merged.max == values.max()
+    assert _rank_error(merged, values).max() < 1e-4
+    # Merging in another order and grouping gives the same estimates, to the same accuracy
+    regrouped = digests[7].merge(*digests[8:]).merge(digests[3].merge(*digests[:3]), *digests[4:7])
+    assert _rank_error(regrouped, values).max() < 1e-4
+
+
+def test_extremes_nan_and_empty():
+    digest = TDigest.from_values([3.0, numpy.nan, 1.0, 2.0, numpy.nan])
+    assert digest.count == 3
+    assert digest.quantile(0.0) == 1.0
+    assert digest.quantile(1.0) == 3.0
+    assert digest.quantile(0.5) == 2.0
+    empty = TDigest.from_values([numpy.nan])
+    assert numpy.isnan(empty.quantile(0.5))
+    assert numpy.isnan(empty.quantile([0.5, 0.9])).all()
+    assert digest.merge(empty).count == 3
+
+
+def test_arrays_round_trip():
+    digest = TDigest.from_values(_errors(2, 5000))
+    restored = TDigest.from_arrays(digest.to_arrays("x"), "x")
+    numpy.testing.assert_array_equal(restored.quantile(Quantiles), digest.quantile(Quantiles))
+
+
+def _write_amc_text(path, Data):
+    """Write LogData as a tab-separated AMC text log."""
+    Values = numpy.asarray(Data)
+    with open(path, "w") as fh:
+        fh.write("\t".join(["Date", "Clock"] + ["Col%d (u)" % c for c in range(Values.shape[1])]) + "\n")
+        for row in Values:
+            fh.write("\t".join(["2021-10-06", "20:55:00"] + ["%r" % float(v) for v in row]) + "\n")
+
+
+def test_ensure_sketches_caches_and_rebuilds(tmp_path, amc_log, monkeypatch):
+    t = numpy.arange(2000) * 0.0025
+    rms = _errors(3, 2000)
+    path = str(tmp_path / "mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat")
+    _write_amc_text(path, amc_log(t, dmd_pos=numpy.zeros(2000), pos=-rms, rms=rms, max_err=2 * rms))
+
+    first = ensure_sketches(path)
+    assert os.path.exists(sketch_path(path))
+    assert first["rms_err"].quantile(1.0) == rms.max()
+    assert first["pos_err"].quantile(0.0) == rms.min()
+    stored = os.stat(sketch_path(path)).st_mtime_ns
+
+    # Unchanged, the stored sketches are read back
+    again = ensure_sketches(path)
+    assert os.stat(sketch_path(path)).st_mtime_ns == stored
+    numpy.testing.assert_array_equal(again["max_err"].means, first["max_err"].means)
+
+    # Sketches built with another compression are rebuilt
+    monkeypatch.setattr(sketch, "Compression", 100)
+    coarse = ensure_sketches(path)
+    assert coarse["rms_err"].count == 2000
+
+    # So are those of a changed log
+    _write_amc_text(path, amc_log(t[:1000], rms=rms[:1000]))
+    assert ensure_sketches(path)["rms_err"].count == 1000
+
+
+def test_metrics_follow_columns(amc_log):
+    t = numpy.arange(10.0)
+    Data = amc_log(t, dmd_pos=t * 3, pos=t, rms=t + 1, max_err=t + 2)
+    sketches = sketch.sketch_log(Data)
+    assert sketches["rms_err"].quantile(1.0) == Data[:, amc.ColRmsErr].max()
+    assert sketches["pos_err"].quantile(1.0) == 18.0
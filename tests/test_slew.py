@@ -0,0 +1,102 @@
+"""
+Slew detection and settling times of AMC logs (tsblog/slew.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog import amc
+from tsblog.slew import SlewVelocity, aggregate, settle_field, settling_times, slews
+
+Period = 0.01
+Sidereal = 15000.0
+
+
+def test_settling_times():
+    Time = numpy.arange(10.0)
+    Error = numpy.array([5, 3, 1, 4, 1, 0, 0, 9, 0, 0], dtype=float)
+    starts = numpy.array([0, 5, 6, 7])
+    stops = numpy.array([5, 7, 8, 10])
+    # Run 0 settles after its last violation (sample 3), run 1 is within
+    # from the start, run 2 ends outside the threshold, run 3 settles at 8
+    numpy.testing.assert_array_equal(settling_times(Time, Error, 2.0, starts, stops), [4.0, 0.0, numpy.nan, 1.0])
+
+
+def _night(amc_log, error_scale=5000.0, tau=1.0, slew_deg=5.0, rate=2.0, rotate=0):
+    """Track, slew ``slew_deg`` degrees at ``rate`` deg/s, track with a
+    decaying position error, slew back and track again."""
+    t = numpy.arange(0.0, 200.0, Period)
+    velocity = numpy.full(len(t), Sidereal)
+    slewing = rate * amc.MasPerDeg
+    duration = slew_deg / rate
+    first = (t >= 20.0) & (t < 20.0 + duration)
+    second = (t >= 100.0) & (t < 100.0 + duration)
+    velocity[first] += slewing
+    velocity[second] -= slewing
+    dmd = numpy.cumsum(velocity) * Period
+    # The axis lags behind the demand after each slew, the error decaying with ``tau``
+    error = numpy.zeros(len(t))
+    for start, end, sign in ((20.0 + duration, 100.0, 1.0), (100.0 + duration, t[-1] + 1, -1.0)):
+        after = (t >= start) & (t < end)
+        error[after] = sign * error_scale * numpy.exp(-(t[after] - start) / tau)
+    state = numpy.where(first | second, 3, 4)
+    return amc_log(t + 1.6e9, dmd_pos=dmd, pos=dmd - error, dmd_vel=velocity, state=state,
+                   rms=numpy.abs(error), rotate=rotate)
+
+
+def test_slews(amc_log):
+    table = slews(amc.normalize(_night(amc_log, rotate=4321))[0], "night.dat", thresholds=(1000.0, 100.0))
+    assert len(table) == 2
+    assert list(table["file"]) == ["night.dat", "night.dat"]
+    numpy.testing.assert_allclose(table["start"], [20.0, 100.0], atol=1.5 * Period)
+    numpy.testing.assert_allclose(table["duration"], [2.5, 2.5], atol=1.5 * Period)
+    # 5 degrees plus or minus the sidereal motion over the slew, to a sample
+    numpy.testing.assert_allclose(table["distance"], [5.0 * amc.MasPerDeg + 2.5 * Sidereal,
+                                                      5.0 * amc.MasPerDeg - 2.5 * Sidereal],
+                                  atol=2.0 * amc.MasPerDeg * Period)
+    numpy.testing.assert_array_equal(table["from_state"], [3, 3])
+    numpy.testing.assert_array_equal(table["to_state"], [4, 4])
+    numpy.testing.assert_allclose(table["peak_demand_vel"], [2 * amc.MasPerDeg + Sidereal, 2 * amc.MasPerDeg - Sidereal])
+    # An exponential decay from 5000 mas crosses 1000 and 100 mas at tau * ln(5000 / threshold)
+    for channel in ("pos", "rms"):
+        numpy.testing.assert_allclose(table[settle_field(channel, 1000.0)], numpy.log(5.0), atol=1.5 * Period)
+        numpy.testing.assert_allclose(table[settle_field(channel, 100.0)], numpy.log(50.0), atol=1.5 * Period)
+    # The axis lags, never running past the demand
+    numpy.testing.assert_array_equal(table["overshoot"], [0.0, 0.0])
+
+
+def test_overshoot_and_unsettled(amc_log):
+    # Running past the demand: the error has the other sign, and never settles within the horizon
+    table = slews(amc.normalize(_night(amc_log, error_scale=-5000.0, tau=1e4))[0], horizon=30.0)
+    numpy.testing.assert_allclose(table["overshoot"], 5000.0, rtol=1e-3)
+    assert numpy.isnan(table[settle_field("pos", 100.0)]).all()
+    summary = aggregate(table)
+    assert summary["slews"] == 2
+    assert summary[settle_field("pos", 100.0) + "_unsettled"] == 2
+    assert numpy.isnan(summary[settle_field("pos", 100.0) + "_median"])
+
+
+def test_threshold_and_state_filters(amc_log):
+    NewData, _ = amc.normalize(_night(amc_log))
+    # 2 deg/s slews are missed above that velocity
+    assert len(slews(NewData, slew_velocity=2.5 * amc.MasPerDeg)) == 0
+    assert SlewVelocity < 2 * amc.MasPerDeg
+    assert len(slews(NewData, slew_states=[3], track_states=[4])) == 2
+    assert len(slews(NewData, slew_states=[5])) == 0
+    # Tracking in a state never logged after a slew: no tracking, no slew
+    assert len(slews(NewData, track_states=[7])) == 0
+
+
+def test_aggregate(amc_log):
+    NewData, _ = amc.normalize(_night(amc_log))
+    long_name = "/data/" + "x" * 300 + "/night.dat"
+    table = numpy.concatenate([slews(NewData, "a.dat"), slews(NewData, long_name)])
+    # File names are kept whole
+    assert table["file"][-1] == long_name
+    summary = aggregate(table)
+    assert summary["slews"] == 4
+    assert summary["files"] == 2
+    assert summary["mean_duration"] == pytest.approx(2.5, abs=1.5 * Period)
+    empty = aggregate(table[:0])
+    assert empty["slews"] == 0 and empty["files"] == 0
+    assert numpy.isnan(empty["mean_duration"])
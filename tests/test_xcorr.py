@@ -0,0 +1,66 @@
+"""
+Lag and correlation by FFT cross-correlation (tsblog/xcorr.py).
+"""
+
+import numpy
+import pytest
+
+from tsblog.xcorr import MaxGapFraction, lag, sliding_lag
+
+Period = 0.01
+
+
+def _signals(delay=3, samples=5000, seed=1):
+    """Return smoothed noise and a copy delayed by ``delay`` samples."""
+    x = numpy.convolve(numpy.random.default_rng(seed).normal(size=samples + delay), numpy.ones(5) / 5, "same")
+    return x[delay:].copy(), x[:-delay].copy()
+
+
+def test_lag():
+    x, y = _signals()
+    found, corr = lag(x, y, Period, max_lag=0.2)
+    assert found == pytest.approx(3 * Period, abs=0.2 * Period)
+    assert corr > 0.99
+
+
+@pytest.mark.parametrize("max_lag", [None, 0.2])
+def test_lag_interpolates_gaps(max_lag):
+    # A NaN used to make every correlation NaN, reported as the edge of
+    # the search range
+    x, y = _signals()
+    x[100] = numpy.nan
+    y[2000:2010] = numpy.inf
+    found, corr = lag(x, y, Period, max_lag)
+    assert found == pytest.approx(3 * Period, abs=0.2 * Period)
+    assert corr > 0.99
+
+
+@pytest.mark.parametrize("x, y", [
+    (numpy.full(100, numpy.nan), numpy.arange(100.0)),
+    (numpy.arange(100.0), numpy.arange(100.0)),
+])
+def test_lag_undefined(x, y):
+    # All missing, or nothing left once detrended
+    assert numpy.isnan(lag(x, y, 1.0)).all()
+
+
+def test_lag_too_many_gaps():
+    x, y = _signals()
+    x[:int(len(x) * MaxGapFraction) + 1] = numpy.nan
+    assert numpy.isnan(lag(x, y, Period, 0.2)).all()
+    x[0] = 0.0
+    assert numpy.isfinite(lag(x, y, Period, 0.2)).all()
+
+
+def test_sliding_lag_gaps():
+    x, y = _signals()
+    x[2000:2600] = numpy.nan
+    Time = numpy.arange(len(x)) * Period
+    centres, lags, corrs = sliding_lag(Time, x, y, 5.0, max_lag=0.2)
+    # The windows of 500 samples stepped by 250 that overlap the gap by
+    # more than MaxGapFraction have no lag; the others find it
+    starts = numpy.arange(len(lags)) * 250
+    overlap = numpy.minimum(starts + 500, 2600) - numpy.maximum(starts, 2000)
+    gappy = overlap > MaxGapFraction * 500
+    assert numpy.isnan(lags[gappy]).all() and numpy.isnan(corrs[gappy]).all()
+    numpy.testing.assert_allclose(lags[~gappy], 3 * Period, atol=0.2 * Period)
@@ -0,0 +1,12 @@
+"""
+tsblog
+
+The TSB log analysis library behind AmcLog.py, SifMirrorLog.py and the
+Std* scripts, which are thin command-line wrappers around it.
+
+Importing it has no side effects: nothing reads sys.argv, loads
+matplotlib or touches files. The per-log-type modules (amc, mirror, std)
+load logs and take and return arrays, and plots draws the scripts'
+figures from those arrays, so one loaded log can go through many
+analyses without being read again.
+"""
@@ -0,0 +1,133 @@
+"""
+amc.py
+
+Column layout, loading, normalization and summary statistics of AMC
+servo logs, as reported by AmcLog.py.
+
+Everything here takes and returns arrays (LogData), so an already loaded
+log can go through any number of analyses without being read again;
+tsblog.plots draws AmcLog.py's figures from the same arrays.
+"""
+
+import numpy
+
+from tsblog.kernels import state_changes, wrap_index
+from tsblog.loader import load_log
+from tsblog.xcorr import lag, sample_period
+
+# Define milli-arcseconds per degree
+MasPerDeg = 3600000
+
+# Definearcseconds per degree
+AsPerDeg = 3600
+
+# Define milli-arcseconds per arcsecond
+MasPerAs = 1000
+
+# Define nano-seconds per second
+NSecPerSec = 1000000000
+
+# Define milliseconds per second
+MSecPerSec = 1000
+
+# Definition of useful columns in AMC log
+ColSecs = 0
+ColState = 21
+ColDmdVel = 3
+ColDmdPos = 4
+ColPos = 5
+ColVel = 8
+ColMaxErr = 12
+ColRmsErr = 13
+ColTrackTimeSec = 14
+ColTrackTimeNSec = 15
+ColTgtPos = 16
+ColMotor1Pos = 6
+ColMotor2Pos = 7
+ColMotor1Vel = 9
+ColMotor2Vel = 10
+
+ColDmdTrq = 29
+ColTrqCor = 17
+ColTrqPre = 18
+ColTrqPost = 19
+
+ColPeriod = 23
+ColLatency = 32
+
+ColNum = 36
+
+
+def load(filename):
+    """Return the data columns of an AMC log (or its archive) as a LogData."""
+    return load_log(filename, usecols=range(2, ColNum))
+
+
+def summary(Data, Stats=None):
+    """Return the statistics AmcLog.py prints, as a flat dict.
+
+    ``Stats`` is the (Min, Max, Mean, Stdev) tuple from ``Data.stats()``,
+    computed here if not given.
+    """
+    Min, Max, Mean, Stdev = Stats if Stats is not None else Data.stats()
+    result = {"samples": len(Data)}
+    for name, col in (("pos", ColPos), ("vel", ColVel)):
+        result[name + "_min"] = float(Min[col])
+        result[name + "_max"] = float(Max[col])
+        result[name + "_mean"] = float(Mean[col])
+        result[name + "_stdev"] = float(Stdev[col])
+    # Mean RMS over the second half of samples (assume tracking by then)
+    result["mean_rms_second_half"] = float(numpy.mean(Data[int(len(Data) / 2):len(Data) + 1, ColRmsErr]))
+    # Mean RMS over the final quarter of samples (must be tracking by then)
+    result["mean_rms_final_quarter"] = float(numpy.mean(Data[int(len(Data) / 4 * 3):len(Data) + 1, ColRmsErr]))
+    return result
+
+
+def time_order(Data):
+    """Return a copy of the log rotated to start where its time wraps around."""
+    return Data.take((numpy.arange(len(Data)) + wrap_index(Data[:, ColSecs])) % len(Data))
+
+
+def normalize(Data):
+    """Return ``(NewData, TrackTime)`` for a log, as AmcLog.py derives them.
+
+    ``NewData`` is the log rotated into time order with the time axis
+    starting at zero and the motor positions starting at zero;
+    ``TrackTime`` is the time axis of the time-stamped track demands,
+    clamped at zero.
+    """
+    # Take a copy of the data, rotated to start where the wrap-around is
+    NewData = time_order(Data)
+
+    # Now remove the time offset
+    Offset = NewData[0, ColSecs]
+    NewData[:, ColSecs] = NewData[:, ColSecs] - Offset
+
+    # Determine an adjusted time axis for time-stamped track demands
+    TrackTime = (NewData[:, ColTrackTimeSec]) + (NewData[:, ColTrackTimeNSec] / NSecPerSec) - Offset
+    TrackTime[TrackTime < 0] = 0
+
+    # Start the motor positions at zero
+    NewData[:, ColMotor1Pos] = NewData[:, ColMotor1Pos] - NewData[0, ColMotor1Pos]
+    NewData[:, ColMotor2Pos] = NewData[:, ColMotor2Pos] - NewData[0, ColMotor2Pos]
+    return NewData, TrackTime
+
+
+def position_error(NewData):
+    """Return the per-cycle position error, demanded minus actual (mas)."""
+    return NewData[:, ColDmdPos] - NewData[:, ColPos]
+
+
+def position_lag(NewData, max_lag=1.0):
+    """Return ``(lag, correlation)`` from the demanded to the actual position."""
+    return lag(NewData[:, ColDmdPos], NewData[:, ColPos], sample_period(NewData[:, ColSecs]), max_lag=max_lag)
+
+
+def state_transitions(NewData):
+    """Return ``(time, before, after)`` arrays of every change of state.
+
+    The first sample is compared with the last, as the log wraps around.
+    """
+    State = NewData[:, ColState]
+    index = state_changes(State)
+    return NewData[:, ColSecs][index], State[index - 1], State[index]
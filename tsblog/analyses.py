@@ -0,0 +1,91 @@
+"""
+analyses.py
+
+The independent per-log analyses LogAnalyse.py runs side by side on one
+parsed log (see shared.py), by log format.
+
+Each analysis is a function of the loaded LogData (plus fixed arguments)
+returning a flat dict of printable results, so it can run in any worker
+process and send back only its small result.
+"""
+
+from tsblog import amc, slew
+from tsblog.anomaly import scan
+from tsblog.events import aggregate, clamp_events
+from tsblog.sketch import sketch_log
+from tsblog.xcorr import DefaultPairs, lag, sample_period
+
+
+def _time_order(Data, fmt):
+    """Return ``(Time, Data)`` in time order (AMC logs wrap around)."""
+    if fmt == "amc":
+        Data = amc.time_order(Data)
+    return Data[:, 0], Data
+
+
+def position(Data):
+    """The position, velocity and RMS error statistics AmcLog.py prints."""
+    return amc.summary(Data)
+
+
+def lags(Data, fmt, max_lag=1.0):
+    """Lag and correlation of the default signal pairs of ``fmt``, as LagScan.py."""
+    Time, Data = _time_order(Data, fmt)
+    Period = sample_period(Time)
+    result = {}
+    for first, second in DefaultPairs[fmt]:
+        Lag, Corr = lag(Data[:, first], Data[:, second], Period, max_lag)
+        result["lag_%d_%d" % (first, second)] = Lag
+        result["corr_%d_%d" % (first, second)] = Corr
+    return result
+
+
+def quantiles(Data, percents=(50, 95, 99)):
+    """Percentiles of the AMC tracking errors (see sketch.py)."""
+    result = {}
+    for key, digest in sketch_log(Data).items():
+        for p, value in zip(percents, digest.quantile([p / 100.0 for p in percents])):
+            result["%s_p%g" % (key, p)] = float(value)
+    return result
+
+
+def anomalies(Data, fmt, rows=3):
+    """Count and top entries of the robust outlier scan (see anomaly.py)."""
+    Time, Data = _time_order(Data, fmt)
+    Found = scan(Data, Time - Time[0], list(range(1, Data.shape[1])), Data.headings)
+    result = {"anomalies": len(Found)}
+    for n, Row in enumerate(Found[:rows], 1):
+        result["anomaly_%d" % n] = "%s at %.3f s, z %.1f" % (Row["heading"], Row["start"], Row["peak_z"])
+    return result
+
+
+def slews(Data):
+    """Slew count and settling summary of an AMC log (see slew.py)."""
+    NewData, _ = amc.normalize(Data)
+    return slew.aggregate(slew.slews(NewData))
+
+
+def clamps(Data):
+    """Torque clamp event summary of an STD torque extract (see events.py)."""
+    result = {}
+    for flag, summary in aggregate(clamp_events(Data)).items():
+        for key, value in summary.items():
+            result["%s_%s" % (flag, key)] = value
+    return result
+
+
+# (function, args) of the analyses of each log format, by name
+Analyses = {
+    "amc": {
+        "position": (position, ()),
+        "lags": (lags, ("amc",)),
+        "quantiles": (quantiles, ()),
+        "anomalies": (anomalies, ("amc",)),
+        "slews": (slews, ()),
+    },
+    "std": {
+        "lags": (lags, ("std",)),
+        "clamps": (clamps, ()),
+        "anomalies": (anomalies, ("std",)),
+    },
+}
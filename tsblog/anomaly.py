@@ -0,0 +1,165 @@
+"""
+anomaly.py
+
+Robust outlier scan over every column of a log, for problems in columns
+nobody is plotting (the torque corrections of an AMC log, any of the
+STD latency columns...).
+
+Each column is compared with its rolling median, and the deviation is
+scaled by the rolling median absolute deviation (MAD) into a robust
+z-score, ``|x - median| / (1.4826 * MAD)``. The rolling statistics are
+taken over consecutive blocks of ``window`` samples (from every
+``Subsample``-th sample, which is plenty for a median) and linearly
+interpolated between block centres, so a group of columns is a few
+whole-array operations instead of a per-sample window.
+Runs of samples whose z-score exceeds the threshold are the anomalies,
+ranked by their peak z-score.
+
+Notes
+-----
+- Columns are processed ``ColumnBatch`` at a time, which bounds the
+  memory of the scan of a long log. Values and rolling medians stay
+  float64: AMC positions (about 1e9 mas) and time columns (about 1.6e9 s)
+  are 64-128 units apart in float32, which would quantise the deviations
+  away. Only the deviations, scales and z-scores are float32.
+- A block whose MAD is zero (a column that is mostly constant) uses the
+  column's typical MAD instead, or its standard deviation; constant
+  columns never score.
+- Anomaly tables are NumPy structured arrays, like the clamp event tables
+  of events.py.
+"""
+
+import warnings
+
+import numpy
+
+from tsblog.events import run_lengths, segment_max
+
+# Samples per block of the rolling median/MAD
+Window = 1024
+
+# Every Subsample-th sample of a block gives its median and MAD
+Subsample = 8
+
+# Robust z-score above which a sample is anomalous
+Threshold = 8.0
+
+# Columns scanned per 2-D operation
+ColumnBatch = 8
+
+# MAD of a normal distribution, in standard deviations
+_MadScale = 1.4826
+
+_AnomalyFields = [
+    ("column", "i8"),
+    ("heading", "U64"),
+    ("start", "f8"),
+    ("end", "f8"),
+    ("samples", "i8"),
+    ("peak_z", "f8"),
+    ("peak_value", "f8"),
+    ("median", "f8"),
+]
+
+
+def _block_stats(B, subsample):
+    """Return the median and MAD over the last axis of blocked ``B``,
+    from every ``subsample``-th sample."""
+    S = B[:, :, ::subsample]
+    reduce = numpy.nanmedian if numpy.isnan(S).any() else numpy.median
+    median = reduce(S, axis=2)
+    return median, reduce(numpy.abs(S - median[:, :, None]), axis=2)
+
+
+def _spread(stat, frac, half, out):
+    """Interpolate per-block ``stat`` between block centres into the samples
+    of blocked ``out``, ``frac`` being their offsets from the centre."""
+    prev = numpy.concatenate((stat[:, :1], stat[:, :-1]), axis=1)
+    after = numpy.concatenate((stat[:, 1:], stat[:, -1:]), axis=1)
+    out[:, :, :half] = stat[:, :, None] + frac[:half] * (stat - prev)[:, :, None]
+    out[:, :, half:] = stat[:, :, None] + frac[half:] * (after - stat)[:, :, None]
+
+
+def robust_z(X, window=Window, subsample=Subsample):
+    """Return ``(z, median)`` for the rows of 2-D ``X`` (one row per column).
+
+    ``z`` is the absolute robust z-score of every sample and ``median`` the
+    rolling median it was measured from.
+    """
+    X = numpy.asarray(X, dtype=numpy.float64)
+    rows, n = X.shape
+    window = max(min(window, n), 1)
+    blocks = n // window
+    full = blocks * window
+    B = X[:, :full].reshape(rows, blocks, window)
+    median, mad = _block_stats(B, max(min(subsample, window // 32), 1))
+    # Fall back to the typical MAD, then the standard deviation, for flat blocks
+    masked = numpy.where(mad > 0, mad, numpy.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        fallback = numpy.nanmedian(masked, axis=1)
+        flat = numpy.isnan(fallback)
+        if flat.any():
+            fallback[flat] = numpy.nanstd(X[flat], axis=1) / _MadScale
+    scale = numpy.where(mad > 0, mad, fallback[:, None]).astype(numpy.float32) * numpy.float32(_MadScale)
+
+    frac = ((numpy.arange(window) + 0.5) / window - 0.5).astype(numpy.float32)
+    half = int(numpy.searchsorted(frac, 0))
+    Median = numpy.empty_like(X)
+    _spread(median, frac, half, Median[:, :full].reshape(rows, blocks, window))
+    Scale = numpy.empty(X.shape, dtype=numpy.float32)
+    _spread(scale, frac, half, Scale[:, :full].reshape(rows, blocks, window))
+    # Samples after the last whole block use its statistics
+    Median[:, full:] = median[:, -1:]
+    Scale[:, full:] = scale[:, -1:]
+    with numpy.errstate(all="ignore"):
+        # The deviation is taken in float64 and only then rounded to float32
+        z = numpy.empty(X.shape, dtype=numpy.float32)
+        numpy.subtract(X, Median, out=z, casting="same_kind")
+        numpy.abs(z, out=z)
+        numpy.divide(z, Scale, out=z)
+    z[~numpy.isfinite(z)] = 0
+    return z, Median
+
+
+def _peak_index(z, starts, peaks):
+    """Return the index of the first sample of every run reaching its peak."""
+    above = numpy.flatnonzero(z >= numpy.min(peaks))
+    run = numpy.searchsorted(starts, above, side="right") - 1
+    # Every such sample is above the threshold, so inside a run
+    hit = z[above] == peaks[run]
+    _, first = numpy.unique(run[hit], return_index=True)
+    return above[hit][first]
+
+
+def scan(Data, Time, columns, headings=None, window=Window, threshold=Threshold, top=5):
+    """Return the anomalies of ``columns`` of ``Data`` as a structured array.
+
+    ``Time`` is the time of every sample (in time order), ``headings`` the
+    column names. Each anomaly is a run of samples of one column whose
+    robust z-score exceeds ``threshold``; at most ``top`` per column are
+    kept (all if None). The table is sorted by decreasing peak z-score.
+    """
+    Time = numpy.asarray(Time, dtype=numpy.float64)
+    Tables = []
+    for first in range(0, len(columns), ColumnBatch):
+        batch = columns[first:first + ColumnBatch]
+        X = numpy.stack([numpy.asarray(Data[:, col], dtype=numpy.float64) for col in batch])
+        z, Median = robust_z(X, window)
+        for row, col in enumerate(batch):
+            starts, stops = run_lengths(z[row] > threshold)
+            table = numpy.zeros(len(starts), dtype=_AnomalyFields)
+            if len(starts):
+                table["column"] = col
+                table["heading"] = headings[col].strip() if headings else "Col%d" % col
+                table["start"] = Time[starts]
+                table["end"] = Time[stops - 1]
+                table["samples"] = stops - starts
+                table["peak_z"] = segment_max(z[row], starts, stops)
+                peak = _peak_index(z[row], starts, table["peak_z"])
+                table["peak_value"] = X[row, peak]
+                table["median"] = Median[row, peak]
+                table = table[numpy.argsort(-table["peak_z"], kind="stable")][:top]
+            Tables.append(table)
+    anomalies = numpy.concatenate(Tables) if Tables else numpy.zeros(0, dtype=_AnomalyFields)
+    return anomalies[numpy.argsort(-anomalies["peak_z"], kind="stable")]
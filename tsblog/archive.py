@@ -0,0 +1,165 @@
+"""
+archive.py
+
+Export of TSB logs to compressed columnar Parquet archives, and reading
+them back without any text parsing.
+
+Each log column becomes a Parquet column in its compact LogData dtype
+(fixed-point columns are stored as their integer counts). Rows are split
+into row groups of ``RowGroupRows`` samples, and Parquet keeps min/max
+statistics per row group and column, so a read restricted to a time
+range or a value predicate skips whole row groups without decoding them.
+
+Notes
+-----
+- Needs pyarrow (``pip install pyarrow``); it is only imported when an
+  archive is written or read.
+- The raw headings, format and fixed-point scales are kept in the schema
+  metadata under the ``tsblog`` key.
+"""
+
+import json
+import math
+
+from tsblog.loader import Formats, LogData, format_usecols, load_log, read_headings
+
+# Default number of samples per row group
+RowGroupRows = 65536
+
+# Metadata key holding the tsblog description of the archive
+_MetaKey = b"tsblog"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet archives need pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def column_names(headings):
+    """Return unique, stripped Parquet column names for ``headings``."""
+    names = []
+    for h in headings:
+        name = h.strip() or "column"
+        base, n = name, 1
+        while name in names:
+            n += 1
+            name = "%s#%d" % (base, n)
+        names.append(name)
+    return names
+
+
+def write_archive(data, headings, usecols, fmt, output, source="", row_group_rows=RowGroupRows,
+                  compression="zstd"):
+    """Write LogData ``data`` to Parquet archive ``output``.
+
+    ``headings`` are the raw headings of the log and ``usecols`` the
+    fields of it that ``data`` holds.
+    """
+    pa, pq = _pyarrow()
+    usecols = list(usecols)
+    names = column_names([headings[c] if c < len(headings) else "" for c in usecols])
+    meta = {
+        "format": fmt,
+        "headings": headings,
+        "usecols": usecols,
+        "scales": data.scales,
+        "source": str(source),
+    }
+    table = pa.table(dict(zip(names, data.columns)))
+    table = table.replace_schema_metadata({_MetaKey: json.dumps(meta).encode()})
+    pq.write_table(table, output, row_group_size=row_group_rows,
+                   compression=compression, write_statistics=True)
+    return output
+
+
+def export_log(filename, fmt, output=None, row_group_rows=RowGroupRows, compression="zstd"):
+    """Export text log ``filename`` of format ``fmt`` to a Parquet archive.
+
+    Returns the path of the archive written (``filename`` + ".parquet"
+    unless ``output`` is given).
+    """
+    if fmt not in Formats:
+        raise ValueError("Unknown log format %r (expected one of %s)" % (fmt, ", ".join(Formats)))
+    headings = read_headings(filename)
+    usecols = list(format_usecols(fmt, headings))
+    data = load_log(filename, usecols)
+    return write_archive(data, headings, usecols, fmt, output or str(filename) + ".parquet", filename,
+                         row_group_rows, compression)
+
+
+def read_archive_info(path):
+    """Return the tsblog metadata (format, headings, scales...) of an archive."""
+    _, pq = _pyarrow()
+    meta = pq.read_schema(path).metadata or {}
+    if _MetaKey not in meta:
+        raise ValueError("%s is not a tsblog archive" % path)
+    return json.loads(meta[_MetaKey])
+
+
+def _least_count(value, scale):
+    """Return the smallest fixed-point count whose value is >= ``value``."""
+    count = math.ceil(value * scale)
+    # value * scale may be off by an ulp either way
+    while (count - 1) / scale >= value:
+        count -= 1
+    while count / scale < value:
+        count += 1
+    return count
+
+
+def _greatest_count(value, scale):
+    """Return the largest fixed-point count whose value is <= ``value``."""
+    count = math.floor(value * scale)
+    while (count + 1) / scale <= value:
+        count += 1
+    while count / scale > value:
+        count -= 1
+    return count
+
+
+def _predicate(info, names, col, op, value):
+    """Translate a (column, op, value) predicate to stored-column terms.
+
+    On fixed-point columns the value becomes an integer count: == and !=
+    compare with the nearest count, i.e. at the column's resolution,
+    while the inequalities select exactly the samples whose text-log
+    values satisfy them (the least count at or above the value for >=
+    and <, the greatest count at or below it for > and <=).
+    """
+    index = col if isinstance(col, int) else names.index(col)
+    scale = info["scales"][index]
+    if scale:
+        if op in ("==", "!="):
+            value = round(value * scale)
+        elif op in (">=", "<"):
+            value = _least_count(value, scale)
+        elif op in (">", "<="):
+            value = _greatest_count(value, scale)
+        else:
+            raise ValueError("unsupported filter operator %r" % op)
+    return (names[index], op, value)
+
+
+def read_archive(path, filters=None, time_range=None):
+    """Read an archive back into a LogData.
+
+    ``filters`` is a list of ``(column, op, value)`` predicates, combined
+    with AND, where ``column`` is a column index (as in the scripts) or a
+    column name, and ``op`` one of ``==, !=, <, <=, >, >=``. ``time_range``
+    is a ``(start, end)`` pair on the first (time) column. Row groups whose
+    statistics rule out the predicates are skipped without being read.
+    """
+    _, pq = _pyarrow()
+    info = read_archive_info(path)
+    names = pq.read_schema(path).names
+    terms = [_predicate(info, names, *f) for f in (filters or [])]
+    if time_range is not None:
+        terms.append(_predicate(info, names, 0, ">=", time_range[0]))
+        terms.append(_predicate(info, names, 0, "<=", time_range[1]))
+    table = pq.read_table(path, filters=terms or None)
+    columns = [table.column(name).to_numpy() for name in names]
+    return LogData(columns, headings=info["headings"], scales=info["scales"])
@@ -0,0 +1,163 @@
+"""
+catalog.py
+
+A fleet-wide catalog of logs in an embedded SQLite database.
+
+Each log gets one row holding what its filename encodes (telescope,
+enclosure, site, timestamp) and the summary statistics AmcLog.py or
+SifMirrorLog.py print for it, so questions such as "which 1m0 logs last
+month had final-quarter MeanRMS above 300 mas" are answered from the
+catalog without touching the raw logs.
+
+Notes
+-----
+- Updating is incremental: a log whose size and modification time match
+  its catalog row is not re-read.
+- Filenames follow the pattern
+  ``<kind>.<telescope>.<enclosure>.<site>.<network>.<tag><YYYYmmddHHMM>.dat``,
+  e.g. ``mic.1m0a.doma.bpl.lco.gtnPT202110062055.dat``.
+"""
+
+import os
+import re
+import sqlite3
+
+from tsblog import amc, mirror
+from tsblog.loader import format_usecols, is_archive, load_log, read_headings
+
+# Filename fields, see the module notes
+_NamePattern = re.compile(
+    r"^(?P<kind>[^.]+)\.(?P<telescope>[^.]+)\.(?P<enclosure>[^.]+)\.(?P<site>[^.]+)\."
+    r"(?P<network>[^.]+)\.(?P<tag>[A-Za-z]*)(?P<stamp>\d{12})\."
+)
+
+# Statistics columns, as returned by amc.summary() and mirror.summary()
+AmcStats = (
+    "pos_min", "pos_max", "pos_mean", "pos_stdev",
+    "vel_min", "vel_max", "vel_mean", "vel_stdev",
+    "mean_rms_second_half", "mean_rms_final_quarter",
+)
+MirrorStats = (
+    "period_min", "period_max", "period_mean", "period_stdev",
+    "reference_min", "reference_max", "reference_mean", "reference_stdev",
+) + tuple("rms_%s_third_quarter" % key for key, _, _ in mirror.RmsChannels)
+
+_NameColumns = ("kind", "telescope", "telescope_class", "enclosure", "site", "network", "tag", "timestamp")
+_Columns = ("path", "size", "mtime", "format") + _NameColumns + ("samples",) + AmcStats + MirrorStats
+
+
+def parse_filename(filename):
+    """Return the fields encoded in a log filename, or None if it does not match.
+
+    ``telescope_class`` is the telescope without its unit letter ("1m0"
+    for "1m0a") and ``timestamp`` is ISO formatted ("2021-10-06T20:55").
+    """
+    match = _NamePattern.match(os.path.basename(filename))
+    if match is None:
+        return None
+    fields = match.groupdict()
+    stamp = fields.pop("stamp")
+    fields["telescope_class"] = re.sub(r"[a-z]+$", "", fields["telescope"])
+    fields["timestamp"] = "%s-%s-%sT%s:%s" % (stamp[0:4], stamp[4:6], stamp[6:8], stamp[8:10], stamp[10:12])
+    return fields
+
+
+def summarise(filename, fmt):
+    """Load a log and return its summary statistics as a dict."""
+    if is_archive(filename):
+        from tsblog.archive import read_archive_info
+        fmt = read_archive_info(filename)["format"]
+    return summarise_data(load_log(filename, format_usecols(fmt, read_headings(filename))), fmt)
+
+
+def summarise_data(Data, fmt):
+    """Return the summary statistics of loaded log ``Data`` of format ``fmt``."""
+    if fmt == "amc":
+        result = amc.summary(Data)
+    elif fmt in ("pmc", "sif"):
+        result = mirror.summary(Data, mirror.PmcColumns if fmt == "pmc" else mirror.SifColumns)
+    else:
+        result = {"samples": len(Data)}
+    result["format"] = fmt
+    return result
+
+
+def _sql_type(column):
+    if column == "path":
+        return "TEXT PRIMARY KEY"
+    if column in ("size", "samples"):
+        return "INTEGER"
+    if column in _NameColumns or column == "format":
+        return "TEXT"
+    return "REAL"
+
+
+class Catalog:
+    """The log catalog stored in SQLite database ``path``."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        columns = ", ".join("%s %s" % (c, _sql_type(c)) for c in _Columns)
+        self.db.execute("CREATE TABLE IF NOT EXISTS logs (%s)" % columns)
+        self.db.execute("CREATE INDEX IF NOT EXISTS logs_class_time ON logs (telescope_class, timestamp)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS logs_site_time ON logs (site, timestamp)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS logs_time ON logs (timestamp)")
+
+    def close(self):
+        self.db.close()
+
+    def is_current(self, path, st):
+        """Return True if ``path`` is catalogued with the given os.stat() result."""
+        row = self.db.execute("SELECT size, mtime FROM logs WHERE path = ?", (path,)).fetchone()
+        return row is not None and row["size"] == st.st_size and row["mtime"] == st.st_mtime
+
+    def add(self, filename, fmt):
+        """Catalogue ``filename`` unless it is already up to date.
+
+        Returns True if the log was (re)read.
+        """
+        path = os.path.abspath(filename)
+        st = os.stat(path)
+        if self.is_current(path, st):
+            return False
+        row = dict(parse_filename(path) or {})
+        row.update(summarise(path, fmt))
+        row.update(path=path, size=st.st_size, mtime=st.st_mtime)
+        names = [c for c in _Columns if c in row]
+        self.db.execute("INSERT OR REPLACE INTO logs (%s) VALUES (%s)"
+                        % (", ".join(names), ", ".join("?" * len(names))), [row[c] for c in names])
+        self.db.commit()
+        return True
+
+    def prune(self):
+        """Drop the rows of logs that no longer exist; return how many."""
+        gone = [r["path"] for r in self.db.execute("SELECT path FROM logs") if not os.path.exists(r["path"])]
+        self.db.executemany("DELETE FROM logs WHERE path = ?", [(p,) for p in gone])
+        self.db.commit()
+        return len(gone)
+
+    def query(self, where=None, params=(), telescope_class=None, site=None, since=None, until=None,
+              order="timestamp"):
+        """Return the catalogued rows matching the given conditions.
+
+        ``where`` is an extra SQL condition over the catalog columns, e.g.
+        ``"mean_rms_final_quarter > ?"`` with ``params=(300,)``. ``since``
+        and ``until`` bound the filename timestamp (ISO strings, ``until``
+        exclusive).
+        """
+        terms, args = [], []
+        for column, op, value in (("telescope_class", "=", telescope_class), ("site", "=", site),
+                                  ("timestamp", ">=", since), ("timestamp", "<", until)):
+            if value is not None:
+                terms.append("%s %s ?" % (column, op))
+                args.append(value)
+        if where:
+            terms.append("(%s)" % where)
+            args.extend(params)
+        sql = "SELECT * FROM logs"
+        if terms:
+            sql += " WHERE " + " AND ".join(terms)
+        if order:
+            sql += " ORDER BY " + order
+        return self.db.execute(sql, args).fetchall()
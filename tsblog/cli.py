@@ -0,0 +1,83 @@
+"""
+cli.py
+
+Command-line handling shared by the analysis scripts.
+"""
+
+import argparse
+import os
+
+from tsblog.profiling import Profiler
+
+# Default size limit of the figure cache, MiB
+FigureCacheMiB = 1024
+
+
+def make_parser(description):
+    """Return an ArgumentParser with the options common to every script."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("filename", help="log file to analyse")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="print the statistics only; matplotlib is not loaded")
+    parser.add_argument("--profile", action="store_true",
+                        help="report wall/CPU time and peak memory per stage")
+    parser.add_argument("--profile-json", metavar="PATH",
+                        help="also write the profile as JSON to PATH ('-' for stdout); implies --profile")
+    return parser
+
+
+def add_figure_options(parser):
+    """Add the options saving the figures as PNG files, through a figure cache."""
+    parser.add_argument("--save-dir", metavar="DIR",
+                        help="save the figures as PNG files in DIR instead of showing them")
+    parser.add_argument("--figure-cache", metavar="DIR",
+                        help="reuse unchanged figures from the cache in DIR (with --save-dir)")
+    parser.add_argument("--figure-cache-size", type=float, default=FigureCacheMiB, metavar="MIB",
+                        help="size limit of the figure cache, MiB (default: %(default)g)")
+    return parser
+
+
+def add_lag_option(parser):
+    """Add the option printing the loop lags (see xcorr.py)."""
+    parser.add_argument("--lag", action="store_true",
+                        help="also estimate and print the lags between the demanded and actual signals")
+    return parser
+
+
+def add_events_option(parser):
+    """Add the option printing the torque clamp events (see events.py)."""
+    parser.add_argument("--events", action="store_true", help="also print a table of the torque clamp events")
+    return parser
+
+
+def make_figure_output(args):
+    """Return the figcache.FigureOutput selected by the options, or None to show the figures."""
+    if not args.save_dir:
+        return None
+    from tsblog.figcache import FigureCache, FigureOutput
+    cache = FigureCache(args.figure_cache, int(args.figure_cache_size * 2**20)) if args.figure_cache else None
+    return FigureOutput(args.save_dir, os.path.basename(args.filename), cache)
+
+
+def print_figure_output(out):
+    """Print where the figures were saved and the figure cache hits and misses."""
+    print("Figures saved :", len(out.paths), "in", out.output_dir)
+    if out.cache is not None:
+        stats = out.cache.stats()
+        print("Figure cache : %d hits, %d misses, %d images, %.1f MiB" % (
+            stats["hits"], stats["misses"], stats["entries"], stats["bytes"] / 2**20))
+
+
+def make_profiler(args):
+    """Return the Profiler selected by the parsed command-line options."""
+    return Profiler(enabled=bool(args.profile or args.profile_json), label=args.filename)
+
+
+def print_column_stats(heading, stats, col):
+    """Print the heading and min/max/mean/stdev of one column, as the scripts report them.
+
+    ``stats`` is the (Min, Max, Mean, Stdev) tuple of LogData.stats().
+    """
+    Min, Max, Mean, Stdev = stats
+    print(heading[col],)
+    print(" min : %.3f," % Min[col], " max : %.3f," % Max[col], "mean : %.3f," % Mean[col], "stdev : %.3f," % Stdev[col])
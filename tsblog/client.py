@@ -0,0 +1,43 @@
+"""
+client.py
+
+Client side of the analysis daemon (see daemon.py): one request, one
+reply, over the daemon's Unix domain socket.
+
+This module imports only the standard library, so a client call costs
+little more than starting the interpreter; the daemon does the loading
+and analysis.
+
+Notes
+-----
+- Requests and replies are single lines of JSON. A reply has ``"ok"``
+  true and the results, or ``"ok"`` false and an ``"error"`` message.
+- Figures come back as base64-encoded PNG images.
+"""
+
+import json
+import os
+import socket
+import tempfile
+
+
+def default_socket():
+    """Return the default socket path of the daemon for this user."""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, "tsblog-%d.sock" % os.getuid())
+
+
+def request(message, path=None, timeout=None):
+    """Send ``message`` (a dict) to the daemon; return its reply.
+
+    Raises RuntimeError with the daemon's message if the request failed.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket())
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("rb") as fh:
+            reply = json.loads(fh.readline())
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error", "request failed"))
+    return reply
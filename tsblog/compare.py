@@ -0,0 +1,106 @@
+"""
+compare.py
+
+Before/after comparison of two AMC logs of the same track, e.g. recorded
+either side of a servo gain or firmware change.
+
+Both logs are normalized as AmcLog.py does (wrap-around, time offset,
+track-demand times), then every compared signal is linearly interpolated
+onto one uniform time grid covering the span both logs share. With the
+logs on the same grid, differences are plain element-wise arithmetic, so
+the whole comparison is linear in the log lengths.
+
+Notes
+-----
+- With ``align``, the after log is also shifted by the lag that best
+  aligns the two demanded positions (FFT cross-correlation, see xcorr.py),
+  which absorbs a different start time of the recordings of one track.
+  The search is bounded by ``max_lag`` and a best correlation below
+  ``MinAlignCorrelation`` is an error: demands of different tracks have no
+  meaningful alignment. Alignment is off by default.
+- The compared signals are all sampled on the servo-cycle time axis.
+  ``TrackTime`` from normalize() times only the target demands, which are
+  not compared, so it is not used here.
+- The grid step defaults to the coarser of the two sample periods.
+"""
+
+import numpy
+
+from tsblog.amc import ColDmdPos, ColDmdTrq, ColLatency, ColMaxErr, ColPos, ColRmsErr, ColSecs, normalize
+from tsblog.xcorr import lag, sample_period
+
+# Largest shift searched when aligning the logs (seconds)
+AlignMaxLag = 10.0
+
+# Lowest correlation of the demanded positions accepted as an alignment
+MinAlignCorrelation = 0.9
+
+# (key, label, function of NewData) of the compared signals
+Signals = (
+    ("pos_err", "Position Error (mas)", lambda NewData: NewData[:, ColDmdPos] - NewData[:, ColPos]),
+    ("rms_err", "RMS Error (mas)", lambda NewData: NewData[:, ColRmsErr]),
+    ("max_err", "Max Error (mas)", lambda NewData: NewData[:, ColMaxErr]),
+    ("torque", "Torque Demand", lambda NewData: NewData[:, ColDmdTrq]),
+    ("latency", "Latency (ms)", lambda NewData: NewData[:, ColLatency]),
+)
+
+
+def _stats(x):
+    return {
+        "mean": float(numpy.nanmean(x)),
+        "rms": float(numpy.sqrt(numpy.nanmean(x * x))),
+        "p95": float(numpy.nanpercentile(numpy.abs(x), 95)),
+        "max": float(numpy.nanmax(numpy.abs(x))),
+    }
+
+
+def compare(Before, After, period=None, align=False, max_lag=AlignMaxLag, min_correlation=MinAlignCorrelation):
+    """Compare two loaded AMC logs on a common grid.
+
+    Returns a dict with the ``grid`` (seconds from the start of the before
+    log), the ``shift`` applied to the after log and the ``correlation``
+    of the demanded positions at that shift (NaN if not aligned), and per
+    signal key the
+    resampled ``before``/``after`` series and their ``stats``: mean, RMS,
+    95th percentile and maximum of |value| for each log and for the
+    after - before difference.
+
+    With ``align``, the after log is shifted by up to ``max_lag`` seconds
+    to line up the demanded positions; ValueError is raised if their best
+    correlation is below ``min_correlation``.
+    """
+    NewBefore, _ = normalize(Before)
+    NewAfter, _ = normalize(After)
+    TimeBefore = NewBefore[:, ColSecs]
+    TimeAfter = NewAfter[:, ColSecs]
+    step = period or max(sample_period(TimeBefore), sample_period(TimeAfter))
+
+    shift, correlation = 0.0, numpy.nan
+    if align:
+        # Cross-correlate the demanded positions on a shared provisional grid
+        span = min(TimeBefore[-1], TimeAfter[-1])
+        coarse = numpy.arange(0.0, span, step)
+        shift, correlation = lag(numpy.interp(coarse, TimeBefore, NewBefore[:, ColDmdPos]),
+                                 numpy.interp(coarse, TimeAfter, NewAfter[:, ColDmdPos]), step,
+                                 min(max_lag, span / 4))
+        if not correlation >= min_correlation:
+            raise ValueError("the demanded positions correlate only %.3f at their best shift of %.3f s;"
+                             " are the logs of the same track?" % (correlation, shift))
+    TimeAfter = TimeAfter - shift
+
+    start = max(TimeBefore[0], TimeAfter[0])
+    end = min(TimeBefore[-1], TimeAfter[-1])
+    if end <= start:
+        raise ValueError("the logs do not overlap in time")
+    grid = numpy.arange(start, end, step)
+    result = {"grid": grid, "shift": float(shift), "correlation": float(correlation), "period": float(step)}
+    for key, label, signal in Signals:
+        b = numpy.interp(grid, TimeBefore, signal(NewBefore))
+        a = numpy.interp(grid, TimeAfter, signal(NewAfter))
+        result[key] = {
+            "label": label,
+            "before": b,
+            "after": a,
+            "stats": {"before": _stats(b), "after": _stats(a), "diff": _stats(a - b)},
+        }
+    return result
@@ -0,0 +1,236 @@
+"""
+daemon.py
+
+An optional long-running local analysis daemon that keeps recently used
+logs parsed, and their derived results, in memory, so repeated analyses
+of the same files are cache hits instead of new processes that import,
+parse and compute everything again.
+
+The daemon listens on a Unix domain socket (see client.py for the
+protocol) and serves these requests, each naming a log and its format
+("amc" or "pmc"):
+
+- ``stats``: the statistics AmcLog.py or SifMirrorLog.py print;
+- ``figures``: their figures, rendered to PNG;
+- ``status``: cache size, budget, entries, hits and misses;
+- ``shutdown``: stop the daemon.
+
+Parsed logs, normalized data, statistics and rendered figures share one
+LRU cache with a memory budget; the least recently used entries are
+dropped when it is exceeded. Entries are keyed on the path, size and
+modification time of the log, so a log that changes is parsed again.
+
+Notes
+-----
+- Requests are served in threads; figures are rendered one at a time, as
+  pyplot is not thread-safe.
+- The socket is created readable and writable by its owner only.
+"""
+
+import base64
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+
+import numpy
+
+from tsblog import amc, mirror
+from tsblog.client import default_socket
+from tsblog.loader import LogData, read_headings
+
+# Default memory budget of the cache, in bytes
+Budget = 2 << 30
+
+# Resolution of rendered figures
+Dpi = 100
+
+
+def sizeof(value):
+    """Return the approximate memory held by a cached value, in bytes."""
+    if isinstance(value, (LogData, numpy.ndarray)):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(v) for v in value)
+    return 64
+
+
+class MemoryCache:
+    """A thread-safe LRU cache bounded by the total size of its values."""
+
+    def __init__(self, budget=Budget):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return the value cached under ``key``, computing and caching it on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = sizeof(value)
+        with self.lock:
+            # Values larger than the whole budget are returned but not kept
+            if key not in self.entries and size <= self.budget:
+                self.entries[key] = (value, size)
+                self.used += size
+                while self.used > self.budget:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.used -= dropped
+        return value
+
+    def status(self):
+        with self.lock:
+            return {"entries": len(self.entries), "used": self.used, "budget": self.budget,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def _log_key(filename, fmt):
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_size, st.st_mtime, fmt)
+
+
+class Analyser:
+    """The daemon's analyses, on top of a MemoryCache."""
+
+    def __init__(self, budget=Budget, dpi=Dpi):
+        self.cache = MemoryCache(budget)
+        self.dpi = dpi
+        self.render_lock = threading.Lock()
+
+    def _loaded(self, key):
+        """Return ``(Data, Heading)`` of a log, headings without date and clock."""
+        filename, _, _, fmt = key
+
+        def parse():
+            Heading = read_headings(filename)[2:]
+            if fmt == "amc":
+                return amc.load(filename), Heading
+            Heading[-1] = Heading[-1].rstrip("\n")
+            return mirror.load(filename, mirror.PmcColumns), Heading
+
+        return self.cache.get(("data",) + key, parse)
+
+    def _normalized(self, key):
+        Data, _ = self._loaded(key)
+        return self.cache.get(("normalized",) + key, lambda: amc.normalize(Data))
+
+    def _stats(self, key):
+        Data, _ = self._loaded(key)
+        if key[3] == "pmc":
+            return {"summary": mirror.summary(Data, mirror.PmcColumns)}
+        NewData, _ = self._normalized(key)
+        Times, Before, After = amc.state_transitions(NewData)
+        return {
+            "summary": amc.summary(Data),
+            "lag": list(amc.position_lag(NewData)),
+            "state_changes": [[float(t), int(b), int(a)] for t, b, a in zip(Times, Before, After)],
+        }
+
+    def _figures(self, key):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from tsblog import plots
+
+        Data, Heading = self._loaded(key)
+        with self.render_lock:
+            plt.close("all")
+            if key[3] == "amc":
+                NewData, TrackTime = self._normalized(key)
+                plots.amc_figures(NewData, TrackTime, amc.position_error(NewData), Heading, key[0])
+            else:
+                Time, _ = mirror.time_axis(Data, mirror.PmcColumns)
+                plots.mirror_figures(Time, Data, mirror.PmcColumns, Heading)
+            images = []
+            for num in plt.get_fignums():
+                buf = io.BytesIO()
+                plt.figure(num).savefig(buf, format="png", dpi=self.dpi)
+                images.append(base64.b64encode(buf.getvalue()).decode("ascii"))
+            plt.close("all")
+        return images
+
+    def handle(self, message):
+        """Return the reply (a dict) to one request."""
+        op = message.get("op")
+        if op == "status":
+            return dict(ok=True, **self.cache.status())
+        if op not in ("stats", "figures"):
+            raise ValueError("unknown request %r" % op)
+        fmt = message.get("format", "amc")
+        if fmt not in ("amc", "pmc"):
+            raise ValueError("unsupported log format %r (expected amc or pmc)" % fmt)
+        key = _log_key(message["file"], fmt)
+        compute = self._stats if op == "stats" else self._figures
+        return {"ok": True, op: self.cache.get((op,) + key, lambda: compute(key))}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            if message.get("op") == "shutdown":
+                reply = {"ok": True}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                reply = self.server.analyser.handle(message)
+        except Exception as exc:
+            reply = {"ok": False, "error": "%s: %s" % (type(exc).__name__, exc)}
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def _claim(path):
+    """Remove a stale socket at ``path``; fail if a daemon is listening there."""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise RuntimeError("a daemon is already listening on %s" % path)
+
+
+def serve(path=None, budget=Budget, dpi=Dpi, ready=None):
+    """Run the daemon on Unix socket ``path`` until a shutdown request.
+
+    ``ready`` is called with the socket path once requests are accepted.
+    """
+    path = path or default_socket()
+    _claim(path)
+    umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    server.analyser = Analyser(budget, dpi)
+    try:
+        if ready:
+            ready(path)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
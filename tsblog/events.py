@@ -0,0 +1,149 @@
+"""
+events.py
+
+Run-length event tables for the torque clamp flags of an STD torque
+extract, as plotted by StdTorquePlot.py.
+
+Each maximal run of samples with a clamp flag set is one event: its
+start and end time, duration, sample count and the peak absolute value of
+the axis torque demand and measured motor torques while it lasted. All
+of it is computed with whole-array operations (no per-sample Python), so
+an extract of 1e8 rows takes seconds.
+
+Notes
+-----
+- A NaN flag (a missing sample) counts as unset, so it ends a run.
+- ``end`` is the time of the last flagged sample of the run, so a single
+  flagged sample is an event of zero duration; ``samples`` counts them.
+- Event tables are NumPy structured arrays; tables from several files are
+  combined with numpy.concatenate() and summarised with aggregate().
+"""
+
+import numpy
+
+
+class TorqueColumns:
+    """STD torque extract columns, as in StdTorquePlot.py."""
+    ColTime = 0
+    ColPosTarget = 1
+    ColPosDemand = 2
+    ColPosActual = 3
+    ColPosDiff = 4
+    AXIS_TORQUE_LIMIT = 5
+    AXIS_TORQUE_DEMAND = 6
+    CLAMPED_AXIS_TORQUE_DEMAND = 7
+    AXIS_TORQUE_CLAMP_FLAG = 8
+    MOTOR_FULL_PRELOAD_TORQUE = 9
+    MOTOR_PRELOAD_TORQUE = 10
+    MOTOR_TORQUE_MIN_LIMIT = 11
+    MOTOR_TORQUE_MAX_LIMIT = 12
+    MOTOR_TORQUE_CORRECTION = 13
+    CLAMPED_MOTOR_1_TORQUE_DEMAND = 14
+    CLAMPED_MOTOR_2_TORQUE_DEMAND = 15
+    MOT1_TORQUE_CLAMP_FLAG = 16
+    MOT2_TORQUE_CLAMP_FLAG = 17
+    MOTOR_1_MEASURED_TORQUE = 18
+    MOTOR_2_MEASURED_TORQUE = 19
+
+
+# (flag name, column) of the clamp flags
+ClampFlags = (
+    ("axis", TorqueColumns.AXIS_TORQUE_CLAMP_FLAG),
+    ("motor1", TorqueColumns.MOT1_TORQUE_CLAMP_FLAG),
+    ("motor2", TorqueColumns.MOT2_TORQUE_CLAMP_FLAG),
+)
+
+# (field name, column) of the torques whose peak is kept per event
+PeakChannels = (
+    ("peak_axis_demand", TorqueColumns.AXIS_TORQUE_DEMAND),
+    ("peak_motor1_measured", TorqueColumns.MOTOR_1_MEASURED_TORQUE),
+    ("peak_motor2_measured", TorqueColumns.MOTOR_2_MEASURED_TORQUE),
+)
+
+# Fields of every event table, followed by one "f8" field per peak channel
+_EventFields = [
+    # Paths are Python strings, as a fixed width would truncate long ones
+    ("file", "O"),
+    ("flag", "U16"),
+    ("start", "f8"),
+    ("end", "f8"),
+    ("duration", "f8"),
+    ("samples", "i8"),
+]
+
+
+def run_lengths(flag):
+    """Return ``(starts, stops)`` of the runs where ``flag`` is non-zero
+    (and not NaN).
+
+    ``stops`` are exclusive, so run i covers ``flag[starts[i]:stops[i]]``.
+    """
+    flag = numpy.asarray(flag)
+    edges = numpy.zeros(len(flag) + 2, dtype=numpy.int8)
+    edges[1:-1] = flag != 0
+    if flag.dtype.kind == "f":
+        edges[1:-1][numpy.isnan(flag)] = 0
+    change = numpy.diff(edges)
+    return numpy.flatnonzero(change == 1), numpy.flatnonzero(change == -1)
+
+
+def segment_max(values, starts, stops):
+    """Return the maximum of ``values[starts[i]:stops[i]]`` for every run."""
+    if len(starts) == 0:
+        return numpy.empty(0, dtype=numpy.float64)
+    # reduceat over [start0, stop0, start1, stop1, ...]; the even entries
+    # reduce each run, the odd ones the gaps between runs, which are dropped
+    bounds = numpy.column_stack((starts, stops)).ravel()
+    if bounds[-1] == len(values):
+        bounds = bounds[:-1]
+    return numpy.maximum.reduceat(values, bounds)[::2]
+
+
+def clamp_events(Data, filename="", flags=ClampFlags, peaks=PeakChannels, time_col=TorqueColumns.ColTime):
+    """Return the clamp events of a torque extract as a structured array.
+
+    ``flags`` and ``peaks`` are (name, column) pairs of the flag columns
+    and of the torques whose peak absolute value is recorded per event.
+    """
+    dtype = _EventFields + [(name, "f8") for name, _ in peaks]
+    Time = Data[:, time_col]
+    Magnitudes = [(name, numpy.abs(Data[:, col])) for name, col in peaks]
+    Tables = []
+    for flag, col in flags:
+        starts, stops = run_lengths(Data.column(col))
+        table = numpy.zeros(len(starts), dtype=dtype)
+        table["file"] = filename
+        table["flag"] = flag
+        table["start"] = Time[starts]
+        table["end"] = Time[stops - 1]
+        table["duration"] = table["end"] - table["start"]
+        table["samples"] = stops - starts
+        for name, magnitude in Magnitudes:
+            table[name] = segment_max(magnitude, starts, stops)
+        Tables.append(table)
+    events = numpy.concatenate(Tables)
+    return events[numpy.argsort(events["start"], kind="stable")]
+
+
+def aggregate(events):
+    """Summarise an event table per flag.
+
+    Returns a dict mapping each flag to its event count, total, mean and
+    longest duration, and the overall peaks of the recorded torques.
+    """
+    peaks = [name for name in events.dtype.names if name.startswith("peak_")]
+    result = {}
+    for flag in numpy.unique(events["flag"]):
+        sel = events[events["flag"] == flag]
+        summary = {
+            "events": len(sel),
+            "files": len(numpy.unique(sel["file"])),
+            "samples": int(sel["samples"].sum()),
+            "total_duration": float(sel["duration"].sum()),
+            "mean_duration": float(sel["duration"].mean()),
+            "max_duration": float(sel["duration"].max()),
+        }
+        for name in peaks:
+            summary[name] = float(numpy.nanmax(sel[name]))
+        result[str(flag)] = summary
+    return result
@@ -0,0 +1,207 @@
+"""
+figcache.py
+
+A content-addressed cache of rendered figures, so figures of unchanged
+data are not drawn again, e.g. when the nightly reports are regenerated.
+
+A figure's key is a hash of the arrays it plots (the raw columns and any
+derived series, hashed by content, not by file name), its configuration
+(labels, title, limits, size, resolution, decimation, backend) and the
+source of tsblog/plots.py, so a change in the data, the derivation, the
+labels or the drawing code is a new key. The PNG image is stored under
+its key; a hit copies it out without importing matplotlib at all.
+
+The cache directory is bounded by a size limit; when a new image takes
+it over, the least recently used images are removed. Using an image
+updates its modification time, which is what recency is taken from, so
+the order survives between runs.
+
+Notes
+-----
+- Several processes may share a cache directory: images are written via
+  a temporary file and os.replace(), and an image removed by another
+  process is simply a miss.
+- Arrays are hashed in their stored dtype, so a fixed-point column and
+  its float64 widening hash differently; plot the same form consistently.
+"""
+
+import hashlib
+import importlib.metadata
+import io
+import os
+
+import numpy
+
+from tsblog.report import decimate
+
+# Default cache directory and size limit (bytes)
+CacheDir = ".tsb-figure-cache"
+MaxBytes = 1 << 30
+
+# Default resolution of saved figures
+Dpi = 100
+
+# Backend saved figures are drawn with
+Backend = "Agg"
+
+
+def _source_digest():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "plots.py"), "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _matplotlib_version():
+    try:
+        return importlib.metadata.version("matplotlib")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def array_digest(array):
+    """Return the hex digest of an array's dtype, shape and contents."""
+    array = numpy.ascontiguousarray(array)
+    digest = hashlib.blake2b(repr((array.dtype.str, array.shape)).encode(), digest_size=20)
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """PNG images in ``directory`` by content key, at most ``max_bytes`` in all."""
+
+    def __init__(self, directory=CacheDir, max_bytes=MaxBytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        # The limit may be lower than when the cache was filled
+        self.trim()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".png")
+
+    def get(self, key):
+        """Return the image stored under ``key``, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                image = fh.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image
+
+    def put(self, key, image):
+        """Store ``image`` under ``key``, then evict down to the size limit."""
+        path = self._path(key)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as fh:
+            fh.write(image)
+        os.replace(tmp, path)
+        self.trim()
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".png"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def trim(self):
+        """Remove the least recently used images until within the size limit."""
+        entries = sorted(self._entries())
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if used <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            used -= size
+
+    def stats(self):
+        """Return the hit and miss counts of this instance and the cache size."""
+        entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses, "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries)}
+
+
+class FigureOutput:
+    """Saves figures as ``<output_dir>/<stem>.<num>.png``, through a
+    FigureCache if given.
+
+    ``pixels``, if given, decimates every line with more than four points
+    per pixel to its per-pixel min/max before drawing (see report.py).
+    """
+
+    def __init__(self, output_dir, stem, cache=None, dpi=Dpi, pixels=None):
+        self.output_dir = output_dir
+        self.stem = stem
+        self.cache = cache
+        self.dpi = dpi
+        self.pixels = pixels
+        self.paths = []
+        self._digests = {}
+        self._common = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _digest(self, array):
+        # Memoised by identity, keeping the array so its id is not reused
+        cached = self._digests.get(id(array))
+        if cached is None or cached[0] is not array:
+            cached = self._digests[id(array)] = (array, array_digest(array))
+        return cached[1]
+
+    def key(self, inputs, config):
+        """Return the cache key of a figure plotting ``inputs`` with ``config``."""
+        if self._common is None:
+            self._common = repr((_source_digest(), _matplotlib_version(), Backend, self.dpi, self.pixels))
+        digest = hashlib.sha256(self._common.encode())
+        for array in inputs:
+            digest.update(self._digest(array).encode())
+        digest.update(repr(config).encode())
+        return digest.hexdigest()
+
+    def figure(self, num, figsize, inputs, config, draw):
+        """Save figure ``num``, drawn by ``draw(plt)`` from the arrays
+        ``inputs`` with ``config`` (a repr-able description of everything
+        else it shows), unless the cache already holds it; return its path."""
+        key = self.key(inputs, (num, figsize, config)) if self.cache is not None else None
+        image = self.cache.get(key) if key is not None else None
+        if image is None:
+            image = self._render(num, figsize, draw)
+            if key is not None:
+                self.cache.put(key, image)
+        path = os.path.join(self.output_dir, "%s.%s.png" % (self.stem, num))
+        with open(path, "wb") as fh:
+            fh.write(image)
+        self.paths.append(path)
+        return path
+
+    def _render(self, num, figsize, draw):
+        import matplotlib
+        matplotlib.use(Backend)
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(num, figsize=figsize)
+        try:
+            draw(plt)
+            if self.pixels:
+                for ax in fig.axes:
+                    for line in ax.get_lines():
+                        x, y = line.get_data()
+                        if len(y) > 4 * self.pixels:
+                            line.set_data(*decimate(x, y, self.pixels))
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=self.dpi)
+        finally:
+            plt.close(fig)
+        return buf.getvalue()
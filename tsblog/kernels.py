@@ -0,0 +1,177 @@
+"""
+kernels.py
+
+The inherently sequential per-sample steps of the scripts, as compiled
+loops when numba is installed and as NumPy code otherwise:
+
+- wrap_index(): where a wrapped-around log restarts (AmcLog.py);
+- state_changes(): the samples where a state differs from the previous
+  one, the first compared with the last (AmcLog.py);
+- fill_forward(): NaN forward-fill plus the first usable offset
+  (StdVelPlot.py);
+- hysteresis(): a two-threshold on/off detector.
+
+Both implementations give identical results; KernelBench.py checks that
+and times them against each other.
+
+Notes
+-----
+- numba is optional (``pip install numba``) and only used for inputs of
+  at least ``CompiledMinSamples`` samples. Set ``TSBLOG_KERNELS=numpy``
+  to use the NumPy versions even when it is installed.
+- ``numpy_kernels`` and ``loop_kernels`` hold both sets (the latter as
+  plain Python); compiled_kernels() returns the compiled loops.
+"""
+
+import os
+
+import numpy
+
+
+# NumPy versions
+
+
+def _wrap_index_numpy(time):
+    back = numpy.flatnonzero(time[:-1] > time[1:])
+    return int(back[-1]) + 1 if len(back) else 0
+
+
+def _state_changes_numpy(state):
+    return numpy.flatnonzero(state != numpy.roll(state, 1))
+
+
+def _fill_forward_numpy(x):
+    n = len(x)
+    valid = ~numpy.isnan(x)
+    # Leading NaNs take the last sample, as x[i - 1] does for i == 0
+    last = numpy.maximum.accumulate(numpy.where(valid, numpy.arange(n), -1))
+    last[last < 0] = n - 1
+    usable = numpy.flatnonzero(valid & (x != 0))
+    return x[last], float(x[usable[0]]) if len(usable) else 0.0
+
+
+def _hysteresis_numpy(x, on, off, initial=False):
+    n = len(x)
+    level = numpy.where(x >= on, 1, numpy.where(x <= off, 0, -1))
+    last = numpy.maximum.accumulate(numpy.where(level >= 0, numpy.arange(n), -1))
+    return numpy.where(last >= 0, level[numpy.maximum(last, 0)] == 1, bool(initial))
+
+
+# Loop versions, compiled by numba
+
+
+def _wrap_index_loop(time):
+    start = 0
+    for i in range(1, len(time)):
+        if time[i - 1] > time[i]:
+            start = i
+    return start
+
+
+def _state_changes_loop(state):
+    n = len(state)
+    count = 0
+    for i in range(n):
+        if state[i] != state[i - 1]:
+            count += 1
+    index = numpy.empty(count, dtype=numpy.int64)
+    count = 0
+    for i in range(n):
+        if state[i] != state[i - 1]:
+            index[count] = i
+            count += 1
+    return index
+
+
+def _fill_forward_loop(x):
+    out = x.copy()
+    adj = 0.0
+    for i in range(len(x)):
+        if numpy.isnan(x[i]):
+            # out[i - 1] for i == 0 is the untouched last sample, as in the scripts
+            out[i] = out[i - 1] if i > 0 else x[len(x) - 1]
+        elif adj == 0:
+            adj = x[i]
+    return out, adj
+
+
+def _hysteresis_loop(x, on, off, initial=False):
+    out = numpy.empty(len(x), dtype=numpy.bool_)
+    state = initial
+    for i in range(len(x)):
+        if x[i] >= on:
+            state = True
+        elif x[i] <= off:
+            state = False
+        out[i] = state
+    return out
+
+
+numpy_kernels = {
+    "wrap_index": _wrap_index_numpy,
+    "state_changes": _state_changes_numpy,
+    "fill_forward": _fill_forward_numpy,
+    "hysteresis": _hysteresis_numpy,
+}
+
+loop_kernels = {
+    "wrap_index": _wrap_index_loop,
+    "state_changes": _state_changes_loop,
+    "fill_forward": _fill_forward_loop,
+    "hysteresis": _hysteresis_loop,
+}
+
+# Inputs shorter than this use the NumPy versions, which beat importing
+# numba and loading the compiled loops for small logs
+CompiledMinSamples = 1_000_000
+
+_compiled = None
+
+
+def compiled_kernels():
+    """Return the numba-compiled loop kernels, or None without numba.
+
+    numba is imported on the first call only, so scripts that never see a
+    large input do not pay for it.
+    """
+    global _compiled
+    if _compiled is None:
+        try:
+            if os.environ.get("TSBLOG_KERNELS", "") == "numpy":
+                raise ImportError
+            import numba
+        except ImportError:
+            _compiled = {}
+        else:
+            _compiled = {name: numba.njit(cache=True, nogil=True)(f) for name, f in loop_kernels.items()}
+    return _compiled or None
+
+
+def _kernel(name, n):
+    compiled = compiled_kernels() if n >= CompiledMinSamples else None
+    return (compiled or numpy_kernels)[name]
+
+
+def wrap_index(time):
+    """Return the index after the last backwards step of ``time``, or 0."""
+    return int(_kernel("wrap_index", len(time))(numpy.asarray(time)))
+
+
+def state_changes(state):
+    """Return the indices i where ``state[i] != state[i - 1]`` (wrapping at 0)."""
+    return _kernel("state_changes", len(state))(numpy.asarray(state))
+
+
+def fill_forward(x):
+    """Return ``(filled, adj)`` for float array ``x``.
+
+    NaNs are replaced by the previous sample (leading NaNs by the last
+    sample) and ``adj`` is the first non-NaN, non-zero value, or 0.
+    """
+    filled, adj = _kernel("fill_forward", len(x))(numpy.asarray(x, dtype=numpy.float64))
+    return filled, float(adj)
+
+
+def hysteresis(x, on, off, initial=False):
+    """Return a boolean state that sets at ``x >= on`` and clears at ``x <= off``."""
+    return _kernel("hysteresis", len(x))(numpy.asarray(x, dtype=numpy.float64), float(on), float(off), bool(initial))
@@ -0,0 +1,303 @@
+"""
+loader.py
+
+Loading of the tab-separated TSB logs into a compact, column-wise
+in-memory representation.
+
+Every column is parsed as float64 and then stored in the narrowest form
+that holds all of its values exactly:
+
+- integral columns (flags, states, sec/nsec times, mas positions) use
+  int8, int16, int32 or int64 depending on their range;
+- decimal columns written with a few fixed decimals (voltages, torques)
+  are stored as int16/int32 counts of 10**-k, i.e. fixed point;
+- other columns use float32 if every value survives the round trip,
+  otherwise float64.
+
+Nothing is rounded, so every value the scripts read is unchanged. Values
+returned by indexing (``Data[:, Col]``, ``Data[i, Col]``) are widened to
+int64/float64 so derived arithmetic behaves exactly as it did on the old
+float64 array. Dividing a fixed-point count by its power-of-ten scale is
+correctly rounded, so it gives back the very float64 that loadtxt parsed.
+
+Notes
+-----
+- Rows are parsed in chunks, so the transient float64 copy is bounded by
+  ``ChunkRows`` rows instead of the whole file.
+- Logs compressed with gzip, bzip2 or xz (``.gz``, ``.bz2``, ``.xz``) are
+  decompressed on the fly.
+"""
+
+import bz2
+import gzip
+import itertools
+import lzma
+
+import numpy
+
+# Number of rows parsed per numpy.loadtxt() call
+ChunkRows = 65536
+
+# Most decimals tried when looking for a fixed-point representation
+MaxDecimals = 6
+
+# Openers of compressed logs, by suffix
+_Openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Integer dtypes tried, narrowest first
+_IntTypes = (numpy.int8, numpy.int16, numpy.int32, numpy.int64)
+
+
+def _narrowest_int(lo, hi, types=_IntTypes):
+    """Return the narrowest integer dtype holding [lo, hi], or None."""
+    for t in types:
+        info = numpy.iinfo(t)
+        if info.min <= lo and hi <= info.max:
+            return t
+    return None
+
+
+def compact(col):
+    """Return ``(array, scale)`` holding float64 ``col`` exactly.
+
+    ``scale`` is None, or the power of ten the stored integers must be
+    divided by to recover the values.
+    """
+    col = numpy.asarray(col, dtype=numpy.float64)
+    # Integers cannot hold NaN or -0.0 (e.g. a logged "-0.000000")
+    if len(col) == 0 or not numpy.isfinite(col).all() or numpy.signbit(col[col == 0]).any():
+        narrow = col.astype(numpy.float32)
+        if numpy.array_equal(narrow.astype(numpy.float64), col, equal_nan=True):
+            return narrow, None
+        return col, None
+    lo, hi = col.min(), col.max()
+    if numpy.array_equal(col, numpy.trunc(col)):
+        return col.astype(_narrowest_int(lo, hi)), None
+    for k in range(1, MaxDecimals + 1):
+        scale = 10 ** k
+        t = _narrowest_int(lo * scale, hi * scale, _IntTypes[1:3])
+        if t is None:
+            break
+        counts = numpy.round(col * scale)
+        if numpy.array_equal(counts / scale, col):
+            return counts.astype(t), scale
+    narrow = col.astype(numpy.float32)
+    if numpy.array_equal(narrow.astype(numpy.float64), col):
+        return narrow, None
+    return col, None
+
+
+def _wide(arr, scale=None):
+    """Return ``arr`` widened to the dtype used for arithmetic."""
+    if scale:
+        return arr / scale
+    if arr.dtype.kind in "iub":
+        return arr.astype(numpy.int64, copy=False)
+    return arr.astype(numpy.float64, copy=False)
+
+
+def _holds(dtype, value):
+    """Return True if scalar ``value`` is exactly representable in ``dtype``."""
+    try:
+        narrow = dtype.type(value)
+    except (ValueError, OverflowError):
+        return False
+    return narrow == value or (value != value and dtype.kind == "f")
+
+
+class LogData:
+    """Column-wise log data with a compact dtype per column.
+
+    Indexing mimics the 2-D float array the scripts used before:
+    ``Data[rows, Col]`` returns a (widened) column slice, ``Data[i, Col]``
+    a scalar and ``Data[Col]`` a whole column.
+    """
+
+    def __init__(self, columns, headings=None, scales=None):
+        self.columns = list(columns)
+        self.headings = headings
+        self.scales = list(scales) if scales is not None else [None] * len(self.columns)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def shape(self):
+        return (len(self), len(self.columns))
+
+    @property
+    def size(self):
+        return len(self) * len(self.columns)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.columns)
+
+    @property
+    def dtypes(self):
+        return [c.dtype for c in self.columns]
+
+    def column(self, col):
+        """Return column ``col`` as stored, if that is not fixed point.
+
+        Flags and states come back as int8 etc., which keeps reductions
+        over them cheap. Fixed-point columns are widened to float64.
+        """
+        if self.scales[col]:
+            return _wide(self.columns[col], self.scales[col])
+        return self.columns[col]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, col = key
+            value = self.columns[col][rows]
+            # Fast path for the per-sample loops in the scripts
+            if isinstance(rows, int):
+                value = value.item()
+                return value / self.scales[col] if self.scales[col] else value
+            return _wide(value, self.scales[col])
+        return _wide(self.columns[key], self.scales[key])
+
+    def __setitem__(self, key, value):
+        rows, col = key if isinstance(key, tuple) else (slice(None), key)
+        if self.scales[col]:
+            # Writes into fixed-point columns go to a plain float64 copy
+            self.columns[col] = _wide(self.columns[col], self.scales[col])
+            self.scales[col] = None
+        arr = self.columns[col]
+        if isinstance(rows, int):
+            # Fast path for the per-sample loops in the scripts
+            if arr.dtype != numpy.float64 and not _holds(arr.dtype, value):
+                arr = self.columns[col] = arr.astype(numpy.float64)
+            arr[rows] = value
+            return
+        value = numpy.asarray(value)
+        # Promote the column if the new values are not exactly representable
+        with numpy.errstate(invalid="ignore"):
+            narrow = value.astype(arr.dtype)
+        if not numpy.array_equal(narrow, value, equal_nan=arr.dtype.kind == "f"):
+            arr = self.columns[col] = arr.astype(numpy.float64)
+        arr[rows] = value
+
+    def __array__(self, dtype=None, copy=None):
+        return numpy.column_stack([self[col].astype(dtype or numpy.float64)
+                                   for col in range(len(self.columns))])
+
+    def take(self, index):
+        """Return a new LogData with the rows selected by ``index``."""
+        return LogData([c[index] for c in self.columns], self.headings, self.scales)
+
+    def copy(self):
+        return LogData([c.copy() for c in self.columns], self.headings, self.scales)
+
+    def stats(self, skipna=False):
+        """Return per-column (Min, Max, Mean, Stdev) as float64 arrays.
+
+        The reductions run on the compact storage, accumulating in float64,
+        and fixed-point results are scaled afterwards. With ``skipna`` NaNs
+        are ignored in the mean and standard deviation as well, as
+        numpy.nanmean() does.
+        """
+        mean = numpy.nanmean if skipna else numpy.mean
+        std = numpy.nanstd if skipna else numpy.std
+        Min, Max, Mean, Stdev = (numpy.empty(len(self.columns)) for _ in range(4))
+        for i, (c, scale) in enumerate(zip(self.columns, self.scales)):
+            scale = scale or 1
+            Min[i] = numpy.nanmin(c) / scale
+            Max[i] = numpy.nanmax(c) / scale
+            Mean[i] = mean(c, dtype=numpy.float64) / scale
+            Stdev[i] = std(c, dtype=numpy.float64) / scale
+        return Min, Max, Mean, Stdev
+
+
+# Numeric columns of each supported log format, as range() arguments into
+# the tab-separated fields; an end of -1 means all but the trailing empty
+# field that STD extracts end with
+Formats = {
+    "amc": (2, 36),
+    "pmc": (2, 27),
+    "sif": (0, 23),
+    "std": (2, -1),
+}
+
+
+def format_usecols(fmt, headings):
+    """Return the usecols for log format ``fmt`` given its raw headings."""
+    start, end = Formats[fmt]
+    if end < 0:
+        end = len(headings) + end
+    return range(start, end)
+
+
+def is_archive(filename):
+    """Return True if ``filename`` is a columnar archive, not a text log."""
+    return str(filename).endswith(".parquet")
+
+
+def open_log(filename):
+    """Open a text log for reading, decompressing it if need be."""
+    for suffix, opener in _Openers.items():
+        if str(filename).endswith(suffix):
+            return opener(filename, "rt", encoding="utf-8", errors="replace")
+    return open(filename, "r", encoding="utf-8", errors="replace")
+
+
+def read_headings(filename):
+    """Return the tab-separated headings on the first line of ``filename``.
+
+    For an archive these are the headings of the log it was exported from.
+    """
+    if is_archive(filename):
+        from tsblog.archive import read_archive_info
+        return list(read_archive_info(filename)["headings"])
+    with open_log(filename) as fh:
+        return fh.readline().split("\t")
+
+
+def _join(parts):
+    """Concatenate the per-chunk ``(array, scale)`` parts of one column."""
+    scales = set(scale for _, scale in parts)
+    arrays = [a for a, _ in parts]
+    if len(scales) == 1:
+        scale = scales.pop()
+        dtype = numpy.result_type(*arrays)
+        # Unscaled int32 or wider mixed with float32 promotes to float64, which is exact
+        if scale is None or dtype.kind == "i":
+            return numpy.concatenate(arrays).astype(dtype, copy=False), scale
+    return compact(numpy.concatenate([_wide(a, s) for a, s in parts]))
+
+
+def parse_log(lines, usecols, skiprows=1):
+    """Parse the numeric columns ``usecols`` of an iterable of log lines."""
+    usecols = list(usecols)
+    lines = iter(lines)
+    for _ in range(skiprows):
+        next(lines, None)
+    chunks = []
+    while True:
+        block = list(itertools.islice(lines, ChunkRows))
+        if not block:
+            break
+        block = numpy.loadtxt(block, dtype=float, usecols=usecols, ndmin=2)
+        chunks.append([compact(block[:, i]) for i in range(block.shape[1])])
+    if not chunks:
+        return LogData([numpy.empty(0) for _ in usecols])
+    columns, scales = zip(*[_join([chunk[i] for chunk in chunks]) for i in range(len(usecols))])
+    return LogData(columns, scales=scales)
+
+
+def load_log(filename, usecols, skiprows=1):
+    """Parse the numeric columns ``usecols`` of a log into a LogData.
+
+    Archives are read without any text parsing; they already hold just
+    the numeric columns of their format, so ``usecols`` is ignored.
+    """
+    if is_archive(filename):
+        from tsblog.archive import read_archive
+        return read_archive(filename)
+    with open_log(filename) as fh:
+        return parse_log(fh, usecols, skiprows)
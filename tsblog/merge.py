@@ -0,0 +1,96 @@
+"""
+merge.py
+
+Time-aligned merge of several AMC logs (one per axis: azimuth, altitude,
+Cassegrain rotator...) into one column-wise multi-axis dataset.
+
+The first log is the reference: every one of its samples is matched with
+the sample of each other log whose time is nearest (or latest not after,
+see ``direction``), found by binary search on the sorted time columns.
+A match further away than ``tolerance`` is left missing (NaN). The cost
+is O(n log n) for sorting and searching; no pairwise time table is
+ever built.
+
+Notes
+-----
+- Each log is rotated into time order first (AMC logs wrap around), but
+  its absolute times are kept, so logs recorded together line up.
+- Merged columns are named ``<axis>:<heading>``; the result can be written
+  to a Parquet archive with archive.write_archive().
+"""
+
+import numpy
+
+from tsblog.amc import ColSecs, time_order
+from tsblog.loader import LogData, compact
+from tsblog.xcorr import sample_period
+
+
+def asof_index(time, other, tolerance, direction="nearest"):
+    """Return, per entry of ``time``, the index of the matching entry of
+    sorted ``other``, or -1 where none lies within ``tolerance``.
+
+    ``direction`` is "nearest", or "backward" for the latest entry not
+    after the time, as in an as-of join.
+    """
+    time = numpy.asarray(time)
+    other = numpy.asarray(other)
+    if len(other) == 0:
+        return numpy.full(len(time), -1, dtype=numpy.int64)
+    if direction == "backward":
+        index = numpy.searchsorted(other, time, side="right") - 1
+        found = index >= 0
+    elif direction == "nearest":
+        right = numpy.minimum(numpy.searchsorted(other, time), len(other) - 1)
+        left = numpy.maximum(right - 1, 0)
+        index = numpy.where(numpy.abs(time - other[left]) <= numpy.abs(other[right] - time), left, right)
+        found = numpy.ones(len(time), dtype=bool)
+    else:
+        raise ValueError("direction must be 'nearest' or 'backward', not %r" % direction)
+    found &= numpy.abs(time - other[numpy.maximum(index, 0)]) <= tolerance
+    return numpy.where(found, index, -1)
+
+
+def _pick(Data, col, index):
+    """Return column ``col`` of ``Data`` at rows ``index`` (-1 is missing), compacted."""
+    values = Data.columns[col][numpy.maximum(index, 0)]
+    scale = Data.scales[col]
+    missing = index < 0
+    if not missing.any():
+        return values, scale
+    values = values / scale if scale else values.astype(numpy.float64)
+    values[missing] = numpy.nan
+    return compact(values)
+
+
+def merge_axes(logs, headings=None, columns=None, tolerance=None, direction="nearest"):
+    """Merge AMC logs on their time columns into one LogData.
+
+    ``logs`` is a list of ``(axis name, LogData)`` pairs, the first being
+    the reference, and ``headings`` the matching list of the logs' heading
+    lists (without the date and clock fields), used to name the merged
+    columns. ``columns`` selects the data columns kept from every log
+    (default all but time); ``tolerance`` defaults to half the reference
+    sample period.
+
+    Returns the merged LogData; column 0 is the reference time, and its
+    ``headings`` are the column names.
+    """
+    ordered = [(name, time_order(Data)) for name, Data in logs]
+    ref_time = ordered[0][1][:, ColSecs]
+    if tolerance is None:
+        tolerance = sample_period(ref_time) / 2.0
+    merged, scales, names = [ordered[0][1].columns[ColSecs]], [ordered[0][1].scales[ColSecs]], ["time"]
+    for n, (name, Data) in enumerate(ordered):
+        cols = [c for c in range(Data.shape[1]) if c != ColSecs] if columns is None else columns
+        if n == 0:
+            index = numpy.arange(len(Data))
+        else:
+            index = asof_index(ref_time, Data[:, ColSecs], tolerance, direction)
+        for col in cols:
+            values, scale = _pick(Data, col, index)
+            merged.append(values)
+            scales.append(scale)
+            label = headings[n][col].strip() if headings else "Col%d" % col
+            names.append("%s:%s" % (name, label))
+    return LogData(merged, headings=names, scales=scales)
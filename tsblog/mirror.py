@@ -0,0 +1,154 @@
+"""
+mirror.py
+
+Column layouts, loading and summary statistics of PMC/SIF mirror
+support logs, as reported by SifMirrorLog.py. tsblog.plots draws its
+figures from the same arrays.
+"""
+
+import math
+
+import numpy as np
+
+from tsblog.loader import load_log
+
+NanoSecPerSec = 1_000_000_000
+
+
+def qmean(arr_like):
+    """Root-mean-square of a sequence/array."""
+    a = np.asarray(arr_like, dtype=float)
+    return math.sqrt(np.mean(a * a))
+
+
+class PmcColumns:
+    """PMC log columns."""
+    PMC = 1
+    ColTime = 0
+    RedAxialLoad = 1
+    YelAxialLoad = 2
+    BluAxialLoad = 3
+    RedRadialLoad = 4
+    YelRadialLoad = 5
+    BluRadialLoad = 6
+    RedValveFeedback = 7
+    YelValveFeedback = 8
+    BluValveFeedback = 9
+    Lateral1LoadValveFeedback = 10
+    Lateral1PreLoadValveFeedback = 11
+    Lateral2LoadValveFeedback = 12
+    Lateral2PreLoadValveFeedback = 13
+    RedAxialDrive = 14
+    YelAxialDrive = 15
+    BluAxialDrive = 16
+    Lateral1LoadDrive = 17
+    Lateral1PreLoadDrive = 18
+    Lateral2LoadDrive = 19
+    Lateral2PreLoadDrive = 20
+    Angle = 21
+    NorthSouthVector = 22
+    EastWestVector = 23
+    Reference = 24
+    UseCols = range(2, 27)
+
+
+class SifColumns:
+    """SIF log columns."""
+    PMC = 0
+    ColSecs = 18
+    ColNSec = 19
+    ColTime = 0
+    RedAxialLoad = 1
+    YelAxialLoad = 2
+    BluAxialLoad = 3
+    RedRadialLoad = 4
+    YelRadialLoad = 5
+    BluRadialLoad = 6
+    RedValveFeedback = 7
+    YelValveFeedback = 8
+    BluValveFeedback = 9
+    Lateral1LoadValveFeedback = 10
+    Lateral1PreLoadValveFeedback = 11
+    Lateral2LoadValveFeedback = -1
+    Lateral2PreLoadValveFeedback = -1
+    RedAxialDrive = 12
+    YelAxialDrive = 13
+    BluAxialDrive = 14
+    Lateral1LoadDrive = 15
+    Lateral1PreLoadDrive = 16
+    Lateral2LoadDrive = -1
+    Lateral2PreLoadDrive = -1
+    Angle = 17
+    NorthSouthVector = 20
+    EastWestVector = 21
+    Reference = 22
+    UseCols = range(0, 23)
+
+
+# Channels whose third-quarter RMS is reported, as (key, label, column name)
+RmsChannels = (
+    ("red_axial_load", "RMS Red Axial Load     ", "RedAxialLoad"),
+    ("yel_axial_load", "RMS Yellow Axial Load  ", "YelAxialLoad"),
+    ("blu_axial_load", "RMS Blue Axial Load    ", "BluAxialLoad"),
+    ("red_radial_load", "RMS Red Radial Load    ", "RedRadialLoad"),
+    ("yel_radial_load", "RMS Yellow Radial Load ", "YelRadialLoad"),
+    ("blu_radial_load", "RMS Blue Radial Load   ", "BluRadialLoad"),
+    ("ns_vector", "RMS North/South vector ", "NorthSouthVector"),
+    ("ew_vector", "RMS East/West   vector ", "EastWestVector"),
+)
+
+
+def load(filename, Cols):
+    """Return the data columns of a mirror log in layout ``Cols`` as a LogData."""
+    return load_log(filename, usecols=Cols.UseCols)
+
+
+def sample_time(Data, Cols):
+    """Return the sample times; for SIF data computed from secs + nsecs."""
+    if Cols.PMC:
+        return Data[:, Cols.ColTime]
+    return Data[:, Cols.ColSecs] + (Data[:, Cols.ColNSec] / NanoSecPerSec)
+
+
+def periods(Time):
+    """Return the periods between samples (the first repeats the second)."""
+    Period = Time - Time[0]
+    if len(Period) >= 2:
+        Period[1:] = Time[1:] - Time[:-1]
+        Period[0] = Period[1]
+    return Period
+
+
+def time_axis(Data, Cols):
+    """Return ``(Time, Period)``: seconds from the first sample, and the
+    periods between samples."""
+    Sampled = sample_time(Data, Cols)
+    return Sampled - Sampled[0], periods(Sampled)
+
+
+def summary(Data, Cols, Stats=None):
+    """Return the statistics SifMirrorLog.py prints, as a flat dict.
+
+    ``Stats`` is the (Min, Max, Mean, Stdev) tuple from
+    ``Data.stats(skipna=True)``, computed here if not given. RMS values
+    are in milli Volt.
+    """
+    Min, Max, Mean, Stdev = Stats if Stats is not None else Data.stats(skipna=True)
+    Period = periods(sample_time(Data, Cols))
+    result = {
+        "samples": len(Data),
+        "period_min": float(np.nanmin(Period)),
+        "period_max": float(np.nanmax(Period)),
+        "period_mean": float(np.nanmean(Period)),
+        "period_stdev": float(np.nanstd(Period)),
+        "reference_min": float(Min[Cols.Reference]),
+        "reference_max": float(Max[Cols.Reference]),
+        "reference_mean": float(Mean[Cols.Reference]),
+        "reference_stdev": float(Stdev[Cols.Reference]),
+    }
+    # Third-quarter slices (use integer indexing)
+    start = (len(Data) * 2) // 4
+    end = (len(Data) * 3) // 4
+    for key, _, name in RmsChannels:
+        result["rms_%s_third_quarter" % key] = qmean(Data[start:end, getattr(Cols, name)]) * 1000.0
+    return result
@@ -0,0 +1,224 @@
+"""
+pipeline.py
+
+A pipelined driver for batch runs over many logs. Each log goes through
+three stages that overlap across logs instead of running one log at a
+time:
+
+1. read: a thread pool reads the raw file, so it is in the page cache by
+   the time it is parsed and disk reads overlap the CPU-bound stages;
+2. analyse: a process pool parses it, computes its summary statistics
+   and reduces the plotted series to a min/max envelope of a few thousand
+   points;
+3. render: a process pool draws that envelope to a PNG file.
+
+Only filenames go to the analysis processes, and only the summary and
+the reduced series come back and go on to the renderers, so a log's
+samples never cross a process boundary however long it is.
+
+Back-pressure comes from a bound on the logs in flight: a new log is only
+read once fewer than ``depth`` logs are between reading and rendering, so
+memory stays bounded however many files are queued and however slow the
+later stages are.
+
+Notes
+-----
+- Archives are not read in the read stage; the analysis stage reads them
+  directly, as pyarrow does its own I/O and decompression.
+- Compressed logs are decompressed in the analysis stage, by load_log().
+- The envelope keeps the minimum and maximum of every bin of samples, so
+  the figure shows every excursion the raw samples would.
+- The stage functions are module-level so they can be sent to worker
+  processes.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy
+
+from tsblog import amc, mirror
+from tsblog.catalog import summarise_data
+from tsblog.loader import format_usecols, is_archive, load_log, read_headings
+from tsblog.pyramid import ScreenWidth
+
+# Bytes read at a time by the read stage
+ReadBlock = 1 << 20
+
+
+def read_stage(filename):
+    """Read the raw bytes of a log into the page cache; return their count.
+
+    The analysis process then parses the file from memory. Archives are
+    skipped (0 bytes), see the notes.
+    """
+    if is_archive(filename):
+        return 0
+    size = 0
+    with open(filename, "rb") as fh:
+        for block in iter(lambda: fh.read(ReadBlock), b""):
+            size += len(block)
+    return size
+
+
+def envelope(Time, values, width=ScreenWidth):
+    """Return ``(Time, values)`` reduced to the minimum and maximum of
+    ``width`` bins of samples, alternately at each bin's mid time, so a
+    line through them covers every excursion of the samples."""
+    n = len(values)
+    size = -(-n // width) if n else 1
+    if size <= 2:
+        return numpy.asarray(Time, dtype=numpy.float64), numpy.asarray(values, dtype=numpy.float64)
+    starts = numpy.arange(0, n, size)
+    ends = numpy.minimum(starts + size, n) - 1
+    mid = (Time[starts] + Time[ends]) / 2.0
+    lo = numpy.fmin.reduceat(values, starts)
+    hi = numpy.fmax.reduceat(values, starts)
+    return numpy.repeat(mid, 2), numpy.column_stack((lo, hi)).ravel().astype(numpy.float64)
+
+
+def _series(fmt, Data):
+    """Return ``(Time, lines, ylabels)`` of the overview figure of a log:
+    ``lines`` are ``(axis, label, values)`` for the two axes."""
+    if fmt == "amc":
+        # Rotate the wrapped-around log into time order, as AmcLog.py does
+        Data = amc.time_order(Data)
+        Time = Data[:, amc.ColSecs] - Data[0, amc.ColSecs]
+        lines = [(0, "Position", Data[:, amc.ColPos] / amc.MasPerAs),
+                 (0, "Demand", Data[:, amc.ColDmdPos] / amc.MasPerAs),
+                 (1, "Max error", Data[:, amc.ColMaxErr] / amc.MasPerAs),
+                 (1, "RMS error", Data[:, amc.ColRmsErr] / amc.MasPerAs)]
+        return Time, lines, ("Position (arcsec)", "Position Error (arcsec)")
+    if fmt in ("pmc", "sif"):
+        Cols = mirror.PmcColumns if fmt == "pmc" else mirror.SifColumns
+        Time = mirror.sample_time(Data, Cols) if fmt == "sif" else Data[:, Cols.ColTime]
+        Time = Time - Time[0]
+        lines = [(0, name, Data[:, getattr(Cols, name)]) for name in ("RedAxialLoad", "YelAxialLoad", "BluAxialLoad")]
+        lines += [(1, name, Data[:, getattr(Cols, name)])
+                  for name in ("RedAxialDrive", "YelAxialDrive", "BluAxialDrive")]
+        return Time, lines, ("Load (V)", "Drive (V)")
+    Time = Data[:, 0] - Data[0, 0]
+    lines = [(int(col > 4), "Column %d" % col, Data[:, col]) for col in range(1, min(Data.shape[1], 9))]
+    return Time, lines, (None, None)
+
+
+def analyse_stage(filename, fmt, plot=True, width=ScreenWidth):
+    """Parse a log; return ``(summary, series)``.
+
+    ``series`` (None unless ``plot``) is what render_stage() draws: the
+    y labels and ``(axis, label, Time, values)`` of every line, each line
+    reduced to an envelope of ``width`` bins.
+    """
+    Data = load_log(filename, format_usecols(fmt, read_headings(filename)))
+    summary = summarise_data(Data, fmt)
+    if not plot:
+        return summary, None
+    Time, lines, ylabels = _series(fmt, Data)
+    return summary, {"ylabels": ylabels,
+                     "lines": [(axis, label) + envelope(Time, values, width) for axis, label, values in lines]}
+
+
+def render_stage(filename, series, output_dir):
+    """Draw the overview figure of a log from its analysed ``series`` to a
+    PNG; return its path."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(2, 1, figsize=(12, 9), sharex=True)
+    for axis, label, Time, values in series["lines"]:
+        axes[axis].plot(Time, values, label=label)
+    for ax, ylabel in zip(axes, series["ylabels"]):
+        if ylabel:
+            ax.set_ylabel(ylabel)
+        ax.legend(loc=0)
+    axes[1].set_xlabel("Time (sec)")
+    axes[0].set_title(os.path.basename(filename))
+    output = os.path.join(output_dir, os.path.basename(filename) + ".png")
+    fig.savefig(output)
+    plt.close(fig)
+    return output
+
+
+class Pipeline:
+    """Read, analyse and render logs of format ``fmt`` concurrently.
+
+    ``readers``, ``analysers`` and ``renderers`` size the three pools
+    (the latter two default to the number of CPUs); ``depth`` bounds the
+    logs in flight (default twice the analysers). With ``output_dir``
+    None nothing is rendered.
+    """
+
+    def __init__(self, fmt, output_dir=None, readers=2, analysers=None, renderers=None, depth=None):
+        cpus = os.cpu_count() or 1
+        self.fmt = fmt
+        self.output_dir = output_dir
+        self.readers = readers
+        self.analysers = analysers or cpus
+        self.renderers = renderers or cpus
+        self.depth = depth or 2 * self.analysers
+
+    def run(self, filenames):
+        """Yield a result dict per log, in order of completion.
+
+        Each result holds the ``filename``, its ``summary``, the ``figure``
+        path (if rendered), ``error`` (None on success) and ``timings``:
+        the seconds from submission to the end of each stage.
+        """
+        results = queue.Queue()
+        slots = threading.BoundedSemaphore(self.depth)
+        with ThreadPoolExecutor(self.readers) as reader, \
+                ProcessPoolExecutor(self.analysers) as analyser, \
+                ProcessPoolExecutor(self.renderers if self.output_dir else 1) as renderer:
+
+            def finish(result, error=None):
+                result["error"] = error
+                result["timings"]["total"] = time.perf_counter() - result.pop("start")
+                results.put(result)
+                slots.release()
+
+            def stage(result, name, future, then):
+                # Chain the next stage when ``future`` completes
+                def done(f):
+                    result["timings"][name] = time.perf_counter() - result["start"]
+                    try:
+                        value = f.result()
+                    except Exception as exc:
+                        finish(result, "%s: %s" % (name, exc))
+                        return
+                    try:
+                        then(value)
+                    except Exception as exc:
+                        finish(result, "%s: %s" % (name, exc))
+                future.add_done_callback(done)
+
+            def analysed(result, value):
+                result["summary"], series = value
+                if self.output_dir is None:
+                    finish(result)
+                    return
+                future = renderer.submit(render_stage, result["filename"], series, self.output_dir)
+                stage(result, "render", future, lambda path: (result.update(figure=path), finish(result)))
+
+            def read(result, size):
+                future = analyser.submit(analyse_stage, result["filename"], self.fmt, self.output_dir is not None)
+                stage(result, "analyse", future, lambda value: analysed(result, value))
+
+            submitted = 0
+            for filename in filenames:
+                # Blocks while ``depth`` logs are in flight
+                while not slots.acquire(timeout=0.1):
+                    while not results.empty():
+                        submitted -= 1
+                        yield results.get()
+                result = {"filename": filename, "summary": None, "figure": None,
+                          "timings": {}, "start": time.perf_counter()}
+                stage(result, "read", reader.submit(read_stage, filename),
+                      lambda size, result=result: read(result, size))
+                submitted += 1
+            while submitted:
+                submitted -= 1
+                yield results.get()
@@ -0,0 +1,363 @@
+"""
+plots.py
+
+The figures of AmcLog.py, SifMirrorLog.py and the Std* scripts, drawn
+from already loaded and normalized arrays (see amc.py, mirror.py and
+std.py), so a notebook or batch job can draw them without the scripts.
+
+Every function draws its figures with matplotlib.pyplot under the same
+figure numbers as the script, and leaves showing or saving them to the
+caller (show() shows them all).
+
+Notes
+-----
+- matplotlib is imported by the functions, not by this module, so
+  importing tsblog never loads it.
+- ``prof`` is the script's Profiler; each figure is drawn in a stage of
+  the same name as before (e.g. "figure 1").
+- latency_figures() and torque_figures() also take ``out``, a
+  figcache.FigureOutput: each figure is then saved as a PNG, or copied
+  from the figure cache when its data and configuration are unchanged.
+"""
+
+import numpy
+
+from tsblog.amc import (
+    MasPerAs,
+    ColSecs, ColDmdVel, ColDmdPos, ColPos, ColVel, ColMaxErr, ColRmsErr, ColTgtPos,
+    ColMotor1Pos, ColMotor2Pos, ColMotor1Vel, ColMotor2Vel, ColPeriod, ColLatency)
+from tsblog.events import TorqueColumns
+from tsblog.profiling import Profiler
+from tsblog.std import PlotColumns, VelColumns
+
+# Linestyles of the mirror figures
+StyleDash = "--"
+StyleSolid = "-"
+StyleDots = ":"
+
+# Figures of SifMirrorLog.py, in order
+MirrorGraphs = ("load", "axial", "lateral", "angle", "vector", "balance", "response")
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _stage(prof, name):
+    return (prof or Profiler()).stage(name)
+
+
+def show():
+    """Show every figure drawn."""
+    _pyplot().show()
+
+
+def _column(Data, col):
+    """Return a column as stored (compact for a LogData), for hashing."""
+    return Data.column(col) if hasattr(Data, "column") else Data[:, col]
+
+
+def _figure(out, num, figsize, inputs, config, draw):
+    """Draw figure ``num`` with ``draw(plt)``, or, with ``out`` (a
+    figcache.FigureOutput), save it as PNG unless its cache already has it."""
+    if out is None:
+        plt = _pyplot()
+        plt.figure(num, figsize=figsize)
+        draw(plt)
+    else:
+        out.figure(num, figsize, inputs, config, draw)
+
+
+def amc_figures(NewData, TrackTime, PosErr, Heading, Filename, prof=None):
+    """Draw the figures of AmcLog.py from normalize() output and the position error."""
+    plt = _pyplot()
+    Time = NewData[:, ColSecs]
+
+    with _stage(prof, "figure 1"):
+        # Plot a graph of actual, demanded and target position
+        plt.figure(1, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColPos] / MasPerAs, label=Heading[ColPos])
+        plt.plot(Time, NewData[:, ColDmdPos] / MasPerAs, label=Heading[ColDmdPos])
+        plt.plot(TrackTime, NewData[:, ColTgtPos] / MasPerAs, label=Heading[ColTgtPos])
+        plt.plot(Time, NewData[:, ColTgtPos] / MasPerAs, label="Raw TrackTargetPosition (mas)")
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Position (arcsec)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 2"):
+        # Plot a graph of actual, demanded velocity
+        plt.figure(2, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColVel], label=Heading[ColVel])
+        plt.plot(Time, NewData[:, ColDmdVel], label=Heading[ColDmdVel])
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Velocity (arcsec/sec)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 3"):
+        # Plot a graph of maximum and RMS servo errors, plus position error
+        plt.figure(3, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColMaxErr] / MasPerAs, label=Heading[ColMaxErr])
+        plt.plot(Time, NewData[:, ColRmsErr] / MasPerAs, label=Heading[ColRmsErr])
+        plt.plot(Time, PosErr[:] / MasPerAs, label="Position Error")
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Position Error (arcsec)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 4"):
+        # Plot the motor positions
+        plt.figure(4, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColMotor1Pos] / MasPerAs, label=Heading[ColMotor1Pos])
+        plt.plot(Time, NewData[:, ColMotor2Pos] / MasPerAs, label=Heading[ColMotor2Pos])
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Motor Positions (arcsec)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 5"):
+        # Plot the motor velocities
+        plt.figure(5, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColMotor1Vel] / MasPerAs, label=Heading[ColMotor1Vel])
+        plt.plot(Time, NewData[:, ColMotor2Vel] / MasPerAs, label=Heading[ColMotor2Vel])
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Motor Velocities (arcsec)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 6"):
+        # Plot the latency & Period
+        plt.figure(6, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColPeriod], label=Heading[ColPeriod])
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Period (ms)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 7"):
+        plt.figure(7, figsize=(8, 6))
+        plt.plot(Time, NewData[:, ColLatency], label=Heading[ColLatency])
+        plt.title("%s" % (Filename))
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Latency(ms)")
+        plt.legend(loc=0)
+
+
+def _set_title(fig, title):
+    fig.suptitle(title)
+    try:
+        # Modern Matplotlib path
+        fig.canvas.manager.set_window_title(title)
+    except Exception:
+        # Some non-interactive backends don't have a window manager
+        pass
+
+
+def mirror_figures(Time, Data, Cols, Heading, graphs=MirrorGraphs, balance=None, prof=None, response=None):
+    """Draw the figures of SifMirrorLog.py.
+
+    ``graphs`` selects among ``MirrorGraphs``; the "balance" figure needs
+    ``balance``, a ``(Outputs, Forces, Expected, Flagged)`` tuple (see
+    support.py), and the "response" figure a response.Response.
+    """
+    plt = _pyplot()
+    count = 0
+
+    if "load" in graphs:
+        with _stage(prof, "figure load"):
+            count += 1
+            fig = plt.figure(count, figsize=(8, 6))
+            _set_title(fig, "Loads")
+            plt.plot(Time, Data[:, Cols.RedAxialLoad], label=Heading[Cols.RedAxialLoad], c="r", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.YelAxialLoad], label=Heading[Cols.YelAxialLoad], c="y", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.BluAxialLoad], label=Heading[Cols.BluAxialLoad], c="b", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.RedRadialLoad], label=Heading[Cols.RedRadialLoad], c="r", linestyle=StyleDash)
+            plt.plot(Time, Data[:, Cols.YelRadialLoad], label=Heading[Cols.YelRadialLoad], c="y", linestyle=StyleDash)
+            plt.plot(Time, Data[:, Cols.BluRadialLoad], label=Heading[Cols.BluRadialLoad], c="b", linestyle=StyleDash)
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Load (V)")
+            plt.legend(loc=0)
+
+    if "axial" in graphs:
+        with _stage(prof, "figure axial"):
+            count += 1
+            fig = plt.figure(count, figsize=(8, 6))
+            _set_title(fig, "Axial")
+            plt.plot(Time, Data[:, Cols.RedAxialDrive], label=Heading[Cols.RedAxialDrive], c="r", linestyle=StyleDots)
+            plt.plot(Time, Data[:, Cols.YelAxialDrive], label=Heading[Cols.YelAxialDrive], c="y", linestyle=StyleDots)
+            plt.plot(Time, Data[:, Cols.BluAxialDrive], label=Heading[Cols.BluAxialDrive], c="b", linestyle=StyleDots)
+            plt.plot(Time, Data[:, Cols.RedValveFeedback], label=Heading[Cols.RedValveFeedback], c="r", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.YelValveFeedback], label=Heading[Cols.YelValveFeedback], c="y", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.BluValveFeedback], label=Heading[Cols.BluValveFeedback], c="b", linestyle=StyleSolid)
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Drive/Feedback (V)")
+            plt.legend(loc=0)
+
+    if "lateral" in graphs:
+        with _stage(prof, "figure lateral"):
+            count += 1
+            fig = plt.figure(count, figsize=(8, 6))
+            _set_title(fig, "Lateral")
+            plt.plot(Time, Data[:, Cols.Lateral1LoadDrive], label=Heading[Cols.Lateral1LoadDrive], c="k", linestyle=StyleDots)
+            plt.plot(Time, Data[:, Cols.Lateral1PreLoadDrive], label=Heading[Cols.Lateral1PreLoadDrive], c="g", linestyle=StyleDots)
+            if Cols.PMC:
+                plt.plot(Time, Data[:, Cols.Lateral2LoadDrive], label=Heading[Cols.Lateral2LoadDrive], c="c", linestyle=StyleDots)
+                plt.plot(Time, Data[:, Cols.Lateral2PreLoadDrive], label=Heading[Cols.Lateral2PreLoadDrive], c="m", linestyle=StyleDots)
+            plt.plot(Time, Data[:, Cols.Lateral1LoadValveFeedback], label=Heading[Cols.Lateral1LoadValveFeedback], c="k", linestyle=StyleSolid)
+            plt.plot(Time, Data[:, Cols.Lateral1PreLoadValveFeedback], label=Heading[Cols.Lateral1PreLoadValveFeedback], c="g", linestyle=StyleSolid)
+            if Cols.PMC:
+                plt.plot(Time, Data[:, Cols.Lateral2LoadValveFeedback], label=Heading[Cols.Lateral2LoadValveFeedback], c="c", linestyle=StyleSolid)
+                plt.plot(Time, Data[:, Cols.Lateral2PreLoadValveFeedback], label=Heading[Cols.Lateral2PreLoadValveFeedback], c="m", linestyle=StyleSolid)
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Drive/Feedback (V)")
+            plt.legend(loc=0)
+
+    if "angle" in graphs:
+        with _stage(prof, "figure angle"):
+            count += 1
+            fig = plt.figure(count, figsize=(8, 6))
+            _set_title(fig, "Zenith Angle")
+            plt.plot(Time, Data[:, Cols.Angle], label=Heading[Cols.Angle], c="k")
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Angle (deg)")
+            plt.legend(loc=0)
+            plt.ylim(90, -10)
+
+    if "vector" in graphs:
+        with _stage(prof, "figure vector"):
+            count += 1
+            fig = plt.figure(count, figsize=(8, 6))
+            _set_title(fig, "Vectors")
+            plt.plot(Time, Data[:, Cols.NorthSouthVector], label=Heading[Cols.NorthSouthVector], c="g")
+            plt.plot(Time, Data[:, Cols.EastWestVector], label=Heading[Cols.EastWestVector], c="m")
+            plt.xlabel("Time (sec)")
+            plt.ylabel("Vector (V)")
+            plt.legend(loc=0)
+
+    if "balance" in graphs and balance is not None:
+        Outputs, Forces, Expected, Flagged = balance
+        with _stage(prof, "figure balance"):
+            count += 1
+            fig, axes = plt.subplots(len(Outputs), 1, sharex=True, num=count, figsize=(8, 9))
+            _set_title(fig, "Balance")
+            for k, name in enumerate(Outputs):
+                axes[k].plot(Time, Forces[:, k], c="k", label=name)
+                axes[k].plot(Time, Expected[:, k], c="r", linestyle=StyleDash, label="expected")
+                for Row in Flagged[Flagged["output"] == name]:
+                    axes[k].axvspan(Row["start"], Row["end"], color="r", alpha=0.2)
+                axes[k].legend(loc=0)
+            axes[-1].set_xlabel("Time (sec)")
+
+    if "response" in graphs and response is not None:
+        with _stage(prof, "figure response"):
+            count += 1
+            fig, axes = plt.subplots(3, 1, sharex=True, num=count, figsize=(8, 9))
+            _set_title(fig, "Valve response")
+            freq = response.freq[1:]
+            for k, name in enumerate(response.names):
+                axes[0].semilogx(freq, 20 * numpy.log10(response.magnitude[k, 1:]), label=name)
+                axes[1].semilogx(freq, response.phase[k, 1:], label=name)
+                axes[2].semilogx(freq, response.coherence[k, 1:], label=name)
+            axes[0].set_ylabel("Gain (dB)")
+            axes[1].set_ylabel("Phase (deg)")
+            axes[2].set_ylabel("Coherence")
+            axes[2].set_ylim(0, 1.05)
+            axes[2].set_xlabel("Frequency (Hz)")
+            axes[0].legend(loc=0, fontsize="small")
+
+
+def std_figures(Time, Data, NewData, Heading, Filename, Cols=PlotColumns, prof=None):
+    """Draw the figures of StdPlot.py; ``NewData`` is std.difference()."""
+    plt = _pyplot()
+
+    with _stage(prof, "figure 1"):
+        plt.figure(1, figsize=(8, 6))
+        plt.plot(Time, Data[:, Cols.ColFirstData] / MasPerAs, label=Heading[Cols.ColFirstData])
+        plt.plot(Time, Data[:, Cols.ColSecondData] / MasPerAs, label=Heading[Cols.ColSecondData])
+        plt.title(Filename)
+        plt.xlabel("Time (sec)")
+        plt.ylabel("First Data (units)")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 2"):
+        plt.figure(2, figsize=(8, 6))
+        plt.plot(Time, NewData[:], label="New Data")
+        plt.title(Filename)
+        plt.xlabel("Time (sec)")
+        plt.ylabel("SecondCol-FirstCol")
+        plt.legend(loc=0)
+
+
+def velocity_figures(Time, Data, Heading, Filename, Cols=VelColumns, prof=None):
+    """Draw the figures of StdVelPlot.py from std.normalize_velocities() output."""
+    plt = _pyplot()
+
+    with _stage(prof, "figure 1"):
+        plt.figure(1, figsize=(8, 6))
+        for _, Pos, _ in Cols.Axes:
+            plt.plot(Time, Data[:, Pos], label=Heading[Pos])
+        plt.title(Filename)
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Position")
+        plt.legend(loc=0)
+
+    with _stage(prof, "figure 2"):
+        plt.figure(2, figsize=(8, 6))
+        for _, _, Vel in Cols.Axes:
+            plt.plot(Time, Data[:, Vel], label=Heading[Vel])
+        plt.title(Filename)
+        plt.xlabel("Time (sec)")
+        plt.ylabel("Velocity")
+        plt.legend(loc=0)
+
+
+def torque_figures(Time, Data, Heading, Filename, Cols=TorqueColumns, prof=None, out=None):
+    """Draw the figures of StdTorquePlot.py."""
+    Positions = (Cols.ColPosTarget, Cols.ColPosDemand, Cols.ColPosActual)
+    Torques = (Cols.AXIS_TORQUE_DEMAND, Cols.MOTOR_TORQUE_CORRECTION,
+               Cols.MOTOR_1_MEASURED_TORQUE, Cols.MOTOR_2_MEASURED_TORQUE,
+               Cols.CLAMPED_MOTOR_1_TORQUE_DEMAND, Cols.CLAMPED_MOTOR_2_TORQUE_DEMAND)
+
+    def lines(Columns, scale, ylabel, legend):
+        def draw(plt):
+            for Col in Columns:
+                plt.plot(Time, Data[:, Col] / scale, label=Heading[Col], marker='.')
+            plt.title(Filename)
+            plt.xlabel("Time (sec)")
+            plt.ylabel(ylabel)
+            plt.legend(loc=legend)
+        config = ("torque", [Heading[Col] for Col in Columns], scale, Filename, ylabel, legend)
+        return [Time] + [_column(Data, Col) for Col in Columns], config, draw
+
+    for num, Columns, scale, ylabel, legend in (
+            (1, Positions, MasPerAs, "Position (arcsec)", 1),
+            (2, (Cols.ColPosDiff,), MasPerAs, "Position Difference (arcsec)", 2),
+            (3, Torques, 1, "Torque", 1)):
+        with _stage(prof, "figure %d" % num):
+            _figure(out, num, (12, 9), *lines(Columns, scale, ylabel, legend))
+
+
+def latency_figures(Time, Data, ControlDiff, Heading, Filename, columns=32, prof=None, out=None):
+    """Draw the figures of StdLatency.py: one per data column, then the
+    control difference (std.control_diff())."""
+
+    def line(series, label):
+        # ``series`` is called only when drawing, not on a cache hit
+        def draw(plt):
+            plt.plot(Time, series()[:], label=label)
+            plt.title(Filename)
+            plt.xlabel("Time (sec)")
+            plt.ylabel("")
+            plt.legend(loc=0)
+        return draw
+
+    with _stage(prof, "figures 0-%d" % (columns - 1)):
+        for x in range(columns):
+            _figure(out, x, (8, 6), [Time, _column(Data, x)], ("latency", Heading[x], Filename),
+                    line(lambda x=x: Data[:, x], Heading[x]))
+
+    with _stage(prof, "figure 37"):
+        _figure(out, 37, (8, 6), [Time, ControlDiff], ("latency", "Control Diff", Filename),
+                line(lambda: ControlDiff, 'Control Diff'))
@@ -0,0 +1,99 @@
+"""
+profiling.py
+
+Per-stage timing and memory instrumentation for the analysis scripts.
+
+Each script wraps its named stages (read headings, parse, stats, ...) in
+``Prof.stage(name)``. When profiling is off the stage is a shared no-op
+context manager, so the instrumented scripts cost nothing extra.
+
+Notes
+-----
+- Wall time uses time.perf_counter(), CPU time uses time.process_time().
+- Peak memory is the tracemalloc peak within the stage, which covers
+  NumPy allocations but not memory held by C extensions that bypass the
+  Python allocator (e.g. some matplotlib backends).
+"""
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+
+# Shared no-op context used when profiling is disabled
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Profiler:
+    """Collect wall time, CPU time and peak traced memory per stage."""
+
+    def __init__(self, enabled=False, label=""):
+        self.enabled = enabled
+        self.label = label
+        self.stages = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name):
+        """Return a context manager measuring the named stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        tracemalloc.reset_peak()
+        start_mem = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            peak = tracemalloc.get_traced_memory()[1]
+            self.stages.append({
+                "stage": name,
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "peak_bytes": max(peak - start_mem, 0),
+            })
+
+    def as_dict(self):
+        """Return the recorded stages as a JSON-serialisable dict."""
+        return {
+            "label": self.label,
+            "stages": self.stages,
+            "total_wall_s": sum(s["wall_s"] for s in self.stages),
+            "total_cpu_s": sum(s["cpu_s"] for s in self.stages),
+        }
+
+    def table(self):
+        """Return the recorded stages as a human-readable table."""
+        lines = ["%-28s %10s %10s %12s" % ("Stage", "Wall (s)", "CPU (s)", "Peak (MiB)")]
+        for s in self.stages:
+            lines.append("%-28s %10.3f %10.3f %12.2f" % (
+                s["stage"], s["wall_s"], s["cpu_s"], s["peak_bytes"] / 2**20))
+        d = self.as_dict()
+        lines.append("%-28s %10.3f %10.3f" % ("Total", d["total_wall_s"], d["total_cpu_s"]))
+        return "\n".join(lines)
+
+    def report(self, json_path=None, stream=None):
+        """Print the table and write the JSON record, if profiling is on.
+
+        The JSON goes to ``json_path`` when given ("-" for stdout),
+        otherwise it is printed as a single line after the table.
+        """
+        if not self.enabled:
+            return
+        stream = stream or sys.stderr
+        print(self.table(), file=stream)
+        record = json.dumps(self.as_dict())
+        if json_path and json_path != "-":
+            with open(json_path, "w") as fh:
+                fh.write(record + "\n")
+        elif json_path == "-":
+            print(record)
+        else:
+            print(record, file=stream)
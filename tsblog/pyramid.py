@@ -0,0 +1,214 @@
+"""
+pyramid.py
+
+Multi-resolution min/max/mean pyramids of logs, for overview plots that
+do not load or draw every sample.
+
+Level k of a pyramid splits the time-ordered log into bins of 2**k
+samples and keeps, per column and bin, the minimum, maximum and mean
+value, plus the time span of the bin. Levels run from ``MinLevel`` up to
+the first level with a single bin, each built from the one below, so the
+whole pyramid costs one pass over the data. Drawing the min/max envelope
+of a level shows every excursion the raw samples would, at a fraction of
+the points.
+
+A pyramid is stored as ``<log>.pyramid.npz`` next to the log or its
+archive, one array per level, column and statistic, so fetching one
+column at one level reads only that column. It records the size and
+modification time of its source and is rebuilt when they change.
+
+Notes
+-----
+- AMC logs are rotated into time order first, as AmcLog.py does, and SIF
+  logs use their sec/nsec sample times.
+- Minima and maxima keep the compact column dtype, so they are exact;
+  means are float32.
+"""
+
+import os
+
+import numpy
+
+from tsblog import amc, mirror
+from tsblog.loader import format_usecols, is_archive, load_log, read_headings
+
+# Finest level stored: bins of 2**MinLevel samples
+MinLevel = 8
+
+# Default plot width in pixels (points per line)
+ScreenWidth = 2000
+
+
+def pyramid_path(filename):
+    """Return where the pyramid of ``filename`` is stored."""
+    return str(filename) + ".pyramid.npz"
+
+
+def time_order(Data, fmt):
+    """Return ``(Time, Data)`` with the samples of a log in time order."""
+    if fmt == "amc":
+        Data = amc.time_order(Data)
+        return Data[:, amc.ColSecs], Data
+    if fmt == "sif":
+        return mirror.sample_time(Data, mirror.SifColumns), Data
+    return Data[:, 0], Data
+
+
+def _time_column(fmt):
+    """Return the column holding a log's (whole) seconds."""
+    if fmt == "amc":
+        return amc.ColSecs
+    if fmt == "sif":
+        return mirror.SifColumns.ColSecs
+    return 0
+
+
+def load_span(filename, fmt, start=None, end=None):
+    """Return ``(Time, Data)`` of the samples of a log between times
+    ``start`` and ``end``, in time order.
+
+    An archive is read with a time filter, so only the row groups around
+    the span are decoded; a text log has to be parsed whole.
+    """
+    if is_archive(filename):
+        from tsblog.archive import read_archive, read_archive_info
+        fmt = read_archive_info(filename)["format"]
+        col = _time_column(fmt)
+        # SIF seconds are whole, the nanoseconds are in another column
+        filters = [f for f in ((col, ">=", None if start is None else float(numpy.floor(start))),
+                               (col, "<=", end)) if f[2] is not None]
+        Data = read_archive(filename, filters)
+    else:
+        Data = load_log(filename, format_usecols(fmt, read_headings(filename)))
+    Time, Data = time_order(Data, fmt)
+    first = 0 if start is None else Time.searchsorted(start)
+    last = len(Time) if end is None else Time.searchsorted(end, side="right")
+    return Time[first:last], Data.take(slice(first, last))
+
+
+def _bins(arr, size, reduce):
+    """Reduce ``arr`` over consecutive bins of ``size`` (the last may be partial)."""
+    full = len(arr) // size * size
+    out = reduce(arr[:full].reshape(-1, size), axis=1)
+    if full < len(arr):
+        out = numpy.append(out, reduce(arr[full:]))
+    return out
+
+
+def _pairs(arr, reduce):
+    """Reduce ``arr`` over consecutive pairs (the last may be single)."""
+    if len(arr) % 2:
+        return numpy.append(reduce(arr[:-1].reshape(-1, 2), axis=1), arr[-1])
+    return reduce(arr.reshape(-1, 2), axis=1)
+
+
+def build(Time, Data, min_level=MinLevel):
+    """Return the pyramid of time-ordered ``Data`` as a dict of arrays."""
+    size = 1 << min_level
+    arrays = {"min_level": numpy.array(min_level), "samples": numpy.array(len(Data)),
+              "columns": numpy.array(Data.shape[1])}
+    tmin = _bins(Time, size, numpy.fmin.reduce)
+    tmax = _bins(Time, size, numpy.fmax.reduce)
+    cols = []
+    for col in range(Data.shape[1]):
+        # Reduce the compact storage; fixed-point scales are applied on fetch
+        values = Data.columns[col]
+        valid = numpy.ones(len(values), dtype=numpy.int64)
+        sums = values.astype(numpy.float64)
+        if values.dtype.kind == "f":
+            # NaNs (missing samples) are left out of every statistic
+            valid[numpy.isnan(values)] = 0
+            sums[valid == 0] = 0
+        cols.append([_bins(values, size, numpy.fmin.reduce), _bins(values, size, numpy.fmax.reduce),
+                     _bins(sums, size, numpy.sum), _bins(valid, size, numpy.sum)])
+    level = min_level
+    while True:
+        arrays["L%d_tmin" % level] = tmin
+        arrays["L%d_tmax" % level] = tmax
+        for col, (lo, hi, sums, counts) in enumerate(cols):
+            arrays["L%d_c%d_min" % (level, col)] = lo
+            arrays["L%d_c%d_max" % (level, col)] = hi
+            with numpy.errstate(invalid="ignore", divide="ignore"):
+                arrays["L%d_c%d_mean" % (level, col)] = (sums / counts).astype(numpy.float32)
+        if len(tmin) <= 1:
+            break
+        level += 1
+        tmin = _pairs(tmin, numpy.fmin.reduce)
+        tmax = _pairs(tmax, numpy.fmax.reduce)
+        cols = [[_pairs(lo, numpy.fmin.reduce), _pairs(hi, numpy.fmax.reduce),
+                 _pairs(sums, numpy.sum), _pairs(counts, numpy.sum)] for lo, hi, sums, counts in cols]
+    arrays["max_level"] = numpy.array(level)
+    return arrays
+
+
+class Pyramid:
+    """A stored pyramid, read lazily from its ``.npz`` file."""
+
+    def __init__(self, path):
+        self.file = numpy.load(path)
+        self.min_level = int(self.file["min_level"])
+        self.max_level = int(self.file["max_level"])
+        self.samples = int(self.file["samples"])
+        self.columns = int(self.file["columns"])
+        self.scales = self.file["scales"]
+
+    def close(self):
+        self.file.close()
+
+    def level_for(self, samples, width=ScreenWidth):
+        """Return the coarsest level giving at least ``width`` bins over
+        ``samples`` samples, or None if even the finest is coarser."""
+        level = int(numpy.floor(numpy.log2(max(samples, 1) / width))) if samples > width else -1
+        if level < self.min_level:
+            return None
+        return min(level, self.max_level)
+
+    def fetch(self, col, start=None, end=None, width=ScreenWidth):
+        """Return ``(tmin, tmax, min, max, mean)`` of column ``col`` between
+        times ``start`` and ``end`` at the level matching ``width``.
+
+        Returns None if the span is too short for the finest level, in
+        which case the raw samples should be plotted instead.
+        """
+        top = self.file["L%d_tmin" % self.max_level]
+        start = top[0] if start is None else start
+        end = self.file["L%d_tmax" % self.max_level][-1] if end is None else end
+        # Estimate the samples in the span from the overall sample rate
+        total = self.file["L%d_tmax" % self.max_level][-1] - top[0]
+        samples = self.samples * (end - start) / total if total > 0 else self.samples
+        level = self.level_for(samples, width)
+        if level is None:
+            return None
+        tmin = self.file["L%d_tmin" % level]
+        tmax = self.file["L%d_tmax" % level]
+        first = numpy.searchsorted(tmax, start, side="left")
+        last = numpy.searchsorted(tmin, end, side="right")
+        scale = self.scales[col] or 1
+        lo = self.file["L%d_c%d_min" % (level, col)][first:last] / scale
+        hi = self.file["L%d_c%d_max" % (level, col)][first:last] / scale
+        mean = self.file["L%d_c%d_mean" % (level, col)][first:last] / numpy.float32(scale)
+        return tmin[first:last], tmax[first:last], lo, hi, mean
+
+
+def ensure_pyramid(filename, fmt, min_level=MinLevel):
+    """Return the Pyramid of a log, (re)building it if missing or stale."""
+    path = pyramid_path(filename)
+    st = os.stat(filename)
+    if os.path.exists(path):
+        with numpy.load(path) as stored:
+            current = int(stored["source_size"]) == st.st_size and float(stored["source_mtime"]) == st.st_mtime
+        if current:
+            return Pyramid(path)
+    if is_archive(filename):
+        from tsblog.archive import read_archive_info
+        fmt = read_archive_info(filename)["format"]
+    Time, Data = time_order(load_log(filename, format_usecols(fmt, read_headings(filename))), fmt)
+    arrays = build(Time, Data, min_level)
+    arrays["scales"] = numpy.array([s or 0 for s in Data.scales])
+    arrays["source_size"] = numpy.array(st.st_size)
+    arrays["source_mtime"] = numpy.array(st.st_mtime)
+    # Write under a temporary name so a reader never sees a partial pyramid
+    tmp = path + ".tmp.npz"
+    numpy.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return Pyramid(path)
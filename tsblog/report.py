@@ -0,0 +1,212 @@
+"""
+report.py
+
+Self-contained static HTML reports of logs: the statistics and state
+changes AmcLog.py or SifMirrorLog.py print, and every figure they draw,
+embedded as PNG images in a single file that needs nothing else to view.
+
+The report runs the script itself (on the non-interactive Agg backend)
+and captures its output and figures, so a report always shows exactly
+what the script would. Before rendering, lines with many more points
+than the image has pixels are decimated to their per-pixel min/max,
+which keeps every peak visible while making rendering cheap.
+
+Rendered assets (captured text and images) are cached under a key made
+from the sources of the script and of the tsblog modules it uses, the
+log's path, size and modification time and the rendering settings. A report whose key is unchanged is left alone,
+and a missing report with cached assets is rebuilt without re-running
+the script, so regenerating the reports of unchanged logs is a no-op.
+
+Notes
+-----
+- AMC logs use AmcLog.py, PMC logs SifMirrorLog.py.
+- Many reports are generated concurrently by generate_reports(), in a
+  process pool.
+"""
+
+import base64
+import contextlib
+import hashlib
+import html
+import io
+import json
+import os
+import runpy
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+
+# Script reproduced by the report of each log format
+Scripts = {
+    "amc": "AmcLog.py",
+    "pmc": "SifMirrorLog.py",
+}
+
+# Default cache of rendered assets
+CacheDir = ".tsb-report-cache"
+
+# Image size (inches) and resolution of the embedded figures
+FigureSize = (10, 6)
+Dpi = 100
+
+# Marker of the report key in the HTML
+_KeyMeta = '<meta name="tsblog-report-key" content="%s">'
+
+_Style = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+h1 { font-size: 1.3em; word-break: break-all; }
+pre { background: #f6f6f6; padding: 1em; overflow-x: auto; }
+figure { margin: 1em 0; }
+img { max-width: 100%; border: 1px solid #ddd; }
+"""
+
+
+def script_path(fmt):
+    """Return the path of the script reproduced for log format ``fmt``."""
+    if fmt not in Scripts:
+        raise ValueError("No report for log format %r (expected one of %s)" % (fmt, ", ".join(Scripts)))
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), Scripts[fmt])
+
+
+def report_key(filename, fmt):
+    """Return the cache key of the report of ``filename``."""
+    st = os.stat(filename)
+    digest = hashlib.sha256()
+    # The script draws with tsblog (plots.py, amc.py, mirror.py...), so a change to any module is a new key
+    package = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(package, name) for name in sorted(os.listdir(package)) if name.endswith(".py")]
+    for path in [script_path(fmt)] + sources:
+        with open(path, "rb") as fh:
+            digest.update(fh.read())
+    digest.update(repr((os.path.abspath(filename), st.st_size, st.st_mtime, FigureSize, Dpi)).encode())
+    return digest.hexdigest()
+
+
+def decimate(x, y, buckets):
+    """Return ``(x, y)`` reduced to the min and max of ``buckets`` buckets,
+    in their original order."""
+    n = len(y)
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    filled = numpy.nan_to_num(numpy.asarray(y, dtype=numpy.float64), nan=numpy.inf)
+    low = numpy.append(filled, numpy.full(pad, numpy.inf)).reshape(buckets, size).argmin(axis=1)
+    filled[numpy.isinf(filled)] = -numpy.inf
+    high = numpy.append(filled, numpy.full(pad, -numpy.inf)).reshape(buckets, size).argmax(axis=1)
+    base = numpy.arange(buckets) * size
+    index = numpy.unique(numpy.minimum(numpy.concatenate((base + low, base + high)), n - 1))
+    return numpy.asarray(x)[index], numpy.asarray(y)[index]
+
+
+def _decimate_figure(fig, pixels):
+    for ax in fig.axes:
+        for line in ax.get_lines():
+            x, y = line.get_data()
+            if len(y) > 4 * pixels:
+                line.set_data(*decimate(x, y, pixels))
+
+
+def run_script(filename, fmt):
+    """Run the script of ``fmt`` on a log; return ``(stdout, png images)``."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+    out = io.StringIO()
+    argv = sys.argv
+    sys.argv = [script_path(fmt), filename]
+    try:
+        with contextlib.redirect_stdout(out):
+            runpy.run_path(script_path(fmt), run_name="__main__")
+    finally:
+        sys.argv = argv
+    images = []
+    pixels = int(FigureSize[0] * Dpi)
+    for num in plt.get_fignums():
+        fig = plt.figure(num)
+        fig.set_size_inches(*FigureSize)
+        _decimate_figure(fig, pixels)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=Dpi)
+        images.append(base64.b64encode(buf.getvalue()).decode("ascii"))
+    plt.close("all")
+    return out.getvalue(), images
+
+
+def render_html(filename, key, text, images):
+    """Return the HTML report of a log from its captured output and images."""
+    lines = text.splitlines()
+    changes = [line for line in lines if " : State change " in line]
+    stats = [line for line in lines if " : State change " not in line]
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\">",
+        _KeyMeta % key,
+        "<title>%s</title>" % html.escape(os.path.basename(filename)),
+        "<style>%s</style></head><body>" % _Style,
+        "<h1>%s</h1>" % html.escape(filename),
+        "<h2>Statistics</h2>",
+        "<pre>%s</pre>" % html.escape("\n".join(stats)),
+    ]
+    if changes:
+        parts.append("<h2>State changes (%d)</h2>" % len(changes))
+        parts.append("<pre>%s</pre>" % html.escape("\n".join(changes)))
+    parts.append("<h2>Figures</h2>")
+    for n, image in enumerate(images, 1):
+        parts.append("<figure><img alt=\"Figure %d\" src=\"data:image/png;base64,%s\"></figure>" % (n, image))
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def report_path(filename, output_dir=None):
+    """Return where the report of ``filename`` is written."""
+    name = os.path.basename(filename) + ".html"
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(filename)), name)
+
+
+def generate_report(filename, fmt, output_dir=None, cache_dir=CacheDir):
+    """Write the report of one log; return ``(path, status)``.
+
+    ``status`` is "unchanged" if the report was already current, "cached"
+    if it was rebuilt from cached assets and "rendered" otherwise.
+    """
+    output = report_path(filename, output_dir)
+    key = report_key(filename, fmt)
+    if os.path.exists(output):
+        with open(output, encoding="utf-8") as fh:
+            if _KeyMeta % key in fh.read(4096):
+                return output, "unchanged"
+    asset = os.path.join(cache_dir, key + ".json")
+    status = "cached"
+    if os.path.exists(asset):
+        with open(asset, encoding="utf-8") as fh:
+            cached = json.load(fh)
+        text, images = cached["text"], cached["images"]
+    else:
+        status = "rendered"
+        text, images = run_script(filename, fmt)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = asset + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"filename": filename, "text": text, "images": images}, fh)
+        os.replace(tmp, asset)
+    with open(output, "w", encoding="utf-8") as fh:
+        fh.write(render_html(filename, key, text, images))
+    return output, status
+
+
+def generate_reports(filenames, fmt, output_dir=None, cache_dir=CacheDir, jobs=None):
+    """Generate the reports of many logs in a process pool.
+
+    Yields ``(filename, path, status)`` as each report completes; a failed
+    report has a None path and the error as its status.
+    """
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = {pool.submit(generate_report, f, fmt, output_dir, cache_dir): f for f in filenames}
+        for future in as_completed(futures):
+            try:
+                path, status = future.result()
+            except (Exception, SystemExit) as exc:
+                path, status = None, "failed: %s" % exc
+            yield futures[future], path, status
@@ -0,0 +1,265 @@
+"""
+response.py
+
+Frequency response of the mirror support valves: the transfer function
+(magnitude and phase) and coherence from each valve drive to its valve
+feedback, for the seven drive/feedback pairs SifMirrorLog.py plots.
+
+The estimate is Welch's: every signal is cut into ``Segment``-sample
+segments overlapping by ``Overlap``, each demeaned and Hann windowed,
+and the cross-spectral densities are averaged over segments. All the
+drive and feedback signals share one set of segments and are transformed
+together, one FFT per signal and segment, however many pairs use them;
+the auto and cross spectra of every pair are then products of those
+transforms. Segments are transformed in batches, so memory stays bounded
+for long logs.
+
+Results are reduced to numbers that can be compared night to night: the
+low-frequency gain, the -3 dB bandwidth and the mean gain, phase and
+coherence in fixed frequency ``Bands``. A valve whose bandwidth shrinks
+or whose gain or phase in a band drifts from its usual value (the median
+over a run of nights, see reference() and drifts()) is degrading. The
+response of a log is stored next to it as ``<log>.response.npz`` and
+rebuilt when the log changes.
+
+Notes
+-----
+- Transfer functions are H = Pxy / Pxx (the H1 estimate, unbiased by
+  noise on the feedback); phase is unwrapped along frequency, in degrees.
+  Negative phase means the feedback lags the drive.
+- Bins with coherence below ``MinCoherence`` are ignored in the band
+  means and the bandwidth, as their gain and phase are unreliable.
+- The frequency grid depends on ``Segment`` and the sample rate only, so
+  logs of any length, recorded at the same rate, share it.
+"""
+
+import os
+
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+from tsblog.mirror import load, sample_time
+from tsblog.xcorr import sample_period
+
+# Samples per FFT segment, and the fraction by which segments overlap
+Segment = 256
+Overlap = 0.5
+
+# Most segments transformed in one batch
+BatchSegments = 2048
+
+# Coherence below which a frequency bin is ignored in the summaries
+MinCoherence = 0.8
+
+# Frequency bands (Hz) of the night-to-night summaries
+Bands = ((0.05, 0.2), (0.2, 1.0), (1.0, 5.0))
+
+# Night-to-night changes flagged: gain (dB), phase (degrees) and
+# bandwidth (fraction of its usual value)
+GainTolerance = 1.0
+PhaseTolerance = 10.0
+BandwidthTolerance = 0.2
+
+# Low-frequency bins (after DC) averaged for the reference gain of the bandwidth
+GainBins = 3
+
+# (pair name, drive column name, feedback column name) of the valve pairs
+Pairs = (
+    ("red_axial", "RedAxialDrive", "RedValveFeedback"),
+    ("yel_axial", "YelAxialDrive", "YelValveFeedback"),
+    ("blu_axial", "BluAxialDrive", "BluValveFeedback"),
+    ("lateral1_load", "Lateral1LoadDrive", "Lateral1LoadValveFeedback"),
+    ("lateral1_preload", "Lateral1PreLoadDrive", "Lateral1PreLoadValveFeedback"),
+    ("lateral2_load", "Lateral2LoadDrive", "Lateral2LoadValveFeedback"),
+    ("lateral2_preload", "Lateral2PreLoadDrive", "Lateral2PreLoadValveFeedback"),
+)
+
+
+def pairs(Cols):
+    """Return ``(name, drive column, feedback column)`` of the pairs logged in layout ``Cols``."""
+    result = []
+    for name, drive, feedback in Pairs:
+        if getattr(Cols, drive) >= 0 and getattr(Cols, feedback) >= 0:
+            result.append((name, getattr(Cols, drive), getattr(Cols, feedback)))
+    return result
+
+
+def cross_spectra(Signals, first, second, segment=Segment, overlap=Overlap, batch=BatchSegments):
+    """Return ``(Pxx, Pyy, Pxy, segments)``: the segment-averaged auto
+    spectra of ``Signals[first]`` and ``Signals[second]`` and their cross
+    spectrum, each (pairs x segment // 2 + 1).
+
+    ``Signals`` is (signals x samples); ``first`` and ``second`` index
+    its rows, one entry per pair. Every signal is transformed once per
+    segment, whichever pairs use it.
+    """
+    Signals = numpy.asarray(Signals, dtype=numpy.float64)
+    if Signals.shape[1] < segment:
+        raise ValueError("%d samples is fewer than one %d-sample segment" % (Signals.shape[1], segment))
+    step = max(1, int(round(segment * (1 - overlap))))
+    Segments = sliding_window_view(Signals, segment, axis=1)[:, ::step]
+    count = Segments.shape[1]
+    window = numpy.hanning(segment)
+    nf = segment // 2 + 1
+    Auto = numpy.zeros((len(Signals), nf))
+    Pxy = numpy.zeros((len(first), nf), dtype=numpy.complex128)
+    for start in range(0, count, batch):
+        Batch = Segments[:, start:start + batch]
+        F = numpy.fft.rfft((Batch - Batch.mean(axis=-1, keepdims=True)) * window, axis=-1)
+        Auto += (F.real ** 2 + F.imag ** 2).sum(axis=1)
+        Pxy += (numpy.conj(F[first]) * F[second]).sum(axis=1)
+    return Auto[first] / count, Auto[second] / count, Pxy / count, count
+
+
+class Response:
+    """Drive to feedback frequency response of the valve pairs of a log."""
+
+    def __init__(self, names, freq, H, coherence, segments):
+        self.names = list(names)
+        self.freq = freq
+        self.H = H
+        self.coherence = coherence
+        self.segments = segments
+
+    @classmethod
+    def from_data(cls, Data, Cols, segment=Segment, overlap=Overlap):
+        """Estimate the response of every valve pair of a mirror log."""
+        Pairs = pairs(Cols)
+        Columns = sorted({col for _, drive, feedback in Pairs for col in (drive, feedback)})
+        row = {col: k for k, col in enumerate(Columns)}
+        Signals = numpy.stack([Data[:, col] for col in Columns])
+        Pxx, Pyy, Pxy, count = cross_spectra(Signals, [row[d] for _, d, _ in Pairs],
+                                             [row[f] for _, _, f in Pairs], segment, overlap)
+        freq = numpy.fft.rfftfreq(segment, sample_period(sample_time(Data, Cols)))
+        with numpy.errstate(all="ignore"):
+            H = Pxy / Pxx
+            coherence = numpy.abs(Pxy) ** 2 / (Pxx * Pyy)
+        return cls([name for name, _, _ in Pairs], freq, H, numpy.nan_to_num(coherence), count)
+
+    @property
+    def magnitude(self):
+        return numpy.abs(self.H)
+
+    @property
+    def phase(self):
+        """Phase in degrees, unwrapped along frequency."""
+        return numpy.degrees(numpy.unwrap(numpy.angle(self.H), axis=-1))
+
+    def _coherent(self, min_coherence):
+        return self.coherence >= min_coherence
+
+    def gain(self):
+        """Return the mean low-frequency gain of each pair (the bandwidth reference)."""
+        return self.magnitude[:, 1:1 + GainBins].mean(axis=1)
+
+    def bandwidth(self, min_coherence=MinCoherence):
+        """Return the lowest coherent frequency at which each pair's gain is
+        3 dB below its low-frequency gain, NaN if it never drops that far."""
+        below = (self.magnitude < self.gain()[:, None] / numpy.sqrt(2)) & self._coherent(min_coherence)
+        below[:, 0] = False
+        first = below.argmax(axis=1)
+        return numpy.where(below.any(axis=1), self.freq[first], numpy.nan)
+
+    def summary(self, bands=Bands, min_coherence=MinCoherence):
+        """Return a structured array, one row per pair, of the numbers
+        compared night to night: low-frequency gain (dB), bandwidth and the
+        gain (dB), phase and coherence averaged over each band."""
+        dtype = [("pair", "U24"), ("segments", "i8"), ("gain_db", "f8"), ("bandwidth", "f8")]
+        for label in band_labels(bands):
+            dtype += [("gain_db_" + label, "f8"), ("phase_" + label, "f8"), ("coherence_" + label, "f8")]
+        table = numpy.zeros(len(self.names), dtype=dtype)
+        table["pair"] = self.names
+        table["segments"] = self.segments
+        with numpy.errstate(all="ignore"):
+            table["gain_db"] = 20 * numpy.log10(self.gain())
+            table["bandwidth"] = self.bandwidth(min_coherence)
+            coherent = self._coherent(min_coherence)
+            magnitude, phase = self.magnitude, self.phase
+            for label, (low, high) in zip(band_labels(bands), bands):
+                band = (self.freq >= low) & (self.freq < high)
+                weight = (coherent & band).astype(numpy.float64)
+                used = weight.sum(axis=1)
+                table["gain_db_" + label] = 20 * numpy.log10((magnitude * weight).sum(axis=1) / used)
+                table["phase_" + label] = (phase * weight).sum(axis=1) / used
+                table["coherence_" + label] = self.coherence[:, band].mean(axis=1)
+        return table
+
+    def to_arrays(self):
+        return {"names": numpy.array(self.names, dtype=str), "freq": self.freq, "H": self.H,
+                "coherence": self.coherence, "segments": numpy.array(self.segments)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls([str(name) for name in arrays["names"]], arrays["freq"], arrays["H"], arrays["coherence"],
+                   int(arrays["segments"]))
+
+
+def band_labels(bands=Bands):
+    """Return the field label of each band, e.g. "0.2-1Hz"."""
+    return ["%g-%gHz" % band for band in bands]
+
+
+def response_path(filename):
+    """Return where the response of ``filename`` is stored."""
+    return str(filename) + ".response.npz"
+
+
+def ensure_response(filename, Cols, segment=Segment, overlap=Overlap):
+    """Return the Response of a mirror log, (re)building it if missing,
+    stale or estimated with other segments."""
+    path = response_path(filename)
+    st = os.stat(filename)
+    if os.path.exists(path):
+        with numpy.load(path) as stored:
+            if (int(stored["source_size"]) == st.st_size and float(stored["source_mtime"]) == st.st_mtime
+                    and int(stored["segment"]) == segment and float(stored["overlap"]) == overlap):
+                return Response.from_arrays(stored)
+    response = Response.from_data(load(filename, Cols), Cols, segment, overlap)
+    arrays = {"source_size": numpy.array(st.st_size), "source_mtime": numpy.array(st.st_mtime),
+              "segment": numpy.array(segment), "overlap": numpy.array(overlap)}
+    arrays.update(response.to_arrays())
+    # Write under a temporary name so a reader never sees a partial response
+    tmp = path + ".tmp.npz"
+    numpy.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return response
+
+
+def reference(Summaries):
+    """Return the per-pair median of several nights' summaries (see
+    Response.summary()), the usual response to compare a night with."""
+    names = Summaries[0]["pair"]
+    table = Summaries[0].copy()
+    for field in table.dtype.names[1:]:
+        with numpy.errstate(all="ignore"):
+            stacked = numpy.array([[row[field] for row in _by_pair(summary, names)] for summary in Summaries],
+                                  dtype=numpy.float64)
+            table[field] = numpy.nanmedian(stacked, axis=0)
+    return table
+
+
+def _by_pair(summary, names):
+    rows = {row["pair"]: row for row in summary}
+    empty = numpy.full(1, numpy.nan, dtype=[(f, "f8") for f in summary.dtype.names[1:]])[0]
+    return [rows.get(name, empty) for name in names]
+
+
+def drifts(summary, usual, gain_db=GainTolerance, phase=PhaseTolerance, bandwidth=BandwidthTolerance):
+    """Return ``(pair, field, value, usual value)`` of every summary field
+    of one night further than the tolerances from ``usual`` (see
+    reference()): gains by ``gain_db`` dB, phases by ``phase`` degrees and
+    the bandwidth by the fraction ``bandwidth`` of its usual value."""
+    found = []
+    for row, base in zip(_by_pair(summary, usual["pair"]), usual):
+        for field in summary.dtype.names:
+            if field.startswith("gain_db"):
+                limit = gain_db
+            elif field.startswith("phase_"):
+                limit = phase
+            elif field == "bandwidth":
+                limit = bandwidth * abs(base[field])
+            else:
+                continue
+            if numpy.isfinite(row[field]) and numpy.isfinite(base[field]) and abs(row[field] - base[field]) > limit:
+                found.append((str(base["pair"]), field, float(row[field]), float(base[field])))
+    return found
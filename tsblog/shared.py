@@ -0,0 +1,197 @@
+"""
+shared.py
+
+Publishing a parsed log in named shared memory, so several processes
+run analyses on it in parallel without each re-parsing the file or
+receiving a pickled copy.
+
+publish() copies the compact columns of a LogData once into a single
+shared memory block and writes a small JSON manifest (row count, column
+dtypes, offsets and fixed-point scales, headings) into a second block
+named after the first. attach() opens both by name and returns a
+LogData whose columns are read-only NumPy views of the shared block, so
+attaching costs no copy whatever the size of the log.
+
+Notes
+-----
+- Only the publisher unlinks the blocks, when its SharedLog is closed or
+  its ``with`` block exits, however it exits. Workers only attach and
+  detach, so a worker that crashes leaves nothing behind. If the
+  publisher itself is killed, the multiprocessing resource tracker
+  unlinks the blocks when it notices.
+- Attached columns are read-only: an analysis that modifies a column
+  must copy it first (writes to fixed-point columns copy automatically).
+"""
+
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy
+
+from tsblog.loader import LogData
+
+# Alignment (bytes) of every column in the shared block
+Alignment = 64
+
+# Suffix of the manifest block's name
+ManifestSuffix = "_m"
+
+
+def _layout(Data):
+    """Return the offsets of the columns of ``Data`` and the total size."""
+    offsets, size = [], 0
+    for col in Data.columns:
+        offsets.append(size)
+        size += -(-col.nbytes // Alignment) * Alignment
+    return offsets, size
+
+
+def _open_block(name):
+    """Attach to an existing shared memory block without taking ownership."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before Python 3.13 attaching registers the block with this process's
+    # resource tracker, which unlinks it at exit. Processes started by the
+    # publisher share its tracker, which tracks the block already; any
+    # other process has its own and must unregister the block again.
+    own_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+    block = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _close_block(block):
+    """Unmap ``block``, unless arrays still view it (they keep it mapped until freed)."""
+    try:
+        block.close()
+    except BufferError:
+        pass
+
+
+class SharedLog:
+    """A LogData published in shared memory; see publish()."""
+
+    def __init__(self, Data, name=None):
+        offsets, size = _layout(Data)
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1), name=name)
+        self.manifest_block = None
+        try:
+            columns = []
+            for col, scale, offset in zip(Data.columns, Data.scales, offsets):
+                view = numpy.ndarray(col.shape, dtype=col.dtype, buffer=self.block.buf, offset=offset)
+                view[...] = col
+                columns.append({"dtype": col.dtype.str, "offset": offset, "scale": scale})
+            manifest = json.dumps({"rows": len(Data), "columns": columns, "headings": Data.headings}).encode()
+            self.manifest_block = shared_memory.SharedMemory(
+                create=True, size=len(manifest), name=self.block.name + ManifestSuffix)
+            self.manifest_block.buf[:len(manifest)] = manifest
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def name(self):
+        """The name workers attach() with."""
+        return self.block.name
+
+    def close(self):
+        """Release and unlink the shared blocks; safe to call more than once."""
+        for block in (self.manifest_block, self.block):
+            if block is None:
+                continue
+            _close_block(block)
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self.block = self.manifest_block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def publish(Data, name=None):
+    """Copy ``Data`` into shared memory; return its SharedLog.
+
+    Use it as a context manager so the memory is released however the
+    block exits::
+
+        with publish(Data) as shared:
+            ... attach(shared.name) in other processes ...
+    """
+    return SharedLog(Data, name)
+
+
+class AttachedLog:
+    """A zero-copy LogData view of a published log; see attach()."""
+
+    def __init__(self, name):
+        self.manifest_block = _open_block(name + ManifestSuffix)
+        self.block = None
+        try:
+            manifest = json.loads(bytes(self.manifest_block.buf).rstrip(b"\0"))
+            self.block = _open_block(name)
+            columns = []
+            for col in manifest["columns"]:
+                view = numpy.ndarray(manifest["rows"], dtype=numpy.dtype(col["dtype"]),
+                                     buffer=self.block.buf, offset=col["offset"])
+                view.flags.writeable = False
+                columns.append(view)
+            self.data = LogData(columns, manifest["headings"], [col["scale"] for col in manifest["columns"]])
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Detach; the views in ``data`` must not be used afterwards."""
+        self.data = None
+        for block in (self.manifest_block, self.block):
+            if block is not None:
+                _close_block(block)
+        self.block = self.manifest_block = None
+
+    def __enter__(self):
+        return self.data
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(name):
+    """Attach to the log published as ``name``; return an AttachedLog.
+
+    ``with attach(name) as Data:`` gives the LogData and detaches at the
+    end of the block.
+    """
+    return AttachedLog(name)
+
+
+def _run(name, analysis, args):
+    with attach(name) as Data:
+        return analysis(Data, *args)
+
+
+def run_parallel(shared, analyses, jobs=None):
+    """Run analyses on a published log in a process pool.
+
+    ``analyses`` maps a key to ``(function, args)``; each function is called
+    as ``function(Data, *args)`` in a worker attached to ``shared`` and
+    must return a picklable result. Yields ``(key, result, error)`` as each
+    finishes, ``error`` being None or the exception it raised (including
+    BrokenProcessPool if a worker died).
+    """
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = {pool.submit(_run, shared.name, function, tuple(args)): key
+                   for key, (function, args) in analyses.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result(), None
+            except Exception as exc:
+                yield key, None, exc
@@ -0,0 +1,176 @@
+"""
+slew.py
+
+Slew detection and settling performance of AMC servo logs: for every
+slew that ends in tracking, how long the position error takes to settle
+within given thresholds, how far the axis overshoots the demand and how
+fast the motors ran.
+
+In the time-ordered log (amc.normalize()) every run of samples whose
+demand velocity is above ``SlewVelocity`` is a slew. Tracking starts at
+the first sample after it, or, if ``track_states`` are given, at the
+first sample after it in one of those states (``ColState``), and lasts
+until the next slew, over at most ``Horizon`` seconds. Slews that end in
+no tracking, or whose last sample is not in one of ``slew_states`` if
+those are given, are skipped.
+
+All slews of a log are measured together with segment reductions over
+the whole arrays (no per-sample Python), once per threshold.
+
+Notes
+-----
+- The settling time to a threshold is the time from the start of
+  tracking to the first sample after which the error stays within it
+  until the end of the tracking segment or of the horizon. It is zero if
+  the error is within the threshold from the start, and NaN if it is
+  still outside it at the end.
+- Positions are in mas and velocities (``ColDmdVel``, ``ColVel`` and the
+  motor velocities) in mas/s: in the logs the demand velocity is the
+  rate of change of the demand position, 15000 at the sidereal rate of
+  15 arcsec/s, although AmcLog.py labels its velocity plot arcsec/sec.
+  ``SlewVelocity`` and the peak velocities of slew tables are in mas/s.
+- Settling is measured on both the per-cycle |position error|
+  (demanded minus actual) and the logged RMS error (``ColRmsErr``), in
+  mas.
+- Overshoot is the furthest the position runs past the demand in the
+  direction of the slew, after tracking starts (mas, zero if never).
+- Slew tables are NumPy structured arrays; tables from several files are
+  combined with numpy.concatenate() and summarised with aggregate().
+"""
+
+import numpy
+
+from tsblog import amc
+from tsblog.events import run_lengths, segment_max
+
+# Demand velocity (mas/s) above which the axis is slewing, 0.5 deg/s
+SlewVelocity = 0.5 * amc.MasPerDeg
+
+# Settling thresholds (mas) on the position and RMS errors
+Thresholds = (1000.0, 100.0)
+
+# Longest time (s) after the start of tracking that settling is measured over
+Horizon = 60.0
+
+# (name, function of NewData) of the errors whose settling is measured
+ErrorChannels = (
+    ("pos", lambda NewData: numpy.abs(amc.position_error(NewData))),
+    ("rms", lambda NewData: numpy.abs(NewData[:, amc.ColRmsErr])),
+)
+
+_SlewFields = [
+    ("file", "O"),
+    ("start", "f8"),
+    ("end", "f8"),
+    ("duration", "f8"),
+    ("distance", "f8"),
+    ("from_state", "i8"),
+    ("to_state", "i8"),
+    ("peak_demand_vel", "f8"),
+    ("peak_motor_vel", "f8"),
+    ("overshoot", "f8"),
+]
+
+
+def settle_field(channel, threshold):
+    """Return the name of the settling time field of a slew table."""
+    return "settle_%s_%g" % (channel, threshold)
+
+
+def settling_times(Time, Error, threshold, starts, stops):
+    """Return the time after ``starts`` from which ``Error`` stays within
+    ``threshold`` until ``stops`` (exclusive), NaN if it never does."""
+    violation = numpy.where(Error > threshold, numpy.arange(len(Error)), -1)
+    last = segment_max(violation, starts, stops).astype(numpy.int64)
+    settled = Time[numpy.minimum(numpy.maximum(last + 1, starts), len(Time) - 1)] - Time[starts]
+    return numpy.where(last == stops - 1, numpy.nan, settled)
+
+
+def slews(NewData, filename="", slew_velocity=SlewVelocity, thresholds=Thresholds, horizon=Horizon,
+          slew_states=None, track_states=None):
+    """Return the slews of a normalized AMC log (see amc.normalize()) as a
+    structured array, one row per slew ending in tracking.
+
+    ``slew_states`` and ``track_states``, if given, are the states a slew
+    must end in and tracking must start in. The settling time to each
+    of ``thresholds`` is in the fields named by settle_field().
+    """
+    dtype = _SlewFields + [(settle_field(name, t), "f8") for name, _ in ErrorChannels for t in thresholds]
+    Time = NewData[:, amc.ColSecs]
+    State = NewData[:, amc.ColState]
+    DemandSpeed = numpy.abs(NewData[:, amc.ColDmdVel])
+
+    slew_starts, slew_stops = run_lengths(DemandSpeed > slew_velocity)
+    # Tracking lasts until the next slew
+    next_starts = numpy.append(slew_starts[1:], len(Time))
+    if track_states is None:
+        track_starts = slew_stops
+    else:
+        Tracking = numpy.flatnonzero(numpy.isin(State, track_states))
+        after = numpy.searchsorted(Tracking, slew_stops)
+        track_starts = numpy.append(Tracking, len(Time))[after]
+    keep = track_starts < next_starts
+    if slew_states is not None:
+        keep &= numpy.isin(State[slew_stops - 1], slew_states)
+    slew_starts, slew_stops = slew_starts[keep], slew_stops[keep]
+    track_starts, next_starts = track_starts[keep], next_starts[keep]
+    track_stops = numpy.minimum(next_starts, numpy.searchsorted(Time, Time[track_starts] + horizon, side="right"))
+
+    DmdPos = NewData[:, amc.ColDmdPos]
+    PosErr = amc.position_error(NewData)
+    MotorSpeed = numpy.maximum(numpy.abs(NewData[:, amc.ColMotor1Vel]), numpy.abs(NewData[:, amc.ColMotor2Vel]))
+    Travel = DmdPos[track_starts] - DmdPos[slew_starts]
+
+    table = numpy.zeros(len(slew_starts), dtype=dtype)
+    table["file"] = filename
+    table["start"] = Time[slew_starts]
+    table["end"] = Time[track_starts]
+    table["duration"] = table["end"] - table["start"]
+    table["distance"] = numpy.abs(Travel)
+    table["from_state"] = State[slew_stops - 1]
+    table["to_state"] = State[track_starts]
+    table["peak_demand_vel"] = segment_max(DemandSpeed, slew_starts, slew_stops)
+    table["peak_motor_vel"] = segment_max(MotorSpeed, slew_starts, slew_stops)
+    # Position past the demand in the direction of travel is -PosErr moving up, PosErr moving down
+    table["overshoot"] = numpy.maximum(numpy.where(Travel >= 0, segment_max(-PosErr, track_starts, track_stops),
+                                                   segment_max(PosErr, track_starts, track_stops)), 0)
+    for name, error in ErrorChannels:
+        Error = error(NewData)
+        for threshold in thresholds:
+            table[settle_field(name, threshold)] = settling_times(Time, Error, threshold, track_starts, track_stops)
+    return table
+
+
+def file_slews(filename, **kwargs):
+    """Load an AMC log and return its slew table (see slews())."""
+    NewData, _ = amc.normalize(amc.load(filename))
+    return slews(NewData, filename, **kwargs)
+
+
+def aggregate(table):
+    """Summarise a slew table, e.g. of many files.
+
+    Returns a dict with the slew and file counts, mean duration, largest
+    peak motor velocity, mean and largest overshoot and, per settling
+    field, the median, 95th percentile and largest settling time of the
+    slews that settled and the count of those that did not.
+    """
+    empty = len(table) == 0
+    result = {
+        "slews": len(table),
+        "files": len(numpy.unique(table["file"])),
+        "mean_duration": numpy.nan if empty else float(numpy.mean(table["duration"])),
+        "peak_motor_vel": numpy.nan if empty else float(numpy.max(table["peak_motor_vel"])),
+        "mean_overshoot": numpy.nan if empty else float(numpy.mean(table["overshoot"])),
+        "max_overshoot": numpy.nan if empty else float(numpy.max(table["overshoot"])),
+    }
+    for name in table.dtype.names:
+        if not name.startswith("settle_"):
+            continue
+        settled = table[name][numpy.isfinite(table[name])]
+        p50, p95, p100 = numpy.percentile(settled, (50, 95, 100)) if len(settled) else (numpy.nan,) * 3
+        result[name + "_median"] = float(p50)
+        result[name + "_p95"] = float(p95)
+        result[name + "_max"] = float(p100)
+        result[name + "_unsettled"] = int(len(table) - len(settled))
+    return result
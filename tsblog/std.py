@@ -0,0 +1,130 @@
+"""
+std.py
+
+Column layouts, loading and derived signals of STD extracts (data
+extracted from SDB files, e.g. with the STD '-gnuplot' option), as used by
+StdPlot.py, StdVelPlot.py, StdTorquePlot.py and StdLatency.py.
+
+As in amc.py, everything takes and returns arrays, so one loaded extract
+can be passed through several analyses; tsblog.plots draws the scripts'
+figures from them.
+
+Notes
+-----
+- Column numbers index the loaded data, i.e. the fields after the date
+  and clock, without the trailing empty field of the extracts.
+"""
+
+import numpy
+
+from tsblog.events import TorqueColumns
+from tsblog.kernels import fill_forward
+from tsblog.loader import load_log
+from tsblog.xcorr import DefaultPairs, lag, sample_period
+
+# Position samples per second of the axis velocity extracts
+VelocityRate = 400
+
+
+class PlotColumns:
+    """Columns compared by StdPlot.py."""
+    ColTime = 0
+    ColFirstData = 1
+    ColSecondData = 2
+
+
+class VelColumns:
+    """STD axis position/velocity extract columns, as in StdVelPlot.py."""
+    ColTime = 0
+    ColFirstData = 1
+    ColAzmBrake = 2
+    ColAltBrake = 7
+    ColCasBrake = 12
+    ColAzmPos = 3
+    ColAltPos = 8
+    ColCasPos = 13
+    ColAzmVel = 4
+    ColAltVel = 9
+    ColCasVel = 14
+    # (brake, position, velocity) per axis
+    Axes = ((ColAzmBrake, ColAzmPos, ColAzmVel),
+            (ColAltBrake, ColAltPos, ColAltVel),
+            (ColCasBrake, ColCasPos, ColCasVel))
+
+
+class LatencyColumns:
+    """STD latency extract columns, as in StdLatency.py."""
+    ColTime = 0
+    ColFirstData = 3
+    ColControl = 3
+    ColControlRate = 11
+    ColMeasured = 18
+
+
+def load(filename, headings):
+    """Return the data columns of an STD extract given its raw ``headings``."""
+    return load_log(filename, usecols=range(2, len(headings) - 1))
+
+
+def time_axis(Data, col=0):
+    """Return the time axis in seconds from the first sample."""
+    return Data[:, col] - Data[0, col]
+
+
+def difference(Data, first=PlotColumns.ColFirstData, second=PlotColumns.ColSecondData):
+    """Return column ``second`` minus column ``first``."""
+    return Data[:, second] - Data[:, first]
+
+
+def normalize_velocities(Data, Cols=VelColumns, rate=VelocityRate):
+    """Return a copy of a velocity extract with gaps filled and velocities derived.
+
+    Missing positions are filled forward and offset by the first position
+    of each axis; velocities are the position differences times ``rate``
+    (0 for the first sample), and brake states are carried forward over
+    missing samples.
+    """
+    Data = Data.copy()
+    for Brake, _, _ in Cols.Axes:
+        Data[0, Brake] = 0
+
+    # Fill missing positions forward, taking the first position as the offset
+    Adjust = []
+    for _, Pos, _ in Cols.Axes:
+        Data[:, Pos], Adj = fill_forward(Data[:, Pos])
+        Adjust.append(Adj)
+
+    # Remove the position offsets and differentiate to get velocities
+    for (_, Pos, Vel), Adj in zip(Cols.Axes, Adjust):
+        Data[:, Pos] = Data[:, Pos] - Adj
+        Data[1:, Vel] = numpy.diff(Data[:, Pos]) * rate
+
+    # Carry the last brake state forward over missing samples
+    for Brake, _, _ in Cols.Axes:
+        State = Data[:, Brake]
+        Last = numpy.where(numpy.isnan(State), 0, numpy.arange(len(State)))
+        Data[:, Brake] = State[numpy.maximum.accumulate(Last)]
+
+    for _, _, Vel in Cols.Axes:
+        Data[0, Vel] = 0
+    return Data
+
+
+def position_differences(Data, Cols=TorqueColumns):
+    """Return ``(DiffDemand, DiffTarget)``: demanded and target minus actual position."""
+    return (Data[:, Cols.ColPosDemand] - Data[:, Cols.ColPosActual],
+            Data[:, Cols.ColPosTarget] - Data[:, Cols.ColPosActual])
+
+
+def loop_lags(Data, Time, pairs=DefaultPairs["std"], max_lag=1.0):
+    """Return ``(first, second, lag, correlation)`` per column pair of a torque extract."""
+    Period = sample_period(Time)
+    return [(first, second) + lag(Data[:, first], Data[:, second], Period, max_lag=max_lag)
+            for first, second in pairs]
+
+
+def control_diff(Data, Cols=LatencyColumns):
+    """Return ``(Control, ControlDiff)`` of a latency extract: the control
+    output rebuilt from its inputs, and its difference from the measured one."""
+    Control = -1000.0 * (Data[:, Cols.ColControl] / 111.0 + 2.0 * 1.72124e-3 / 1.0e3 * Data[:, Cols.ColControlRate])
+    return Control, Control[:] - Data[:, Cols.ColMeasured]
@@ -0,0 +1,208 @@
+"""
+support.py
+
+Net force and moments on the primary mirror from the loads of its
+support actuators, and a model of the loads expected at each zenith
+angle, for checking whether the support is balanced.
+
+The three axial load cells (red, yellow, blue) sit on a circle at
+``AxialAzimuths``, and the three radial ones push at ``RadialAzimuths``.
+Their sum and first moments give, per sample, the net axial force, the
+north/south and east/west tilt moments and the two lateral force
+components. That is one (samples x 6) by (6 x 5) matrix product for the
+whole log.
+
+The expected-load model bins those quantities by zenith ``Angle`` over
+historical logs, keeping the count, sum and sum of squares per bin, so
+it is built in one pass per log and extended by adding logs. A log is
+checked by interpolating the model mean and standard deviation at each
+sample's angle; runs of samples further than ``Sigma`` deviations from
+it are flagged.
+
+Notes
+-----
+- Loads stay in the units of the log (volts), and moments are in volts
+  times the support radius; only deviations from the model matter.
+- The model is cached as a .npz file that records the size and
+  modification time of every log it was built from. Updating it adds new
+  logs and rebuilds it only if one of those logs changed or disappeared.
+"""
+
+import os
+
+import numpy
+
+from tsblog.events import run_lengths, segment_max
+from tsblog.loader import load_log
+
+# Azimuths (degrees from north, through east) of the red, yellow and blue actuators
+AxialAzimuths = (0.0, 120.0, 240.0)
+RadialAzimuths = (0.0, 120.0, 240.0)
+
+# Width (degrees) of the zenith angle bins of the model
+AngleBin = 1.0
+
+# Deviation, in model standard deviations, flagged as unbalanced
+Sigma = 4.0
+
+# Reconstructed quantities, in the order of the rows of support_matrix()
+Outputs = ("axial_force", "moment_ns", "moment_ew", "lateral_ns", "lateral_ew")
+
+# Load columns, in the order of the columns of support_matrix()
+LoadNames = ("RedAxialLoad", "YelAxialLoad", "BluAxialLoad", "RedRadialLoad", "YelRadialLoad", "BluRadialLoad")
+
+
+def support_matrix(axial=AxialAzimuths, radial=RadialAzimuths):
+    """Return the (5 x 6) matrix mapping the six loads to ``Outputs``."""
+    a = numpy.radians(axial)
+    r = numpy.radians(radial)
+    zero = numpy.zeros(3)
+    return numpy.array([
+        numpy.concatenate((numpy.ones(3), zero)),
+        numpy.concatenate((numpy.cos(a), zero)),
+        numpy.concatenate((numpy.sin(a), zero)),
+        numpy.concatenate((zero, numpy.cos(r))),
+        numpy.concatenate((zero, numpy.sin(r))),
+    ])
+
+
+def loads(Data, Cols):
+    """Return the (samples x 6) load matrix of a mirror log."""
+    return numpy.column_stack([Data[:, getattr(Cols, name)] for name in LoadNames])
+
+
+def reconstruct(Data, Cols, matrix=None):
+    """Return the (samples x 5) net force and moments of a mirror log."""
+    return loads(Data, Cols) @ (support_matrix() if matrix is None else matrix).T
+
+
+class LoadModel:
+    """Expected ``Outputs`` per zenith angle bin, built from historical logs."""
+
+    def __init__(self, bin_width=AngleBin):
+        self.bin_width = bin_width
+        self.bins = int(numpy.ceil(90.0 / bin_width)) + 1
+        self.count = numpy.zeros(self.bins)
+        self.sum = numpy.zeros((self.bins, len(Outputs)))
+        self.sumsq = numpy.zeros((self.bins, len(Outputs)))
+        self.sources = {}
+
+    def _bin(self, angle):
+        return numpy.clip(numpy.rint(numpy.asarray(angle) / self.bin_width), 0, self.bins - 1).astype(numpy.int64)
+
+    def add(self, Angle, Forces):
+        """Accumulate the reconstructed ``Forces`` of samples at zenith ``Angle``.
+
+        Samples with a non-finite angle or force (missing values) are left out.
+        """
+        Angle = numpy.asarray(Angle, dtype=numpy.float64)
+        Forces = numpy.asarray(Forces, dtype=numpy.float64)
+        valid = numpy.isfinite(Angle) & numpy.isfinite(Forces).all(axis=1)
+        if not valid.all():
+            Angle, Forces = Angle[valid], Forces[valid]
+        index = self._bin(Angle)
+        self.count += numpy.bincount(index, minlength=self.bins)
+        for k in range(len(Outputs)):
+            self.sum[:, k] += numpy.bincount(index, Forces[:, k], minlength=self.bins)
+            self.sumsq[:, k] += numpy.bincount(index, Forces[:, k] ** 2, minlength=self.bins)
+
+    def add_log(self, filename, Cols):
+        """Load a mirror log and add it to the model."""
+        Data = load_log(filename, usecols=Cols.UseCols)
+        self.add(Data[:, Cols.Angle], reconstruct(Data, Cols))
+        st = os.stat(filename)
+        self.sources[os.path.abspath(filename)] = (st.st_size, st.st_mtime)
+
+    def expected(self, Angle):
+        """Return ``(mean, stdev)``, each (samples x 5), at zenith ``Angle``."""
+        filled = self.count > 0
+        if not filled.any():
+            raise ValueError("the load model is empty")
+        centres = numpy.flatnonzero(filled) * self.bin_width
+        n = self.count[filled, None]
+        mean = self.sum[filled] / n
+        stdev = numpy.sqrt(numpy.maximum(self.sumsq[filled] / n - mean ** 2, 0))
+        Angle = numpy.asarray(Angle, dtype=numpy.float64)
+        return (numpy.column_stack([numpy.interp(Angle, centres, mean[:, k]) for k in range(len(Outputs))]),
+                numpy.column_stack([numpy.interp(Angle, centres, stdev[:, k]) for k in range(len(Outputs))]))
+
+    def save(self, path):
+        names = sorted(self.sources)
+        tmp = path + ".tmp.npz"
+        numpy.savez(tmp, bin_width=self.bin_width, count=self.count, sum=self.sum, sumsq=self.sumsq,
+                    source_names=numpy.array(names, dtype=str),
+                    source_stats=numpy.array([self.sources[n] for n in names], dtype=numpy.float64).reshape(-1, 2))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as stored:
+            model = cls(float(stored["bin_width"]))
+            model.count = stored["count"]
+            model.sum = stored["sum"]
+            model.sumsq = stored["sumsq"]
+            model.sources = {str(name): (int(size), float(mtime))
+                             for name, (size, mtime) in zip(stored["source_names"], stored["source_stats"])}
+        return model
+
+
+def _current(sources):
+    """Return True if every recorded source log is unchanged."""
+    for name, (size, mtime) in sources.items():
+        try:
+            st = os.stat(name)
+        except OSError:
+            return False
+        if st.st_size != size or st.st_mtime != mtime:
+            return False
+    return True
+
+
+def update_model(path, filenames, Cols, bin_width=AngleBin):
+    """Return the model cached at ``path`` extended with ``filenames``.
+
+    Logs already in the model are skipped; the model is rebuilt from
+    scratch if one of its logs changed or was removed. Returns
+    ``(model, added)``, ``added`` being the logs read.
+    """
+    model = LoadModel.load(path) if os.path.exists(path) else None
+    names = [os.path.abspath(f) for f in filenames]
+    if model is None or model.bin_width != bin_width or not _current(model.sources):
+        previous = list(model.sources) if model is not None else []
+        model = LoadModel(bin_width)
+        names = [n for n in previous if os.path.exists(n)] + [n for n in names if n not in previous]
+    added = [n for n in dict.fromkeys(names) if n not in model.sources]
+    for name in added:
+        model.add_log(name, Cols)
+    if added:
+        model.save(path)
+    return model, added
+
+
+def deviations(Time, Forces, mean, stdev, sigma=Sigma):
+    """Return the runs where ``Forces`` deviate from the expected ``mean``
+    by more than ``sigma`` times ``stdev`` (see LoadModel.expected()).
+
+    Returns a structured array with the output name, start and end time,
+    sample count and the peak |deviation|, in model standard deviations and
+    in load units, sorted by decreasing peak.
+    """
+    with numpy.errstate(all="ignore"):
+        z = (Forces - mean) / stdev
+    z[~numpy.isfinite(z)] = 0
+    dtype = [("output", "U16"), ("start", "f8"), ("end", "f8"), ("samples", "i8"),
+             ("peak_sigma", "f8"), ("peak_excess", "f8")]
+    Tables = []
+    for k, name in enumerate(Outputs):
+        magnitude = numpy.abs(z[:, k])
+        starts, stops = run_lengths(magnitude > sigma)
+        table = numpy.zeros(len(starts), dtype=dtype)
+        table["output"] = name
+        table["start"] = Time[starts]
+        table["end"] = Time[stops - 1]
+        table["samples"] = stops - starts
+        table["peak_sigma"] = segment_max(magnitude, starts, stops)
+        table["peak_excess"] = segment_max(numpy.abs(Forces[:, k] - mean[:, k]), starts, stops)
+        Tables.append(table)
+    flagged = numpy.concatenate(Tables)
+    return flagged[numpy.argsort(-flagged["peak_sigma"], kind="stable")]
@@ -0,0 +1,151 @@
+"""
+xcorr.py
+
+Lag and correlation between pairs of log signals by FFT cross-correlation,
+e.g. the control-loop delay from a torque demand to the measured motor
+torque, or from the demanded to the actual axis position.
+
+The cross-correlation of two n-sample signals is computed as the inverse
+FFT of the cross spectrum, zero padded to avoid circular wrap-around, so
+it costs O(n log n) rather than the O(n^2) of numpy.correlate(). Sliding
+windows are stacked into 2-D arrays and transformed in batches.
+
+Notes
+-----
+- A positive lag means the second signal follows the first: ``y(t)`` is
+  best matched by ``x(t - lag)``.
+- Each window is linearly detrended first, so slowly varying offsets and
+  ramps (e.g. positions while slewing) do not dominate the correlation.
+- The peak is refined to a fraction of a sample by a parabola through the
+  three correlation values around it.
+- Non-finite samples (gaps in STD extracts) are linearly interpolated
+  from their neighbours first. A signal or window with more than
+  ``MaxGapFraction`` of its samples non-finite, or with no usable
+  correlation, has a NaN lag and correlation rather than the edge of the
+  search range.
+"""
+
+import numpy
+
+# Most samples (windows x FFT length) transformed in one batch
+BatchSamples = 1 << 22
+
+# Largest fraction of non-finite samples interpolated over in a signal or window
+MaxGapFraction = 0.1
+
+# Default signal pairs per log format, as (first, second) column indices
+# into the loaded data (see AmcLog.py and StdTorquePlot.py)
+DefaultPairs = {
+    # ColDmdPos -> ColPos
+    "amc": ((4, 5),),
+    # CLAMPED_MOTOR_1_TORQUE_DEMAND -> MOTOR_1_MEASURED_TORQUE, ColPosDiff -> AXIS_TORQUE_DEMAND
+    "std": ((14, 18), (4, 6)),
+}
+
+
+def sample_period(Time):
+    """Return the median sample period of time axis ``Time``."""
+    return float(numpy.median(numpy.diff(Time)))
+
+
+def _interpolate(signal):
+    """Return ``(signal, bad)``: ``signal`` as float64 with non-finite
+    samples linearly interpolated from the finite ones (left as they are
+    if fewer than two), and the mask of those samples."""
+    signal = numpy.array(signal, dtype=numpy.float64)
+    bad = ~numpy.isfinite(signal)
+    if bad.any() and len(signal) - bad.sum() >= 2:
+        index = numpy.arange(len(signal))
+        signal[bad] = numpy.interp(index[bad], index[~bad], signal[~bad])
+    return signal, bad
+
+
+def _detrend(windows):
+    """Remove the least-squares line from each row of ``windows``."""
+    n = windows.shape[-1]
+    t = numpy.arange(n) - (n - 1) / 2.0
+    slope = windows @ t / (t @ t)
+    return windows - windows.mean(axis=-1, keepdims=True) - slope[..., None] * t
+
+
+def _correlate(x, y, max_lag):
+    """Return the lag (in samples) and correlation of each row pair of x, y."""
+    n = x.shape[-1]
+    x = _detrend(numpy.atleast_2d(numpy.asarray(x, dtype=numpy.float64)))
+    y = _detrend(numpy.atleast_2d(numpy.asarray(y, dtype=numpy.float64)))
+    nfft = 1 << (2 * n - 1).bit_length()
+    spectrum = numpy.conj(numpy.fft.rfft(x, nfft)) * numpy.fft.rfft(y, nfft)
+    full = numpy.fft.irfft(spectrum, nfft)
+    # Lags -max_lag .. +max_lag, in order
+    corr = numpy.concatenate((full[:, nfft - max_lag:], full[:, :max_lag + 1]), axis=1)
+    norm = numpy.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        corr = corr / norm[:, None]
+    peak = numpy.argmax(numpy.nan_to_num(corr, nan=-numpy.inf), axis=1)
+    rows = numpy.arange(len(corr))
+    best = corr[rows, peak]
+    # A row with no finite correlation (non-finite or constant input) has no lag
+    found = numpy.isfinite(corr).all(axis=1)
+    best = numpy.where(found, best, numpy.nan)
+    # Parabolic refinement where the peak has neighbours on both sides
+    inner = (peak > 0) & (peak < corr.shape[1] - 1)
+    left = corr[rows, numpy.maximum(peak - 1, 0)]
+    right = corr[rows, numpy.minimum(peak + 1, corr.shape[1] - 1)]
+    curve = left - 2 * best + right
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        shift = numpy.where(inner & (curve < 0), 0.5 * (left - right) / curve, 0.0)
+    return numpy.where(found, peak - max_lag + shift, numpy.nan), best
+
+
+def lag(x, y, period=1.0, max_lag=None):
+    """Return ``(lag, correlation)`` of signal ``y`` relative to ``x``.
+
+    ``period`` is the sample period, giving the lag in seconds, and
+    ``max_lag`` bounds the search (in seconds, default a quarter of the
+    signal length). Both are NaN if ``period`` is not positive, e.g. the
+    log's time stamps do not advance, or there is too little finite data
+    to correlate.
+    """
+    if not period > 0:
+        return numpy.nan, numpy.nan
+    n = len(x)
+    limit = n // 4 if max_lag is None else min(int(round(max_lag / period)), n - 1)
+    (x, xbad), (y, ybad) = _interpolate(x), _interpolate(y)
+    if (xbad | ybad).sum() > MaxGapFraction * n:
+        return numpy.nan, numpy.nan
+    samples, corr = _correlate(x, y, limit)
+    return float(samples[0] * period), float(corr[0])
+
+
+def sliding_lag(Time, x, y, window, step=None, max_lag=None):
+    """Return ``(centres, lags, correlations)`` over sliding windows.
+
+    ``window`` and ``step`` (default half a window) are durations in the
+    units of ``Time``, which must be sorted and evenly sampled; ``max_lag``
+    is as for lag().
+    """
+    period = sample_period(Time)
+    if not period > 0:
+        raise ValueError("sample period of %g is not positive" % period)
+    width = max(int(round(window / period)), 2)
+    stride = max(int(round((step if step is not None else window / 2) / period)), 1)
+    if width > len(Time):
+        raise ValueError("window of %g is longer than the log" % window)
+    limit = width // 4 if max_lag is None else min(int(round(max_lag / period)), width - 1)
+    view = numpy.lib.stride_tricks.sliding_window_view
+    (x, xbad), (y, ybad) = _interpolate(x), _interpolate(y)
+    xs = view(x, width)[::stride]
+    ys = view(y, width)[::stride]
+    nfft = 1 << (2 * width - 1).bit_length()
+    batch = max(BatchSamples // nfft, 1)
+    parts = [_correlate(xs[i:i + batch], ys[i:i + batch], limit) for i in range(0, len(xs), batch)]
+    samples = numpy.concatenate([p[0] for p in parts])
+    corr = numpy.concatenate([p[1] for p in parts])
+    starts = numpy.arange(len(xs)) * stride
+    # Non-finite samples per window, from a running count
+    count = numpy.concatenate(([0], numpy.cumsum(xbad | ybad)))
+    gappy = count[starts + width] - count[starts] > MaxGapFraction * width
+    samples[gappy] = numpy.nan
+    corr[gappy] = numpy.nan
+    centres = (numpy.asarray(Time)[starts] + numpy.asarray(Time)[starts + width - 1]) / 2.0
+    return centres, samples * period, corr